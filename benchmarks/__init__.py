@@ -0,0 +1,9 @@
+import os
+import sys
+
+# The benchmarks import the dashboard modules from the repository root and run
+# with a generated dataset directory as the working directory, so the root is
+# put on sys.path explicitly rather than relying on the current directory.
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_ROOT not in sys.path:
+    sys.path.insert(0, REPO_ROOT)
@@ -0,0 +1,211 @@
+import json
+import logging
+import os
+import subprocess
+import sys
+import threading
+import time
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from benchmarks import REPO_ROOT
+from benchmarks.stages import dataset_cache_dir, filter_matrix, working_directory
+from filter_index import DIMENSIONS
+
+# Dropdown component ids in dash_dashboard.py, in DIMENSIONS order.
+FILTER_COMPONENTS = ['industry-filter', 'company-size-filter', 'plan-name-filter', 'billing-frequency-filter']
+FILTER_KEY_OUTPUT = 'filter-key.data'
+SESSION_ID = ('session-id', 'data')
+
+
+# --- Server ---
+def serve(data_dir, port=0):
+    # Runs dash_dashboard.py on a threaded WSGI server against `data_dir` and
+    # prints 'READY <port>' once it accepts requests.
+    from werkzeug.serving import make_server
+
+    os.environ['DASHBOARD_RELOAD_INTERVAL'] = '0'
+    with working_directory(data_dir):
+        import dash_dashboard
+        server = make_server('127.0.0.1', port, dash_dashboard.app.server, threaded=True)
+        print(f'READY {server.server_port}', flush=True)
+        # Nothing reads the pipe after this line; keep request logs out of it too.
+        sys.stdout = open(os.devnull, 'w')
+        logging.getLogger('werkzeug').setLevel(logging.ERROR)
+        server.serve_forever()
+
+
+def start_server(data_dir, timeout=1800):
+    # Starts the server in a child process, so the load generator's threads do
+    # not compete with the callbacks for the same interpreter lock.
+    # Its cache directory is set before anything imports data_loader.
+    env = dict(os.environ, DASHBOARD_CACHE_DIR=dataset_cache_dir(data_dir))
+    process = subprocess.Popen([sys.executable, '-m', 'benchmarks.load_test', os.path.abspath(data_dir)],
+                               cwd=REPO_ROOT, env=env, stdout=subprocess.PIPE, text=True)
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        line = process.stdout.readline()
+        if line.startswith('READY '):
+            return process, f'http://127.0.0.1:{int(line.split()[1])}'
+        if not line and process.poll() is not None:
+            break
+    process.kill()
+    raise RuntimeError(f"Dash server for '{data_dir}' did not start.")
+
+
+# --- Client ---
+def _request(base_url, path, payload=None):
+    data = None if payload is None else json.dumps(payload).encode()
+    request = urllib.request.Request(base_url + path, data=data, headers={'Content-Type': 'application/json'})
+    with urllib.request.urlopen(request, timeout=300) as response:
+        body = response.read()
+    # 204: the callback sent no update
+    return json.loads(body) if body else None
+
+
+def _layout_values(node, values):
+    # Collects the initial value of every property of every component with an id.
+    if isinstance(node, list):
+        for child in node:
+            _layout_values(child, values)
+    elif isinstance(node, dict):
+        props = node.get('props', {})
+        if 'id' in props:
+            for prop, value in props.items():
+                values[(props['id'], prop)] = value
+        _layout_values(props.get('children'), values)
+    return values
+
+
+def _parse_outputs(output):
+    # '..a.x...b.y..' -> [('a', 'x'), ('b', 'y')]; 'a.x' -> [('a', 'x')]
+    multi = output.startswith('..')
+    parts = output[2:-2].split('...') if multi else [output]
+    return multi, [tuple(part.rsplit('.', 1)) for part in parts]
+
+
+def _payload(dependency, values):
+    multi, outputs = _parse_outputs(dependency['output'])
+    outputs = [{'id': component, 'property': prop} for component, prop in outputs]
+    inputs = [dict(item, value=values.get((item['id'], item['property']))) for item in dependency['inputs']]
+    state = [dict(item, value=values.get((item['id'], item['property']))) for item in dependency['state']]
+    return {'output': dependency['output'],
+            'outputs': outputs if multi else outputs[0],
+            'inputs': inputs,
+            'state': state,
+            'changedPropIds': [f"{item['id']}.{item['property']}" for item in dependency['inputs']]}
+
+
+class Workload:
+    # One simulated interaction per filter in the matrix: the dropdown values
+    # change, the filter-key callback runs, and then every callback that
+    # depends on the filter key runs with its result - the same requests the
+    # browser sends, built from the app's own /_dash-dependencies and layout.
+
+    def __init__(self, base_url):
+        self.base_url = base_url
+        dependencies = _request(base_url, '/_dash-dependencies')
+        self.values = _layout_values(_request(base_url, '/_dash-layout'), {})
+        self.filter_callback = next(dep for dep in dependencies if dep['output'] == FILTER_KEY_OUTPUT)
+        self.dependents = [dep for dep in dependencies
+                           if any(f"{item['id']}.{item['property']}" == FILTER_KEY_OUTPUT for item in dep['inputs'])]
+        options = {dim: [option['value'] for option in self.values[(component, 'options')]]
+                   for dim, component in zip(DIMENSIONS, FILTER_COMPONENTS)}
+        self.filters = list(filter_matrix(options).values())
+
+    def interaction(self, index, record):
+        values = dict(self.values)
+        if SESSION_ID in values:
+            # Each simulated user is its own browser session.
+            values[SESSION_ID] = f'load-test-{threading.get_ident()}'
+        for component, selected in zip(FILTER_COMPONENTS, self.filters[index % len(self.filters)]):
+            values[(component, 'value')] = selected
+        response = self._call(self.filter_callback, values, record)
+        if response is not None:
+            component, prop = FILTER_KEY_OUTPUT.split('.')
+            values[(component, prop)] = response['response'][component][prop]
+            for dependency in self.dependents:
+                self._call(dependency, values, record)
+
+    def _call(self, dependency, values, record):
+        started = time.perf_counter()
+        try:
+            response = _request(self.base_url, '/_dash-update-component', _payload(dependency, values))
+        except Exception:
+            record(dependency['output'], time.perf_counter() - started, False)
+            return None
+        record(dependency['output'], time.perf_counter() - started, True)
+        return response
+
+
+def percentiles(durations):
+    if not durations:
+        return {'p50_ms': None, 'p99_ms': None, 'mean_ms': None}
+    values = np.asarray(durations) * 1000
+    return {'p50_ms': round(float(np.percentile(values, 50)), 3),
+            'p99_ms': round(float(np.percentile(values, 99)), 3),
+            'mean_ms': round(float(values.mean()), 3)}
+
+
+def run_load(base_url, concurrency=8, interactions=200, warmup=True):
+    # Replays `interactions` filter changes from `concurrency` simulated users
+    # and reports latency percentiles per callback plus overall throughput.
+    workload = Workload(base_url)
+    if warmup:
+        # First request per filter builds lru-cached masks; measure steady state.
+        for index in range(len(workload.filters)):
+            workload.interaction(index, lambda *args: None)
+
+    lock = threading.Lock()
+    samples = {}
+    failures = {}
+    interaction_times = []
+
+    def record(output, duration, ok):
+        with lock:
+            if ok:
+                samples.setdefault(output, []).append(duration)
+            else:
+                failures[output] = failures.get(output, 0) + 1
+
+    def user(index):
+        started = time.perf_counter()
+        workload.interaction(index, record)
+        with lock:
+            interaction_times.append(time.perf_counter() - started)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(user, range(interactions)))
+    elapsed = time.perf_counter() - started
+
+    all_samples = [duration for durations in samples.values() for duration in durations]
+    return {
+        'concurrency': concurrency,
+        'interactions': interactions,
+        'requests': len(all_samples),
+        'errors': sum(failures.values()),
+        'duration_s': round(elapsed, 3),
+        'throughput_rps': round(len(all_samples) / elapsed, 2),
+        'interactions_per_s': round(interactions / elapsed, 2),
+        'latency': percentiles(all_samples),
+        'interaction_latency': percentiles(interaction_times),
+        'callbacks': {output: dict(percentiles(samples.get(output, [])),
+                                   requests=len(samples.get(output, [])), errors=failures.get(output, 0))
+                      for output in sorted(set(samples) | set(failures))},
+    }
+
+
+def load_test(data_dir, concurrency=8, interactions=200):
+    process, base_url = start_server(data_dir)
+    try:
+        return run_load(base_url, concurrency, interactions)
+    finally:
+        process.terminate()
+        process.wait()
+
+
+if __name__ == '__main__':
+    serve(sys.argv[1])
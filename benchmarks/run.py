@@ -0,0 +1,135 @@
+import argparse
+import datetime
+import json
+import os
+import platform
+import subprocess
+import sys
+
+# Callbacks are benchmarked against a fixed snapshot; never start the reloader thread.
+os.environ.setdefault('DASHBOARD_RELOAD_INTERVAL', '0')
+
+import numpy as np  # noqa: E402
+import pandas as pd  # noqa: E402
+
+from benchmarks import REPO_ROOT  # noqa: E402
+from benchmarks.load_test import load_test  # noqa: E402
+from benchmarks.stages import time_stages, time_streamlit_reruns  # noqa: E402
+from benchmarks.synthetic import write_dataset  # noqa: E402
+
+# Usage, from the repository root:
+#
+#   python -m benchmarks.run --output results.json
+#   python -m benchmarks.run --rows 10000 --baseline results.json
+#
+# Generated datasets are kept in --work-dir and reused across runs. With
+# --baseline, stage medians and callback p99s slower than the baseline by more
+# than --tolerance are listed and the exit status is 1.
+DEFAULT_ROWS = [10000, 1000000, 10000000]
+DEFAULT_WORK_DIR = os.path.join(REPO_ROOT, '.bench_data')
+
+
+def _git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def environment():
+    return {'timestamp': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'commit': _git_commit(),
+            'python': platform.python_version(),
+            'pandas': pd.__version__,
+            'numpy': np.__version__,
+            'platform': platform.platform(),
+            'cpus': os.cpu_count()}
+
+
+def benchmark(n_rows, args):
+    data_dir = write_dataset(os.path.join(args.work_dir, f'rows-{n_rows}'), n_rows, args.seed)
+    print(f'[{n_rows} rows] timing stages', file=sys.stderr)
+    result = time_stages(data_dir, repeat=args.repeat)
+    if not args.skip_streamlit:
+        print(f'[{n_rows} rows] timing Streamlit reruns', file=sys.stderr)
+        result['streamlit'] = time_streamlit_reruns(data_dir)
+    if not args.skip_load:
+        print(f'[{n_rows} rows] load testing Dash callbacks', file=sys.stderr)
+        result['load_test'] = load_test(data_dir, args.concurrency, args.interactions)
+    return result
+
+
+# --- Regression check ---
+def _metrics(result):
+    # Flattens one dataset's results to {name: milliseconds} for comparison.
+    metrics = {}
+    stages = result.get('stages', {})
+    for stage, timing in stages.items():
+        if 'median_ms' in timing:
+            metrics[f'stages.{stage}'] = timing['median_ms']
+    for name, per_stage in stages.get('per_filter', {}).items():
+        for stage, timing in per_stage.items():
+            metrics[f'stages.{name}.{stage}'] = timing['median_ms']
+    for output, timing in result.get('load_test', {}).get('callbacks', {}).items():
+        if timing['p99_ms'] is not None:
+            metrics[f'load_test.{output}.p99'] = timing['p99_ms']
+    return metrics
+
+
+def compare(results, baseline, tolerance, floor_ms=1.0):
+    # Metrics slower than the baseline by more than `tolerance` (a fraction).
+    # Timings under `floor_ms` in both runs are too noisy to compare.
+    regressions = []
+    for rows, result in results['datasets'].items():
+        previous = _metrics(baseline.get('datasets', {}).get(rows, {}))
+        for name, value in _metrics(result).items():
+            before = previous.get(name)
+            if before is None or max(before, value) < floor_ms:
+                continue
+            if value > before * (1 + tolerance):
+                regressions.append({'rows': int(rows), 'metric': name, 'baseline_ms': before, 'current_ms': value,
+                                    'change': round(value / before - 1, 3) if before else None})
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the dashboard data path and Dash callbacks.')
+    parser.add_argument('--rows', type=int, nargs='+', default=DEFAULT_ROWS, help='dataset sizes to generate')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--repeat', type=int, default=5, help='runs per timed stage')
+    parser.add_argument('--concurrency', type=int, default=8, help='simulated concurrent users')
+    parser.add_argument('--interactions', type=int, default=200, help='filter changes replayed per load test')
+    parser.add_argument('--skip-load', action='store_true', help='do not start a Dash server')
+    parser.add_argument('--skip-streamlit', action='store_true', help='do not run streamlit_app.py')
+    parser.add_argument('--work-dir', default=DEFAULT_WORK_DIR, help='where generated datasets are kept')
+    parser.add_argument('--output', help='write the JSON results here instead of stdout')
+    parser.add_argument('--baseline', help='earlier JSON results to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.25, help='allowed slowdown against the baseline')
+    args = parser.parse_args(argv)
+
+    results = {'environment': environment(), 'datasets': {}}
+    for n_rows in args.rows:
+        results['datasets'][str(n_rows)] = benchmark(n_rows, args)
+
+    status = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare(results, json.load(f), args.tolerance)
+        results['regressions'] = regressions
+        for regression in regressions:
+            print(f"Regression at {regression['rows']} rows: {regression['metric']} "
+                  f"{regression['baseline_ms']}ms -> {regression['current_ms']}ms", file=sys.stderr)
+        status = 1 if regressions else 0
+
+    text = json.dumps(results, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return status
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,227 @@
+import contextlib
+import datetime
+import json
+import os
+import shutil
+import statistics
+import time
+
+import plotly.io as pio
+
+import data_loader
+from benchmarks import REPO_ROOT
+from customer_table import page_records
+from data_loader import load_unit_economics
+from figures import distribution_figures, segment_figures
+from filter_index import DIMENSIONS, filter_selections, normalize_filter_key, split_filter_key
+from kpi_engine import kpis_for_rows
+from segment_cells import SegmentCells
+from segment_cube import SegmentCube, build_segments
+from snapshot import DataSnapshot
+from sql_backend import SQLiteSnapshot, build_database
+
+# Columns the distribution charts bin and dimensions the segment charts roll up by.
+HISTOGRAM_COLUMNS = ['LTV_CAC_Ratio', 'CAC_Payback_Months', 'Customer_Health_Score']
+ROLLUP_DIMENSIONS = ['industry', 'company_size', 'plan_name']
+
+TABLE_PAGE_SIZE = 15
+
+
+def dataset_cache_dir(data_dir):
+    # The Parquet cache used while benchmarking `data_dir`, kept inside it so
+    # clearing it never touches a deployment's DASHBOARD_CACHE_DIR.
+    return os.path.join(os.path.abspath(data_dir), '.data_cache')
+
+
+@contextlib.contextmanager
+def working_directory(path):
+    # The apps resolve the CSVs relative to the working directory, so a dataset
+    # directory stands in for a deployment; the Parquet cache moves with it.
+    previous = os.getcwd(), data_loader.CACHE_DIR
+    data_loader.CACHE_DIR = dataset_cache_dir(path)
+    os.chdir(path)
+    try:
+        yield
+    finally:
+        os.chdir(previous[0])
+        data_loader.CACHE_DIR = previous[1]
+
+
+def filter_matrix(options, last_date=None):
+    # Named filter selections, from no restriction down to an empty result.
+    # `options` maps each dimension to its values; with `last_date`, a
+    # contract end date window over the last year of data is included too.
+    def key(date_range=None, **chosen):
+        return normalize_filter_key(*[chosen.get(dim, options[dim]) for dim in DIMENSIONS], date_range=date_range)
+
+    matrix = {
+        'all': key(),
+        'one_industry': key(industry=options['industry'][:1]),
+        'half_of_each': key(**{dim: values[:max(1, len(values) // 2)] for dim, values in options.items()}),
+        'one_cell': key(**{dim: values[:1] for dim, values in options.items()}),
+        'empty': key(industry=[]),
+    }
+    if last_date is not None:
+        matrix['last_year'] = key(date_range=(last_date - datetime.timedelta(days=365), last_date))
+    return matrix
+
+
+def summarize(durations):
+    durations = sorted(durations)
+    return {'runs': len(durations),
+            'median_ms': round(statistics.median(durations) * 1000, 3),
+            'min_ms': round(durations[0] * 1000, 3),
+            'max_ms': round(durations[-1] * 1000, 3)}
+
+
+def _timed(fn, repeat):
+    durations = []
+    result = None
+    for _ in range(repeat):
+        started = time.perf_counter()
+        result = fn()
+        durations.append(time.perf_counter() - started)
+    return durations, result
+
+
+# --- Per-stage timings ---
+def time_stages(data_dir, repeat=5):
+    # Times every stage of a dashboard update against the dataset in
+    # `data_dir`. Per-filter stages are run uncached on the snapshot's engines,
+    # so the numbers are what a first request for that selection costs.
+    with working_directory(data_dir):
+        shutil.rmtree(dataset_cache_dir(data_dir), ignore_errors=True)
+        results = {}
+        durations, _ = _timed(load_unit_economics, 1)
+        results['load_csv'] = summarize(durations)
+        durations, df_unit_economics = _timed(load_unit_economics, repeat)
+        results['load_cached'] = summarize(durations)
+        durations, _ = _timed(lambda: build_segments(df_unit_economics), repeat)
+        results['build_segments'] = summarize(durations)
+        durations, snapshot = _timed(lambda: DataSnapshot(df_unit_economics), 1)
+        results['build_snapshot'] = summarize(durations)
+        db_path = os.path.join(dataset_cache_dir(data_dir), 'benchmark.sqlite')
+        durations, _ = _timed(lambda: build_database(db_path=db_path), 1)
+        results['build_sqlite'] = summarize(durations)
+        sql_snapshot = SQLiteSnapshot(db_path)
+
+        options = {dim: snapshot.filter_options(dim) for dim in DIMENSIONS}
+        per_filter = {}
+        for name, filter_key in filter_matrix(options, snapshot.date_index.last_date).items():
+            per_filter[name] = _time_filter_stages(snapshot, filter_key, repeat)
+            per_filter[name].update(_time_sql_stages(sql_snapshot, filter_key, repeat))
+        results['per_filter'] = per_filter
+        return {'rows': len(df_unit_economics), 'stages': results}
+
+
+def _time_filter_stages(snapshot, filter_key, repeat):
+    # A date window moves the aggregates from per-cell partials to the rows
+    # the date index selects, as the snapshot does.
+    dimension_key, _ = split_filter_key(filter_key)
+    window = snapshot.date_window(filter_key)
+    selections = filter_selections(*dimension_key)
+    cell_mask = snapshot.segment_cells.cell_mask(selections)
+    stages = {}
+
+    def row_mask():
+        mask = snapshot.unit_economics_index.mask(selections)
+        if window is not None:
+            mask &= snapshot.date_index.mask(*window)
+        return mask
+    durations, mask = _timed(row_mask, repeat)
+    stages['filter'] = summarize(durations)
+    stages['filter']['matched_rows'] = int(mask.sum())
+
+    durations, _ = _timed(lambda: snapshot.segment_cells.cell_mask(selections), repeat)
+    stages['cell_filter'] = summarize(durations)
+
+    if window is None:
+        durations, _ = _timed(lambda: snapshot.kpi_engine.kpis(selections), repeat)
+    else:
+        durations, _ = _timed(lambda: kpis_for_rows(snapshot.df_unit_economics, mask), repeat)
+    stages['kpi'] = summarize(durations)
+
+    if window is None:
+        durations, _ = _timed(lambda: [snapshot.histogram_engine.counts_for_cells(col, cell_mask)
+                                       for col in HISTOGRAM_COLUMNS], repeat)
+    else:
+        durations, _ = _timed(lambda: [snapshot.histogram_engine.counts_for_rows(col, mask)
+                                       for col in HISTOGRAM_COLUMNS], repeat)
+    stages['histogram'] = summarize(durations)
+
+    def rollups():
+        if window is None:
+            return [snapshot.segment_cube.rollup(dim, cell_mask) for dim in ROLLUP_DIMENSIONS]
+        rows = snapshot.df_unit_economics[mask]
+        cube = SegmentCube(rows, SegmentCells(rows))
+        return [cube.rollup(dim) for dim in ROLLUP_DIMENSIONS]
+    durations, _ = _timed(rollups, repeat)
+    stages['groupby'] = summarize(durations)
+
+    durations, _ = _timed(lambda: snapshot.trend(filter_key), repeat)
+    stages['trend'] = summarize(durations)
+
+    def table():
+        positions = snapshot.customer_positions(filter_key, False, 'LTV_CAC_Ratio', False, limit=TABLE_PAGE_SIZE)
+        return json.dumps(page_records(snapshot.df_unit_economics, positions, 0, TABLE_PAGE_SIZE))
+    durations, _ = _timed(table, repeat)
+    stages['table_serialization'] = summarize(durations)
+
+    durations, figures = _timed(lambda: (*distribution_figures(snapshot, filter_key),
+                                         *segment_figures(snapshot, filter_key)), repeat)
+    stages['figures'] = summarize(durations)
+
+    durations, encoded = _timed(lambda: [pio.to_json(fig, validate=False) for fig in figures], repeat)
+    stages['figure_json'] = summarize(durations)
+    stages['figure_json']['bytes'] = sum(len(text) for text in encoded)
+    return stages
+
+
+def _time_sql_stages(snapshot, filter_key, repeat):
+    # The same aggregates answered by the SQLite backend (DASHBOARD_BACKEND=sqlite).
+    stages = {}
+    durations, _ = _timed(lambda: snapshot.kpis(filter_key), repeat)
+    stages['sql_kpi'] = summarize(durations)
+    durations, _ = _timed(lambda: [snapshot.histogram_counts(filter_key, col) for col in HISTOGRAM_COLUMNS], repeat)
+    stages['sql_histogram'] = summarize(durations)
+    durations, _ = _timed(lambda: [snapshot.segment_rollup(filter_key, dim) for dim in ROLLUP_DIMENSIONS], repeat)
+    stages['sql_groupby'] = summarize(durations)
+    durations, _ = _timed(lambda: snapshot.trend(filter_key), repeat)
+    stages['sql_trend'] = summarize(durations)
+    durations, _ = _timed(lambda: json.dumps(snapshot.customer_rows(
+        filter_key, False, 'LTV_CAC_Ratio', False, limit=TABLE_PAGE_SIZE).to_dict('records')), repeat)
+    stages['sql_table_serialization'] = summarize(durations)
+    return stages
+
+
+# --- Streamlit reruns ---
+def time_streamlit_reruns(data_dir, timeout=600):
+    # Drives streamlit_app.py through its test harness: one cold run (load and
+    # index), then a rerun per filter in the matrix and a repeat of each, which
+    # is served from st.cache_data.
+    import streamlit as st
+    from streamlit.testing.v1 import AppTest
+
+    with working_directory(data_dir):
+        # Cached resources are process-wide; never reuse another dataset's snapshot.
+        st.cache_resource.clear()
+        st.cache_data.clear()
+        app = AppTest.from_file(os.path.join(REPO_ROOT, 'streamlit_app.py'), default_timeout=timeout)
+        started = time.perf_counter()
+        app.run()
+        results = {'cold_run': summarize([time.perf_counter() - started])}
+
+        options = {dim: app.sidebar.multiselect[i].options for i, dim in enumerate(DIMENSIONS)}
+        reruns = {}
+        for name, filter_key in filter_matrix(options).items():
+            durations = []
+            for _ in range(2):
+                for i, values in enumerate(filter_key):
+                    app.sidebar.multiselect[i].set_value(values)
+                started = time.perf_counter()
+                app.run()
+                durations.append(time.perf_counter() - started)
+            reruns[name] = {'first_ms': round(durations[0] * 1000, 3), 'cached_ms': round(durations[1] * 1000, 3)}
+        results['reruns'] = reruns
+        results['exceptions'] = [exception.value for exception in app.exception]
+        return results
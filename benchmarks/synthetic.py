@@ -0,0 +1,100 @@
+import os
+
+import numpy as np
+import pandas as pd
+
+from benchmarks import REPO_ROOT  # noqa: F401  (puts the dashboard modules on sys.path)
+from data_loader import UNIT_ECONOMICS_CSV
+from schema import unpack_uuids, uuids_from_bytes
+
+# Value frequencies of the dimension columns in the real unit_economics.csv,
+# so synthetic data has the same cardinalities and a similar skew.
+DIMENSION_FREQUENCIES = {
+    'industry': {'Finance': 0.096, 'Consulting': 0.096, 'Legal': 0.090, 'Marketing': 0.088,
+                 'Media': 0.088, 'Non-profit': 0.082, 'Retail': 0.081, 'Manufacturing': 0.081,
+                 'Technology': 0.079, 'Education': 0.076, 'Healthcare': 0.071, 'Real Estate': 0.070},
+    'company_size': {'Medium (51-200)': 0.212, 'Startup (1-10)': 0.204, 'Enterprise (1000+)': 0.199,
+                     'Large (201-1000)': 0.196, 'Small (11-50)': 0.188},
+    'plan_name': {'Professional': 0.262, 'Business': 0.254, 'Starter': 0.246, 'Enterprise': 0.238},
+    'billing_frequency': {'monthly': 0.518, 'annual': 0.482},
+}
+
+# Median monthly revenue per plan; revenue is log-normal around it.
+PLAN_MONTHLY_REVENUE = {'Starter': 100.0, 'Professional': 450.0, 'Business': 2300.0, 'Enterprise': 4500.0}
+
+# Column order of unit_economics.csv.
+UNIT_ECONOMICS_COLUMNS = ['customer_id', 'CAC', 'industry', 'company_size', 'LTV', 'Monthly_Revenue',
+                          'plan_name', 'billing_frequency', 'Total_Revenue', 'Avg_Sentiment_Score',
+                          'Active_Days', 'Usage_Events', 'Usage_Score', 'latest_end', 'Churned',
+                          'LTV_CAC_Ratio', 'CAC_Payback_Months', 'Customer_Health_Score']
+
+
+def _choice(rng, frequencies, n_rows):
+    values = np.array(list(frequencies))
+    weights = np.array(list(frequencies.values()))
+    return values[rng.choice(len(values), size=n_rows, p=weights / weights.sum())]
+
+
+def _customer_ids(rng, n_rows):
+    # Random version-4 UUIDs, formatted with the same vectorized code the app uses.
+    raw = rng.integers(0, 256, size=(n_rows, 16), dtype=np.uint8)
+    raw[:, 6] = (raw[:, 6] & 0x0F) | 0x40
+    raw[:, 8] = (raw[:, 8] & 0x3F) | 0x80
+    return unpack_uuids(uuids_from_bytes(raw)).to_numpy()
+
+
+def generate_unit_economics(n_rows, seed=0):
+    # A customer frame shaped like unit_economics.csv (same columns, dtypes,
+    # missing values and rough distributions) with `n_rows` rows.
+    rng = np.random.default_rng(seed)
+    df = pd.DataFrame({'customer_id': _customer_ids(rng, n_rows)})
+    for dim, frequencies in DIMENSION_FREQUENCIES.items():
+        df[dim] = _choice(rng, frequencies, n_rows)
+
+    median_revenue = df['plan_name'].map(PLAN_MONTHLY_REVENUE).to_numpy()
+    monthly_revenue = np.round(median_revenue * rng.lognormal(0.0, 1.0, n_rows), 2)
+    cac = np.round(rng.lognormal(np.log(155.0), 0.8, n_rows), 2)
+    lifetime_months = rng.lognormal(np.log(30.0), 1.5, n_rows)
+    active_days = np.maximum(14, rng.lognormal(np.log(1460.0), 1.4, n_rows)).astype(np.int64)
+    ltv = np.round(monthly_revenue * lifetime_months * rng.uniform(0.2, 1.0, n_rows) - cac, 2)
+
+    df['CAC'] = cac
+    df['LTV'] = ltv
+    df['Monthly_Revenue'] = monthly_revenue
+    df['Total_Revenue'] = np.round(monthly_revenue * rng.uniform(0.0, 36.0, n_rows), 1)
+    df['Avg_Sentiment_Score'] = np.where(rng.random(n_rows) < 0.22, np.nan,
+                                         rng.choice([-1.0, -0.5, 0.0, 0.5, 1.0], size=n_rows))
+
+    # Customers without usage records have no activity columns at all.
+    no_usage = rng.random(n_rows) < 0.013
+    df['Active_Days'] = np.where(no_usage, np.nan, active_days)
+    df['Usage_Events'] = np.where(no_usage, np.nan, active_days + rng.integers(0, 5, n_rows))
+    df['Usage_Score'] = np.where(no_usage, np.nan, 1.0)
+
+    start = np.datetime64('2022-01-01')
+    df['latest_end'] = (start + rng.integers(0, 13 * 365, n_rows).astype('timedelta64[D]')).astype(str)
+    df['Churned'] = (rng.random(n_rows) < 0.56).astype(np.int64)
+    df['LTV_CAC_Ratio'] = np.round(ltv / cac, 2)
+    df['CAC_Payback_Months'] = np.round(cac / monthly_revenue, 1)
+    df['Customer_Health_Score'] = np.round(np.clip(rng.normal(0.56, 0.2, n_rows), -0.3, 1.01), 2)
+    return df[UNIT_ECONOMICS_COLUMNS]
+
+
+def write_dataset(directory, n_rows, seed=0):
+    # Writes unit_economics.csv into `directory` (reused when already generated with the
+    # same size and seed) and returns the directory.
+    marker = os.path.join(directory, '.generated')
+    stamp = f'{n_rows} {seed}'
+    try:
+        with open(marker) as f:
+            if f.read() == stamp:
+                return directory
+    except FileNotFoundError:
+        pass
+
+    os.makedirs(directory, exist_ok=True)
+    df = generate_unit_economics(n_rows, seed)
+    df.to_csv(os.path.join(directory, UNIT_ECONOMICS_CSV), index=False, chunksize=500000)
+    with open(marker, 'w') as f:
+        f.write(stamp)
+    return directory
@@ -0,0 +1,90 @@
+import collections
+import os
+import threading
+from concurrent.futures import FIRST_COMPLETED, Future, ThreadPoolExecutor, wait
+
+# Threads that compute callback results; request threads only wait on them.
+CALLBACK_WORKERS = int(os.environ.get('DASHBOARD_CALLBACK_WORKERS', str(min(8, os.cpu_count() or 1))))
+
+# Browser sessions whose latest request per callback is remembered.
+MAX_CHANNELS = 10000
+
+
+class Superseded(Exception):
+    # A newer request from the same session and callback arrived while this one waited.
+    pass
+
+
+class _Flight:
+    def __init__(self, future):
+        self.future = future
+        self.waiters = 0
+
+
+class CallbackExecutor:
+    # Bounded executor for callback computations.
+    #
+    # Requests for the same key (e.g. callback, snapshot version and filter
+    # key) that are in flight at the same time share one computation. Each
+    # request may also name a channel (one browser session and callback): a
+    # newer request on the channel supersedes the older one, whose wait ends
+    # with Superseded. A computation nobody waits for any more is cancelled
+    # if it has not started; running ones finish, as Python threads cannot be
+    # interrupted.
+
+    def __init__(self, max_workers=CALLBACK_WORKERS):
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='callback')
+        # Re-entrant: cancelling a future runs its done callback (_land) on this thread.
+        self._lock = threading.RLock()
+        self._flights = {}
+        self._channels = collections.OrderedDict()
+        self.stats = collections.Counter()
+
+    def run(self, key, fn, channel=None):
+        superseded = Future()
+        with self._lock:
+            if channel is not None:
+                previous = self._channels.pop(channel, None)
+                if previous is not None:
+                    previous.set_result(True)
+                self._channels[channel] = superseded
+                while len(self._channels) > MAX_CHANNELS:
+                    self._channels.popitem(last=False)
+
+            flight = self._flights.get(key)
+            if flight is None:
+                flight = self._flights[key] = _Flight(self._pool.submit(fn))
+                flight.future.add_done_callback(lambda future: self._land(key, flight))
+                self.stats['computed'] += 1
+            else:
+                self.stats['coalesced'] += 1
+            flight.waiters += 1
+
+        try:
+            wait([flight.future, superseded], return_when=FIRST_COMPLETED)
+            if not flight.future.done():
+                self._abandon(key, flight)
+                raise Superseded()
+            return flight.future.result()
+        finally:
+            with self._lock:
+                flight.waiters -= 1
+                if channel is not None and self._channels.get(channel) is superseded:
+                    del self._channels[channel]
+
+    def _land(self, key, flight):
+        with self._lock:
+            if self._flights.get(key) is flight:
+                del self._flights[key]
+
+    def _abandon(self, key, flight):
+        with self._lock:
+            self.stats['superseded'] += 1
+            # This waiter is still counted; cancel only when it was the last one.
+            if flight.waiters == 1 and flight.future.cancel():
+                self.stats['cancelled'] += 1
+                if self._flights.get(key) is flight:
+                    del self._flights[key]
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
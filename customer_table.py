@@ -0,0 +1,310 @@
+import re
+import threading
+
+import numpy as np
+import pandas as pd
+
+from schema import display_series, is_packed_uuid, uuid_bytes
+
+# Columns shown in the customer list, in display order.
+DISPLAY_COLUMNS = ['customer_id', 'industry', 'company_size', 'plan_name',
+                   'LTV', 'CAC', 'LTV_CAC_Ratio', 'CAC_Payback_Months',
+                   'Monthly_Revenue', 'Customer_Health_Score', 'Churned', 'latest_end',
+                   'Avg_Sentiment_Score', 'Active_Days', 'Usage_Events', 'Usage_Score']
+
+# Columns both apps offer in their "Sort Customer List by" controls. Only these
+# get a pre-sorted permutation; any other column is ordered per request by
+# partial selection (top_n).
+SORT_COLUMNS = ['customer_id', 'LTV_CAC_Ratio', 'CAC_Payback_Months', 'Customer_Health_Score',
+                'Monthly_Revenue', 'latest_end']
+
+DATE_FORMAT = '%Y-%m-%d'
+
+
+def display_columns(df):
+    # Ensure only columns present in the dataframe are selected
+    return [col for col in DISPLAY_COLUMNS if col in df.columns]
+
+
+def table_columns(df):
+    columns = []
+    for col in display_columns(df):
+        column = {'name': col.replace('_', ' ').title(), 'id': col}
+        if pd.api.types.is_numeric_dtype(df[col]):
+            column['type'] = 'numeric'
+        elif pd.api.types.is_datetime64_any_dtype(df[col]):
+            column['type'] = 'datetime'
+        else:
+            column['type'] = 'text'
+        columns.append(column)
+    return columns
+
+
+# --- Sorting ---
+def _rank_keys(values, ascending):
+    # Float sort keys for partial selection (smallest first); missing values
+    # last. None when the column cannot be ranked numerically.
+    if pd.api.types.is_datetime64_any_dtype(values.dtype):
+        missing = np.isnat(values)
+        keys = values.astype('datetime64[ns]').astype(np.int64).astype(float)
+    elif pd.api.types.is_numeric_dtype(values.dtype) or pd.api.types.is_bool_dtype(values.dtype):
+        keys = values.astype(float)
+        missing = np.isnan(keys)
+    else:
+        return None
+    keys = keys if ascending else -keys
+    keys[missing] = np.inf
+    return keys
+
+
+def top_n(values, positions, n, ascending=True):
+    # The first `n` of `positions` ordered by `values`, via an O(len) partial
+    # selection (argpartition) and a sort of the n winners only. The order is
+    # SortIndex's: ties keep position order and a descending order is the
+    # ascending one backwards, except that missing values go last in position order.
+    subset = np.asarray(values)[positions]
+    keys = _rank_keys(subset, ascending)
+    if keys is None:
+        order = _ascending_order(pd.Series(subset), np.int64)
+        if not ascending:
+            n_valid = len(subset) - int(pd.isna(subset).sum())
+            order = np.concatenate([order[:n_valid][::-1], order[n_valid:]])
+        return positions[order[:n]]
+    if n <= 0:
+        return positions[:0]
+    ties = np.arange(len(keys))
+    if not ascending:
+        ties = np.where(pd.isna(subset), ties, -ties)
+    if n < len(keys):
+        kth = np.partition(keys, n - 1)[n - 1]
+        below = np.flatnonzero(keys < kth)
+        at = np.flatnonzero(keys == kth)
+        chosen = np.concatenate([below, at[np.argsort(ties[at], kind='stable')][:n - len(below)]])
+    else:
+        chosen = np.arange(len(keys))
+    return positions[chosen[np.lexsort((ties[chosen], keys[chosen]))]]
+
+
+def _ascending_order(series, dtype):
+    # Stable ascending row order with missing values last.
+    if is_packed_uuid(series):
+        # Big-endian words of the 16 bytes order like the canonical UUID strings
+        words = np.ascontiguousarray(uuid_bytes(series)).view('>u8')
+        return np.lexsort((words[:, 1], words[:, 0])).astype(dtype)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        codes = series.cat.codes.to_numpy()
+        # Categories are sorted labels; missing values (-1) go after all of them
+        codes = np.where(codes < 0, len(series.cat.categories), codes)
+        return np.argsort(codes, kind='stable').astype(dtype)
+    return np.argsort(series.to_numpy(), kind='stable').astype(dtype)
+
+
+class SortIndex:
+    # Row permutations for the offered sort columns, computed over the full
+    # frame. Sorting a filtered subset is then a boolean gather along the
+    # permutation (O(n)) instead of a fresh O(n log n) sort per request, and a
+    # page or top-N only walks the permutation until it has enough rows.
+    #
+    # Each permutation is built on first use and only the ascending one is
+    # kept: the descending order is its non-missing part walked backwards,
+    # followed by the missing rows. Positions are int32 when they fit.
+
+    def __init__(self, df, columns=SORT_COLUMNS):
+        self.df = df
+        self.n_rows = len(df)
+        self.columns = [col for col in columns if col in df.columns]
+        self._dtype = np.int32 if self.n_rows < np.iinfo(np.int32).max else np.int64
+        self._ascending = {}
+        self._n_valid = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, column):
+        return column in self.columns
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state['_lock']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._lock = threading.Lock()
+
+    def _segments(self, column, ascending):
+        # The requested order as views into the ascending permutation.
+        if column not in self._ascending:
+            with self._lock:
+                if column not in self._ascending:
+                    values = self.df[column]
+                    self._n_valid[column] = self.n_rows - int(values.isna().sum())
+                    self._ascending[column] = _ascending_order(values, self._dtype)
+        permutation, n_valid = self._ascending[column], self._n_valid[column]
+        if ascending:
+            return [permutation]
+        # Missing values sort last in both directions, as with DataFrame.sort_values.
+        return [permutation[:n_valid][::-1], permutation[n_valid:]]
+
+    def _walk(self, segments, mask, needed):
+        # Gathers matching rows block by block, doubling the block size, so a
+        # selective filter scans only as much of the permutation as it needs.
+        found = []
+        n_found = 0
+        block = max(4 * needed, 4096)
+        for segment in segments:
+            start = 0
+            while start < len(segment) and n_found < needed:
+                chunk = segment[start:start + block]
+                hits = chunk[mask[chunk]]
+                found.append(hits)
+                n_found += len(hits)
+                start += block
+                block *= 2
+        return np.concatenate(found) if found else np.zeros(0, dtype=self._dtype)
+
+    def order(self, mask, column=None, ascending=True, offset=0, limit=None):
+        # Positions of the rows selected by `mask`, in the requested order;
+        # with `limit`, only the `limit` rows starting at `offset`.
+        end = None if limit is None else offset + limit
+        if column in self.columns:
+            segments = self._segments(column, ascending)
+            if end is None:
+                return np.concatenate([segment[mask[segment]] for segment in segments])[offset:]
+            return self._walk(segments, mask, end)[offset:end]
+        positions = np.flatnonzero(mask)
+        if column is None or column not in self.df.columns:
+            return positions[offset:end]
+        values = self.df[column].to_numpy()
+        return top_n(values, positions, len(positions) if end is None else end, ascending)[offset:end]
+
+
+# --- DataTable filter_query translation ---
+_OPERATORS = {
+    '>=': 'ge', 'ge': 'ge',
+    '<=': 'le', 'le': 'le',
+    '!=': 'ne', 'ne': 'ne',
+    '<': 'lt', 'lt': 'lt',
+    '>': 'gt', 'gt': 'gt',
+    '=': 'eq', 'eq': 'eq',
+    'contains': 'contains',
+    'datestartswith': 'datestartswith',
+}
+
+_TERM = re.compile(
+    r'^\s*\{(?P<column>[^}]+)\}\s*'
+    r'(?P<case>[si])?(?P<operator>>=|<=|!=|<|>|=|ge|le|ne|lt|gt|eq|contains|datestartswith)\s*'
+    r'(?P<value>.*?)\s*$'
+)
+_BLANK_TERM = re.compile(r'^\s*\{(?P<column>[^}]+)\}\s+is\s+(?P<negate>not\s+)?blank\s*$')
+
+
+def _unquote(value):
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in '"\'`':
+        return value[1:-1].replace('\\' + value[0], value[0])
+    return value
+
+
+def _coerce(series, value):
+    if pd.api.types.is_numeric_dtype(series):
+        return float(value)
+    if pd.api.types.is_datetime64_any_dtype(series):
+        return pd.Timestamp(value)
+    return value
+
+
+def parse_filter_term(term):
+    # One DataTable filter term -> (column, operator, value, case_insensitive).
+    # `is blank` / `is not blank` terms come back as the 'blank' / 'notblank'
+    # operators without a value. Raises ValueError for anything else.
+    blank = _BLANK_TERM.match(term)
+    if blank:
+        return blank.group('column'), 'notblank' if blank.group('negate') else 'blank', None, False
+    match = _TERM.match(term)
+    if not match:
+        raise ValueError(f"Unsupported filter expression: {term!r}")
+    return (match.group('column'), _OPERATORS[match.group('operator')], _unquote(match.group('value')),
+            match.group('case') == 'i')
+
+
+def _term_mask(df, term):
+    column, operator, value, case_insensitive = parse_filter_term(term)
+    if column not in df.columns:
+        raise ValueError(f"Unsupported filter expression: {term!r}")
+    if operator in ('blank', 'notblank'):
+        mask = df[column].isna().to_numpy()
+        return ~mask if operator == 'notblank' else mask
+
+    series = display_series(df[column])
+
+    if operator == 'contains':
+        text = series.astype(str)
+        return text.str.contains(value, case=not case_insensitive, regex=False).to_numpy()
+    if operator == 'datestartswith':
+        return series.dt.strftime(DATE_FORMAT).str.startswith(value).fillna(False).to_numpy(dtype=bool)
+
+    if case_insensitive and not pd.api.types.is_numeric_dtype(series):
+        series = series.astype(str).str.lower()
+        value = value.lower()
+    try:
+        value = _coerce(series, value)
+    except (TypeError, ValueError):
+        # A number typed into a text column or vice versa matches nothing.
+        return np.zeros(len(df), dtype=bool)
+
+    if operator == 'eq':
+        result = series == value
+    elif operator == 'ne':
+        result = series != value
+    elif operator == 'lt':
+        result = series < value
+    elif operator == 'le':
+        result = series <= value
+    elif operator == 'gt':
+        result = series > value
+    else:
+        result = series >= value
+    return result.fillna(False).to_numpy(dtype=bool)
+
+
+def filter_query_mask(df, filter_query):
+    # Translates DataTable filter_query syntax (terms joined by `&&`) into a
+    # vectorized boolean mask over `df`.
+    mask = np.ones(len(df), dtype=bool)
+    if not filter_query:
+        return mask
+    for term in filter_query.split(' && '):
+        mask &= _term_mask(df, term)
+    return mask
+
+
+# --- Paging ---
+def format_rows(df):
+    # Display values (UUID strings, labels, plain dates), vectorized per column.
+    rows = df[display_columns(df)].copy()
+    for col in rows.columns:
+        if pd.api.types.is_datetime64_any_dtype(rows[col]):
+            rows[col] = rows[col].dt.strftime(DATE_FORMAT)
+        else:
+            rows[col] = display_series(rows[col])
+    return rows
+
+
+def page_records(df, positions, page_current, page_size):
+    page_current = page_current or 0
+    start = page_current * page_size
+    page = df.iloc[positions[start:start + page_size]]
+    return format_rows(page).to_dict('records')
+
+
+def page_count(n_rows, page_size):
+    return max(1, -(-n_rows // page_size))
+
+
+# --- CSV export ---
+def iter_csv(df, positions, chunk_size=10000):
+    # Yields the selected rows as CSV text in chunks, so a full export never has
+    # to be materialized in memory at once.
+    # The header goes through to_csv like the rows, with the same quoting and line endings.
+    yield format_rows(df.iloc[:0]).to_csv(index=False)
+    for start in range(0, len(positions), chunk_size):
+        chunk = format_rows(df.iloc[positions[start:start + chunk_size]])
+        yield chunk.to_csv(index=False, header=False)
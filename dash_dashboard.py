@@ -1,214 +1,346 @@
+import json
+import os
+import uuid
+from urllib.parse import urlencode
+
 import dash
+from dash import Patch
 from dash import dcc
 from dash import html
-from dash.dependencies import Input, Output
-import pandas as pd
-import plotly.express as px
-
-# Load the datasets
+from dash.dependencies import Input, Output, State
+from dash.exceptions import PreventUpdate
+import flask
+
+from callback_executor import CallbackExecutor, Superseded
+from customer_table import page_count
+from figures import (DISTRIBUTION_CHARTS, SEGMENT_CHARTS, TREND_CHARTS, distribution_figures, distribution_updates,
+                     figure_skeleton, segment_figures, segment_updates, trend_updates)
+from filter_index import normalize_filter_key
+from ingest import start_worker_pool
+from instrumentation import instrument_dash, instrumented, profiled, record_rows, stage
+from reloader import DataReloader
+from shared_dataset import SHARED_DATA_DIR, SharedDataReloader
+
+# Load the datasets (parsed once and served from the columnar cache afterwards).
+# The reloader keeps watching the files and swaps in a rebuilt snapshot when they change.
+# With DASHBOARD_SHARED_DIR set, gunicorn workers attach to one memory-mapped copy
+# instead (run gunicorn without --preload so each worker starts its own reloader).
+# Ingest workers are forked first, while this is still the only thread, and
+# reused by reloads on the reloader thread.
+start_worker_pool()
 try:
-    df_unit_economics = pd.read_csv('unit_economics.csv')
-    df_unit_economics_by_segment = pd.read_csv('unit_economics_by_segment.csv')
+    data_reloader = (SharedDataReloader() if SHARED_DATA_DIR else DataReloader()).start()
 except FileNotFoundError:
-    print("Error: Make sure 'unit_economics.csv' and 'unit_economics_by_segment.csv' are in the same directory.")
+    print("Error: Make sure 'unit_economics.csv' is in the same directory.")
     # Exit or handle error appropriately in a real application
     # For this example, we'll assume the files are present for the dashboard to run.
     exit()
 
-# Data Preprocessing
-df_unit_economics['latest_end'] = pd.to_datetime(df_unit_economics['latest_end'])
+CUSTOMER_PAGE_SIZE = 15
 
-# Fill missing values for health and sentiment scores for visualization purposes
-df_unit_economics['Avg_Sentiment_Score'] = df_unit_economics['Avg_Sentiment_Score'].fillna(df_unit_economics['Avg_Sentiment_Score'].mean())
-df_unit_economics['Customer_Health_Score'] = df_unit_economics['Customer_Health_Score'].fillna(df_unit_economics['Customer_Health_Score'].mean())
-df_unit_economics['Active_Days'] = df_unit_economics['Active_Days'].fillna(0)
-df_unit_economics['Usage_Events'] = df_unit_economics['Usage_Events'].fillna(0)
-df_unit_economics['Usage_Score'] = df_unit_economics['Usage_Score'].fillna(0)
+# Heavy callbacks run on a bounded executor: identical in-flight requests share
+# one computation and a session's superseded requests are dropped.
+callback_executor = CallbackExecutor()
 
-# Initialize the Dash app
-app = dash.Dash(__name__)
+# Alternatively, DASHBOARD_BACKGROUND_CALLBACKS=1 runs them as Dash background
+# callbacks with a local diskcache manager (pip install "dash[diskcache]");
+# Dash then cancels a session's running job when the callback fires again.
+BACKGROUND_CALLBACKS = os.environ.get('DASHBOARD_BACKGROUND_CALLBACKS', '') not in ('', '0')
+background_callback_manager = None
+if BACKGROUND_CALLBACKS:
+    import diskcache
+    background_callback_manager = dash.DiskcacheManager(
+        diskcache.Cache(os.environ.get('DASHBOARD_BACKGROUND_CACHE_DIR', '.callback_cache')))
 
-# --- Dashboard Layout ---
-app.layout = html.Div(style={'font-family': 'Arial, sans-serif'}, children=[
-    html.H1("🚀 SaaS Unit Economics Dashboard", style={'textAlign': 'center', 'color': '#2C3E50'}),
+# Initialize the Dash app (with DASHBOARD_METRICS=1, timings are served on /metrics)
+app = instrument_dash(dash.Dash(__name__, background_callback_manager=background_callback_manager))
 
-    html.Div([
-        html.P("This dashboard provides insights into the unit economics of your SaaS business, allowing you to analyze key metrics at both the individual customer and aggregated segment levels.", style={'textAlign': 'center', 'color': '#7F8C8D'}),
-    ]),
+# --- Dashboard Layout ---
+# Built per page load, so filter options follow the latest data snapshot.
+def serve_layout():
+    snapshot = data_reloader.current()
+    return html.Div(style={'font-family': 'Arial, sans-serif'}, children=[
+        html.H1("🚀 SaaS Unit Economics Dashboard", style={'textAlign': 'center', 'color': '#2C3E50'}),
 
-    # --- Filters Section ---
-    html.Div(style={'backgroundColor': '#ECF0F1', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px'}, children=[
-        html.H3("Filter Options", style={'textAlign': 'center', 'color': '#34495E'}),
         html.Div([
-            html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
-                html.Label("Select Industry:"),
-                dcc.Dropdown(
-                    id='industry-filter',
-                    options=[{'label': i, 'value': i} for i in df_unit_economics_by_segment['industry'].unique()],
-                    value=df_unit_economics_by_segment['industry'].unique().tolist(), # Default to all selected
-                    multi=True
-                )
-            ]),
-            html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
-                html.Label("Select Company Size:"),
-                dcc.Dropdown(
-                    id='company-size-filter',
-                    options=[{'label': i, 'value': i} for i in df_unit_economics_by_segment['company_size'].unique()],
-                    value=df_unit_economics_by_segment['company_size'].unique().tolist(),
-                    multi=True
-                )
-            ]),
-            html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
-                html.Label("Select Plan Name:"),
-                dcc.Dropdown(
-                    id='plan-name-filter',
-                    options=[{'label': i, 'value': i} for i in df_unit_economics_by_segment['plan_name'].unique()],
-                    value=df_unit_economics_by_segment['plan_name'].unique().tolist(),
-                    multi=True
-                )
-            ]),
-            html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
-                html.Label("Select Billing Frequency:"),
-                dcc.Dropdown(
-                    id='billing-frequency-filter',
-                    options=[{'label': i, 'value': i} for i in df_unit_economics_by_segment['billing_frequency'].unique()],
-                    value=df_unit_economics_by_segment['billing_frequency'].unique().tolist(),
-                    multi=True
-                )
-            ]),
-        ], style={'display': 'flex', 'flex-wrap': 'wrap', 'justify-content': 'space-around'}),
-    ]),
-
-    # --- KPIs Section ---
-    html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
-        html.H2("Key Performance Indicators (KPIs)", style={'textAlign': 'center', 'color': '#2C3E50'}),
-        html.Div(id='kpi-output', style={'display': 'flex', 'justify-content': 'space-around', 'padding': '10px'}),
-    ]),
-
-    # --- Customer-Level Distributions ---
-    html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
-        html.H2("Customer-Level Unit Economics Distributions", style={'textAlign': 'center', 'color': '#2C3E50'}),
-        html.Div([
-            dcc.Graph(id='ltv-cac-ratio-dist', style={'width': '33%', 'display': 'inline-block'}),
-            dcc.Graph(id='cac-payback-dist', style={'width': '33%', 'display': 'inline-block'}),
-            dcc.Graph(id='customer-health-dist', style={'width': '33%', 'display': 'inline-block'})
-        ], style={'display': 'flex', 'justify-content': 'space-around'}),
-    ]),
-
-    # --- Segment-Level Analysis ---
-    html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
-        html.H2("Segment-Level Unit Economics Analysis", style={'textAlign': 'center', 'color': '#2C3E50'}),
-        html.Div([
-            dcc.Graph(id='avg-ltv-cac-industry', style={'width': '49%', 'display': 'inline-block'}),
-            dcc.Graph(id='avg-payback-industry', style={'width': '49%', 'display': 'inline-block'})
-        ], style={'display': 'flex', 'justify-content': 'space-around'}),
-        html.Div([
-            dcc.Graph(id='cust-count-company-size', style={'width': '49%', 'display': 'inline-block'}),
-            dcc.Graph(id='avg-ltv-cac-plan', style={'width': '49%', 'display': 'inline-block'})
-        ], style={'display': 'flex', 'justify-content': 'space-around'}),
-    ]),
-
-    # --- Customer Stream List ---
-    html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'border': '1px solid #D7DBDD'}, children=[
-        html.H2("Customer Stream List (Filtered Data)", style={'textAlign': 'center', 'color': '#2C3E50'}),
-        html.Div([
-            dcc.Checklist(
-                id='show-churned-customers',
-                options=[{'label': ' Show only Churned Customers', 'value': 'churned'}],
-                value=[],
-                style={'marginBottom': '10px'}
-            ),
-            html.Div(style={'width': '30%', 'display': 'inline-block', 'paddingRight': '20px'}, children=[
-                html.Label("Sort Customer List by:"),
-                dcc.Dropdown(
-                    id='sort-column',
-                    options=[
-                        {'label': 'Customer ID', 'value': 'customer_id'},
-                        {'label': 'LTV/CAC Ratio', 'value': 'LTV_CAC_Ratio'},
-                        {'label': 'CAC Payback Months', 'value': 'CAC_Payback_Months'},
-                        {'label': 'Customer Health Score', 'value': 'Customer_Health_Score'},
-                        {'label': 'Monthly Revenue', 'value': 'Monthly_Revenue'},
-                        {'label': 'Latest End Date', 'value': 'latest_end'}
-                    ],
-                    value='customer_id'
+            html.P("This dashboard provides insights into the unit economics of your SaaS business, allowing you to analyze key metrics at both the individual customer and aggregated segment levels.", style={'textAlign': 'center', 'color': '#7F8C8D'}),
+        ]),
+
+        # --- Filters Section ---
+        html.Div(style={'backgroundColor': '#ECF0F1', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px'}, children=[
+            html.H3("Filter Options", style={'textAlign': 'center', 'color': '#34495E'}),
+            html.Div([
+                html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
+                    html.Label("Select Industry:"),
+                    dcc.Dropdown(
+                        id='industry-filter',
+                        options=[{'label': i, 'value': i} for i in snapshot.filter_options('industry')],
+                        value=snapshot.filter_options('industry'), # Default to all selected
+                        multi=True
+                    )
+                ]),
+                html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
+                    html.Label("Select Company Size:"),
+                    dcc.Dropdown(
+                        id='company-size-filter',
+                        options=[{'label': i, 'value': i} for i in snapshot.filter_options('company_size')],
+                        value=snapshot.filter_options('company_size'),
+                        multi=True
+                    )
+                ]),
+                html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
+                    html.Label("Select Plan Name:"),
+                    dcc.Dropdown(
+                        id='plan-name-filter',
+                        options=[{'label': i, 'value': i} for i in snapshot.filter_options('plan_name')],
+                        value=snapshot.filter_options('plan_name'),
+                        multi=True
+                    )
+                ]),
+                html.Div(style={'width': '24%', 'display': 'inline-block', 'padding': '10px'}, children=[
+                    html.Label("Select Billing Frequency:"),
+                    dcc.Dropdown(
+                        id='billing-frequency-filter',
+                        options=[{'label': i, 'value': i} for i in snapshot.filter_options('billing_frequency')],
+                        value=snapshot.filter_options('billing_frequency'),
+                        multi=True
+                    )
+                ]),
+            ], style={'display': 'flex', 'flex-wrap': 'wrap', 'justify-content': 'space-around'}),
+            html.Div(style={'padding': '10px', 'textAlign': 'center'}, children=[
+                html.Label("Contract End Date (leave empty for all dates):", style={'marginRight': '10px'}),
+                dcc.DatePickerRange(
+                    id='date-range-filter',
+                    min_date_allowed=snapshot.date_bounds()[0],
+                    max_date_allowed=snapshot.date_bounds()[1],
+                    initial_visible_month=snapshot.date_bounds()[1],
+                    display_format='YYYY-MM-DD',
+                    clearable=True
                 )
             ]),
-            html.Div(style={'width': '30%', 'display': 'inline-block'}, children=[
-                html.Label("Sort Order:"),
-                dcc.RadioItems(
-                    id='sort-order',
-                    options=[
-                        {'label': ' Ascending', 'value': 'asc'},
-                        {'label': ' Descending', 'value': 'desc'}
-                    ],
-                    value='asc',
-                    inline=True
-                )
+            # Normalized filter selection shared by every downstream callback
+            dcc.Store(id='filter-key'),
+            # Identifies this page load, so newer requests can supersede older ones
+            dcc.Store(id='session-id', data=uuid.uuid4().hex),
+        ]),
+
+        # --- KPIs Section ---
+        html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
+            html.H2("Key Performance Indicators (KPIs)", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            html.Div(id='kpi-output', style={'display': 'flex', 'justify-content': 'space-around', 'padding': '10px'}),
+        ]),
+
+        # --- Customer-Level Distributions ---
+        html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
+            html.H2("Customer-Level Unit Economics Distributions", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            html.Div([
+                dcc.Graph(id='ltv-cac-ratio-dist', figure=figure_skeleton('ltv-cac-ratio-dist'), style={'width': '33%', 'display': 'inline-block'}),
+                dcc.Graph(id='cac-payback-dist', figure=figure_skeleton('cac-payback-dist'), style={'width': '33%', 'display': 'inline-block'}),
+                dcc.Graph(id='customer-health-dist', figure=figure_skeleton('customer-health-dist'), style={'width': '33%', 'display': 'inline-block'})
+            ], style={'display': 'flex', 'justify-content': 'space-around'}),
+        ]),
+
+        # --- Segment-Level Analysis ---
+        html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
+            html.H2("Segment-Level Unit Economics Analysis", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            html.Div([
+                dcc.Graph(id='avg-ltv-cac-industry', figure=figure_skeleton('avg-ltv-cac-industry'), style={'width': '49%', 'display': 'inline-block'}),
+                dcc.Graph(id='avg-payback-industry', figure=figure_skeleton('avg-payback-industry'), style={'width': '49%', 'display': 'inline-block'})
+            ], style={'display': 'flex', 'justify-content': 'space-around'}),
+            html.Div([
+                dcc.Graph(id='cust-count-company-size', figure=figure_skeleton('cust-count-company-size'), style={'width': '49%', 'display': 'inline-block'}),
+                dcc.Graph(id='avg-ltv-cac-plan', figure=figure_skeleton('avg-ltv-cac-plan'), style={'width': '49%', 'display': 'inline-block'})
+            ], style={'display': 'flex', 'justify-content': 'space-around'}),
+        ]),
+
+        # --- Time-Series Trends ---
+        html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'marginBottom': '20px', 'border': '1px solid #D7DBDD'}, children=[
+            html.H2("Time-Series Trends", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            html.Div([
+                dcc.Graph(id='monthly-churn-trend', figure=figure_skeleton('monthly-churn-trend'), style={'width': '49%', 'display': 'inline-block'}),
+                dcc.Graph(id='cohort-ltv-cac-trend', figure=figure_skeleton('cohort-ltv-cac-trend'), style={'width': '49%', 'display': 'inline-block'})
+            ], style={'display': 'flex', 'justify-content': 'space-around'}),
+        ]),
+
+        # --- Customer Stream List ---
+        html.Div(style={'backgroundColor': '#FBFCFC', 'padding': '20px', 'borderRadius': '8px', 'border': '1px solid #D7DBDD'}, children=[
+            html.H2("Customer Stream List (Filtered Data)", style={'textAlign': 'center', 'color': '#2C3E50'}),
+            html.Div([
+                dcc.Checklist(
+                    id='show-churned-customers',
+                    options=[{'label': ' Show only Churned Customers', 'value': 'churned'}],
+                    value=[],
+                    style={'marginBottom': '10px'}
+                ),
+                html.Div(style={'width': '30%', 'display': 'inline-block', 'paddingRight': '20px'}, children=[
+                    html.Label("Sort Customer List by:"),
+                    dcc.Dropdown(
+                        id='sort-column',
+                        options=[
+                            {'label': 'Customer ID', 'value': 'customer_id'},
+                            {'label': 'LTV/CAC Ratio', 'value': 'LTV_CAC_Ratio'},
+                            {'label': 'CAC Payback Months', 'value': 'CAC_Payback_Months'},
+                            {'label': 'Customer Health Score', 'value': 'Customer_Health_Score'},
+                            {'label': 'Monthly Revenue', 'value': 'Monthly_Revenue'},
+                            {'label': 'Latest End Date', 'value': 'latest_end'}
+                        ],
+                        value='customer_id'
+                    )
+                ]),
+                html.Div(style={'width': '30%', 'display': 'inline-block'}, children=[
+                    html.Label("Sort Order:"),
+                    dcc.RadioItems(
+                        id='sort-order',
+                        options=[
+                            {'label': ' Ascending', 'value': 'asc'},
+                            {'label': ' Descending', 'value': 'desc'}
+                        ],
+                        value='asc',
+                        inline=True
+                    )
+                ])
+            ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'center', 'marginBottom': '20px'}),
+            html.Div(id='customer-list-table', children=[
+                # Paging, sorting and filtering run on the server; only the visible page is sent.
+                dash.dash_table.DataTable(
+                    id='table-container',
+                    columns=snapshot.table_columns(),
+                    data=[],
+                    page_current=0,
+                    page_size=CUSTOMER_PAGE_SIZE, # Number of rows per page
+                    page_count=1,
+                    page_action='custom',
+                    sort_action='custom',
+                    sort_mode='single',
+                    sort_by=[],
+                    filter_action='custom',
+                    filter_query='',
+                    style_table={'overflowX': 'auto'},
+                    style_cell={'minWidth': '100px', 'width': '120px', 'maxWidth': '180px', 'textAlign': 'left', 'padding': '8px'},
+                    style_header={
+                        'backgroundColor': '#2C3E50',
+                        'color': 'white',
+                        'fontWeight': 'bold'
+                    },
+                    style_data_conditional=[
+                        {
+                            'if': {'row_index': 'odd'},
+                            'backgroundColor': 'rgb(248, 248, 248)'
+                        }
+                    ]
+                ),
+                html.A("Export full result as CSV", id='customer-csv-download', href='', download='customers.csv',
+                       style={'display': 'inline-block', 'marginTop': '10px', 'color': '#2C3E50'})
             ])
-        ], style={'display': 'flex', 'justify-content': 'center', 'align-items': 'center', 'marginBottom': '20px'}),
-        html.Div(id='customer-list-table')
-    ]),
+        ]),
+
+        html.Div(html.P("Dashboard created using Plotly Dash.", style={'textAlign': 'center', 'marginTop': '30px', 'color': '#7F8C8D'}))
+    ])
+
+
+app.layout = serve_layout
+
+# --- Filter Helpers ---
+def _run_callback(name, session_id, args, compute):
+    # Runs `compute(snapshot)` on the callback executor. Identical requests in
+    # flight share the result; one superseded by a newer request from the same
+    # session sends no update, since the newer one will. Sampled profiles are
+    # taken around the computation, on the thread that runs it.
+    snapshot = data_reloader.current()
+
+    def run():
+        with profiled(name):
+            return compute(snapshot)
+
+    if BACKGROUND_CALLBACKS:
+        return run()
+    key = (name, snapshot.version, json.dumps(args, sort_keys=True))
+    channel = (session_id, name) if session_id else None
+    try:
+        return callback_executor.run(key, run, channel)
+    except Superseded:
+        raise PreventUpdate
+
+
+def _figure_patch(update):
+    # The graphs start out as figure skeletons; each update only replaces the
+    # trace arrays and the title instead of resending layout and template.
+    trace, title = update
+    patch = Patch()
+    for key, values in trace.items():
+        patch['data'][0][key] = values
+    patch['layout']['title']['text'] = title
+    return patch
+
+
+def _table_sort(sort_by, sort_column, sort_order):
+    # A header click on the table takes precedence over the sort controls above it.
+    if sort_by:
+        return sort_by[0]['column_id'], sort_by[0]['direction'] == 'asc'
+    return sort_column, sort_order != 'desc'
 
-    html.Div(html.P("Dashboard created using Plotly Dash.", style={'textAlign': 'center', 'marginTop': '30px', 'color': '#7F8C8D'}))
-])
 
 # --- Callbacks ---
 @app.callback(
-    [Output('kpi-output', 'children'),
-     Output('ltv-cac-ratio-dist', 'figure'),
-     Output('cac-payback-dist', 'figure'),
-     Output('customer-health-dist', 'figure'),
-     Output('avg-ltv-cac-industry', 'figure'),
-     Output('avg-payback-industry', 'figure'),
-     Output('cust-count-company-size', 'figure'),
-     Output('avg-ltv-cac-plan', 'figure'),
-     Output('customer-list-table', 'children')],
+    Output('filter-key', 'data'),
     [Input('industry-filter', 'value'),
      Input('company-size-filter', 'value'),
      Input('plan-name-filter', 'value'),
      Input('billing-frequency-filter', 'value'),
-     Input('show-churned-customers', 'value'),
-     Input('sort-column', 'value'),
-     Input('sort-order', 'value')]
+     Input('date-range-filter', 'start_date'),
+     Input('date-range-filter', 'end_date')]
 )
-def update_dashboard(selected_industries, selected_company_sizes, selected_plan_names,
-                     selected_billing_frequencies, show_churned_customers, sort_column, sort_order):
+@instrumented('filter_key')
+def update_filter_key(selected_industries, selected_company_sizes, selected_plan_names,
+                      selected_billing_frequencies, start_date=None, end_date=None):
+    return normalize_filter_key(selected_industries, selected_company_sizes,
+                                selected_plan_names, selected_billing_frequencies, (start_date, end_date))
 
-    # Apply filters to both dataframes
-    filtered_df_unit_economics = df_unit_economics[
-        (df_unit_economics['industry'].isin(selected_industries)) &
-        (df_unit_economics['company_size'].isin(selected_company_sizes)) &
-        (df_unit_economics['plan_name'].isin(selected_plan_names)) &
-        (df_unit_economics['billing_frequency'].isin(selected_billing_frequencies))
-    ]
 
-    filtered_df_unit_economics_by_segment = df_unit_economics_by_segment[
-        (df_unit_economics_by_segment['industry'].isin(selected_industries)) &
-        (df_unit_economics_by_segment['company_size'].isin(selected_company_sizes)) &
-        (df_unit_economics_by_segment['plan_name'].isin(selected_plan_names)) &
-        (df_unit_economics_by_segment['billing_frequency'].isin(selected_billing_frequencies))
-    ]
+@app.callback(
+    Output('kpi-output', 'children'),
+    Input('filter-key', 'data'),
+    State('session-id', 'data'),
+    background=BACKGROUND_CALLBACKS
+)
+@instrumented('kpis', profile=False)
+def update_kpis(filter_key, session_id=None):
+    return _run_callback('kpis', session_id, filter_key, lambda snapshot: build_kpi_cards(snapshot, filter_key))
+
+
+def build_kpi_cards(snapshot, filter_key):
+    with stage('kpi'):
+        kpis = snapshot.kpis(filter_key)
+        percentiles = snapshot.percentiles(filter_key)
 
     # --- KPI Updates ---
-    if not filtered_df_unit_economics.empty:
-        avg_ltv_cac = f"{filtered_df_unit_economics['LTV_CAC_Ratio'].mean():.2f}"
-        avg_cac_payback = f"{filtered_df_unit_economics['CAC_Payback_Months'].mean():.2f}"
-        churn_rate = f"{filtered_df_unit_economics['Churned'].mean() * 100:.2f}%"
-        avg_health_score = f"{filtered_df_unit_economics['Customer_Health_Score'].mean():.2f}"
+    if kpis['churn_rate'] is not None:
+        avg_ltv_cac = f"{kpis['avg_ltv_cac']:.2f}"
+        avg_cac_payback = f"{kpis['avg_cac_payback']:.2f}"
+        churn_rate = f"{kpis['churn_rate'] * 100:.2f}%"
+        avg_health_score = f"{kpis['avg_health_score']:.2f}"
     else:
         avg_ltv_cac = "N/A"
         avg_cac_payback = "N/A"
         churn_rate = "N/A"
         avg_health_score = "N/A"
 
+    # Approximate p10 / p50 / p90 (within 1%) under each average
+    def spread(column):
+        values = percentiles[column]
+        text = "p10 / p50 / p90: " + (" / ".join(f"{value:.2f}" for value in values) if values else "N/A")
+        return html.P(text, style={'fontSize': '0.9em', 'margin': '0'})
+
     kpi_cards = [
         html.Div(style={'backgroundColor': '#3498DB', 'color': 'white', 'padding': '15px', 'borderRadius': '8px', 'width': '22%', 'textAlign': 'center', 'boxShadow': '2px 2px 5px rgba(0,0,0,0.2)'}, children=[
             html.H4("Avg. LTV/CAC Ratio"),
-            html.P(avg_ltv_cac, style={'fontSize': '2em', 'fontWeight': 'bold'})
+            html.P(avg_ltv_cac, style={'fontSize': '2em', 'fontWeight': 'bold'}),
+            spread('LTV_CAC_Ratio')
         ]),
         html.Div(style={'backgroundColor': '#2ECC71', 'color': 'white', 'padding': '15px', 'borderRadius': '8px', 'width': '22%', 'textAlign': 'center', 'boxShadow': '2px 2px 5px rgba(0,0,0,0.2)'}, children=[
             html.H4("Avg. CAC Payback (Months)"),
-            html.P(avg_cac_payback, style={'fontSize': '2em', 'fontWeight': 'bold'})
+            html.P(avg_cac_payback, style={'fontSize': '2em', 'fontWeight': 'bold'}),
+            spread('CAC_Payback_Months')
         ]),
         html.Div(style={'backgroundColor': '#E74C3C', 'color': 'white', 'padding': '15px', 'borderRadius': '8px', 'width': '22%', 'textAlign': 'center', 'boxShadow': '2px 2px 5px rgba(0,0,0,0.2)'}, children=[
             html.H4("Churn Rate"),
@@ -216,110 +348,137 @@ def update_dashboard(selected_industries, selected_company_sizes, selected_plan_
         ]),
         html.Div(style={'backgroundColor': '#F39C12', 'color': 'white', 'padding': '15px', 'borderRadius': '8px', 'width': '22%', 'textAlign': 'center', 'boxShadow': '2px 2px 5px rgba(0,0,0,0.2)'}, children=[
             html.H4("Avg. Customer Health Score"),
-            html.P(avg_health_score, style={'fontSize': '2em', 'fontWeight': 'bold'})
+            html.P(avg_health_score, style={'fontSize': '2em', 'fontWeight': 'bold'}),
+            spread('Customer_Health_Score')
         ])
     ]
 
-    # --- Customer-Level Distributions Plots ---
-    if not filtered_df_unit_economics.empty:
-        fig_ltv_cac = px.histogram(filtered_df_unit_economics, x='LTV_CAC_Ratio',
-                                   title='Distribution of LTV to CAC Ratio', nbins=50,
-                                   color_discrete_sequence=px.colors.qualitative.Plotly)
-        fig_payback = px.histogram(filtered_df_unit_economics, x='CAC_Payback_Months',
-                                    title='Distribution of CAC Payback Months', nbins=50,
-                                    color_discrete_sequence=px.colors.qualitative.Plotly)
-        fig_health = px.histogram(filtered_df_unit_economics, x='Customer_Health_Score',
-                                   title='Distribution of Customer Health Score', nbins=20,
-                                   color_discrete_sequence=px.colors.qualitative.Plotly)
-    else:
-        fig_ltv_cac = px.scatter(title="No data for LTV/CAC Ratio Distribution")
-        fig_payback = px.scatter(title="No data for CAC Payback Months Distribution")
-        fig_health = px.scatter(title="No data for Customer Health Score Distribution")
-
-    # --- Segment-Level Analysis Plots ---
-    if not filtered_df_unit_economics_by_segment.empty:
-        avg_ltv_cac_by_industry = filtered_df_unit_economics_by_segment.groupby('industry')['Avg_LTV_CAC'].mean().reset_index().sort_values(by='Avg_LTV_CAC', ascending=False)
-        fig_avg_ltv_cac_industry = px.bar(avg_ltv_cac_by_industry, x='Avg_LTV_CAC', y='industry', orientation='h',
-                                          title='Average LTV/CAC Ratio by Industry', color_discrete_sequence=px.colors.qualitative.Set2)
-
-        avg_payback_by_industry = filtered_df_unit_economics_by_segment.groupby('industry')['Avg_Payback_Months'].mean().reset_index().sort_values(by='Avg_Payback_Months', ascending=True)
-        fig_avg_payback_industry = px.bar(avg_payback_by_industry, x='Avg_Payback_Months', y='industry', orientation='h',
-                                          title='Average Payback Months by Industry', color_discrete_sequence=px.colors.qualitative.Set2)
-
-        customer_count_by_company_size = filtered_df_unit_economics_by_segment.groupby('company_size')['Customer_Count'].sum().reset_index().sort_values(by='Customer_Count', ascending=False)
-        fig_cust_count_company_size = px.bar(customer_count_by_company_size, x='company_size', y='Customer_Count',
-                                             title='Total Customer Count by Company Size', color_discrete_sequence=px.colors.qualitative.Set3)
-
-        avg_ltv_cac_by_plan = filtered_df_unit_economics_by_segment.groupby('plan_name')['Avg_LTV_CAC'].mean().reset_index().sort_values(by='Avg_LTV_CAC', ascending=False)
-        fig_avg_ltv_cac_plan = px.bar(avg_ltv_cac_by_plan, x='Avg_LTV_CAC', y='plan_name', orientation='h',
-                                      title='Average LTV/CAC Ratio by Plan Name', color_discrete_sequence=px.colors.qualitative.Set1)
-    else:
-        fig_avg_ltv_cac_industry = px.scatter(title="No data for Avg LTV/CAC by Industry")
-        fig_avg_payback_industry = px.scatter(title="No data for Avg Payback by Industry")
-        fig_cust_count_company_size = px.scatter(title="No data for Customer Count by Company Size")
-        fig_avg_ltv_cac_plan = px.scatter(title="No data for Avg LTV/CAC by Plan Name")
-
-
-    # --- Customer Stream List Table ---
-    filtered_df_customers_display = filtered_df_unit_economics.copy()
-    if 'churned' in show_churned_customers:
-        filtered_df_customers_display = filtered_df_customers_display[filtered_df_customers_display['Churned'] == 1]
-
-    # Sort the dataframe
-    if sort_column and not filtered_df_customers_display.empty:
-        ascending = True if sort_order == 'asc' else False
-        filtered_df_customers_display = filtered_df_customers_display.sort_values(by=sort_column, ascending=ascending)
-
-    customer_table_data = []
-    if not filtered_df_customers_display.empty:
-        # Select relevant columns for the table display
-        display_columns = ['customer_id', 'industry', 'company_size', 'plan_name',
-                           'LTV', 'CAC', 'LTV_CAC_Ratio', 'CAC_Payback_Months',
-                           'Monthly_Revenue', 'Customer_Health_Score', 'Churned', 'latest_end',
-                           'Avg_Sentiment_Score', 'Active_Days', 'Usage_Events', 'Usage_Score']
-        
-        # Ensure only columns present in the dataframe are selected
-        display_columns = [col for col in display_columns if col in filtered_df_customers_display.columns]
-
-        customer_table_data = filtered_df_customers_display[display_columns].to_dict('records')
-        
-        # Convert datetime objects in `latest_end` to string for display, if it's there
-        if 'latest_end' in display_columns:
-            for row in customer_table_data:
-                if isinstance(row['latest_end'], pd.Timestamp):
-                    row['latest_end'] = row['latest_end'].strftime('%Y-%m-%d')
-
-
-    customer_list_table = html.Div([
-        dash.dash_table.DataTable(
-            id='table-container',
-            columns=[{"name": i.replace('_', ' ').title(), "id": i} for i in display_columns],
-            data=customer_table_data,
-            page_size=15, # Number of rows per page
-            style_table={'overflowX': 'auto'},
-            style_cell={'minWidth': '100px', 'width': '120px', 'maxWidth': '180px', 'textAlign': 'left', 'padding': '8px'},
-            style_header={
-                'backgroundColor': '#2C3E50',
-                'color': 'white',
-                'fontWeight': 'bold'
-            },
-            style_data_conditional=[
-                {
-                    'if': {'row_index': 'odd'},
-                    'backgroundColor': 'rgb(248, 248, 248)'
-                }
-            ],
-            export_format='csv',
-            sort_action='native', # Enable native sorting
-            filter_action='native' # Enable native filtering
-        )
-    ])
+    return kpi_cards
+
+
+@app.callback(
+    [Output('ltv-cac-ratio-dist', 'figure'),
+     Output('cac-payback-dist', 'figure'),
+     Output('customer-health-dist', 'figure')],
+    Input('filter-key', 'data'),
+    State('session-id', 'data'),
+    background=BACKGROUND_CALLBACKS
+)
+@instrumented('distributions', profile=False)
+def update_distributions(filter_key, session_id=None):
+    def compute(snapshot):
+        updates = distribution_updates(snapshot, filter_key)
+        return [_figure_patch(updates[chart_id]) for chart_id in DISTRIBUTION_CHARTS]
+    return _run_callback('distributions', session_id, filter_key, compute)
+
+
+@app.callback(
+    [Output('avg-ltv-cac-industry', 'figure'),
+     Output('avg-payback-industry', 'figure'),
+     Output('cust-count-company-size', 'figure'),
+     Output('avg-ltv-cac-plan', 'figure')],
+    Input('filter-key', 'data'),
+    State('session-id', 'data'),
+    background=BACKGROUND_CALLBACKS
+)
+@instrumented('segments', profile=False)
+def update_segments(filter_key, session_id=None):
+    def compute(snapshot):
+        updates = segment_updates(snapshot, filter_key)
+        return [_figure_patch(updates[chart_id]) for chart_id in SEGMENT_CHARTS]
+    return _run_callback('segments', session_id, filter_key, compute)
+
+
+@app.callback(
+    [Output('monthly-churn-trend', 'figure'),
+     Output('cohort-ltv-cac-trend', 'figure')],
+    Input('filter-key', 'data'),
+    State('session-id', 'data'),
+    background=BACKGROUND_CALLBACKS
+)
+@instrumented('trends', profile=False)
+def update_trends(filter_key, session_id=None):
+    def compute(snapshot):
+        updates = trend_updates(snapshot, filter_key)
+        return [_figure_patch(updates[chart_id]) for chart_id in TREND_CHARTS]
+    return _run_callback('trends', session_id, filter_key, compute)
+
+
+@app.callback(
+    [Output('table-container', 'data'),
+     Output('table-container', 'page_count'),
+     Output('customer-csv-download', 'href')],
+    [Input('filter-key', 'data'),
+     Input('show-churned-customers', 'value'),
+     Input('sort-column', 'value'),
+     Input('sort-order', 'value'),
+     Input('table-container', 'page_current'),
+     Input('table-container', 'page_size'),
+     Input('table-container', 'sort_by'),
+     Input('table-container', 'filter_query')],
+    State('session-id', 'data'),
+    background=BACKGROUND_CALLBACKS
+)
+@instrumented('customer_table', profile=False)
+def update_customer_table(filter_key, show_churned_customers, sort_column, sort_order,
+                          page_current=0, page_size=CUSTOMER_PAGE_SIZE, sort_by=None, filter_query='',
+                          session_id=None):
+    churned_only = 'churned' in (show_churned_customers or [])
+    column, ascending = _table_sort(sort_by, sort_column, sort_order)
+
+    def compute(snapshot):
+        with stage('table_filter'):
+            n_rows = snapshot.customer_count(filter_key, churned_only, filter_query)
+        record_rows('table_filter', n_rows)
+
+        # Stay on the last page when a narrower filter leaves fewer pages than before.
+        # Only the rows of that page are put in order.
+        n_pages = page_count(n_rows, page_size)
+        page = min(page_current or 0, n_pages - 1)
+        with stage('table_sort'):
+            rows = snapshot.customer_rows(filter_key, churned_only, column, ascending, filter_query,
+                                          offset=page * page_size, limit=page_size)
+        with stage('table_records'):
+            return rows.to_dict('records'), n_pages
+
+    args = [filter_key, churned_only, column, ascending, filter_query, page_current, page_size]
+    records, n_pages = _run_callback('customer_table', session_id, args, compute)
+
+    export_href = app.get_relative_path('/download/customers.csv') + '?' + urlencode({
+        'filter_key': json.dumps(filter_key),
+        'churned': int(churned_only),
+        'sort_column': column or '',
+        'ascending': int(ascending),
+        'filter_query': filter_query or '',
+    })
+    return records, n_pages, export_href
+
+
+@app.server.route('/download/customers.csv')
+def download_customers_csv():
+    args = flask.request.args
+    snapshot = data_reloader.current()
+    chunks = snapshot.iter_customer_csv(json.loads(args.get('filter_key', '[[], [], [], []]')),
+                                        args.get('churned') == '1',
+                                        args.get('sort_column') or None,
+                                        args.get('ascending', '1') == '1',
+                                        args.get('filter_query', ''))
+    return flask.Response(flask.stream_with_context(chunks),
+                          mimetype='text/csv',
+                          headers={'Content-Disposition': 'attachment; filename=customers.csv'})
 
 
-    return (kpi_cards, fig_ltv_cac, fig_payback, fig_health,
-            fig_avg_ltv_cac_industry, fig_avg_payback_industry,
-            fig_cust_count_company_size, fig_avg_ltv_cac_plan,
-            customer_list_table)
+def update_dashboard(selected_industries, selected_company_sizes, selected_plan_names,
+                     selected_billing_frequencies, show_churned_customers, sort_column, sort_order):
+    # Computes every output in one go, in the order of the original nine-output callback;
+    # the customer table is returned as the records of its first page.
+    filter_key = normalize_filter_key(selected_industries, selected_company_sizes,
+                                      selected_plan_names, selected_billing_frequencies)
+    snapshot = data_reloader.current()
+    return (update_kpis(filter_key),
+            *distribution_figures(snapshot, filter_key),
+            *segment_figures(snapshot, filter_key),
+            update_customer_table(filter_key, show_churned_customers, sort_column, sort_order)[0])
 
 
 # Run the app
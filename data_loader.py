@@ -0,0 +1,148 @@
+import hashlib
+import json
+import os
+
+import numpy as np
+import pandas as pd
+
+from ingest import ingest_csv
+from schema import UNIT_ECONOMICS_DTYPES, apply_schema, pack_customer_ids
+
+UNIT_ECONOMICS_CSV = 'unit_economics.csv'
+
+# Parsed, preprocessed copies of the CSVs live here as Parquet files next to a
+# small JSON manifest describing the source file they were built from.
+CACHE_DIR = os.environ.get('DASHBOARD_CACHE_DIR', '.data_cache')
+
+# Bumped whenever preprocessing or the stored schema changes, invalidating older cache files.
+CACHE_FORMAT = 4
+
+
+# --- Preprocessing ---
+# Health and sentiment gaps are filled with the column mean for visualization
+# purposes; usage gaps mean no usage.
+MEAN_FILLED_COLUMNS = ['Avg_Sentiment_Score', 'Customer_Health_Score']
+ZERO_FILLED_COLUMNS = ['Active_Days', 'Usage_Events', 'Usage_Score']
+
+
+def preprocess_unit_economics_chunk(df):
+    # Runs per chunk in the ingestion workers. Mean fills need every row, so
+    # each chunk only reports its sums and counts for fill_missing_means.
+    df['latest_end'] = pd.to_datetime(df['latest_end'], format='ISO8601')
+    partials = {col: (float(df[col].sum()), int(df[col].count())) for col in MEAN_FILLED_COLUMNS}
+    for col in ZERO_FILLED_COLUMNS:
+        df[col] = df[col].fillna(0)
+    # Compact dtypes are applied before caching, so the Parquet file stores them too
+    return apply_schema(df), partials
+
+
+def fill_missing_means(df, chunk_partials):
+    for col in MEAN_FILLED_COLUMNS:
+        total = sum(partials[col][0] for partials in chunk_partials)
+        count = sum(partials[col][1] for partials in chunk_partials)
+        mean = total / count if count else np.nan
+        df[col] = df[col].fillna(df[col].dtype.type(mean))
+    return df
+
+
+def preprocess_unit_economics(df):
+    df, partials = preprocess_unit_economics_chunk(df)
+    return fill_missing_means(df, [partials])
+
+
+def ingest_unit_economics(paths=UNIT_ECONOMICS_CSV):
+    # Parses one or more customer extracts in parallel chunks with the explicit
+    # schema, validating every chunk; raises SchemaError on drift.
+    return ingest_csv(paths, UNIT_ECONOMICS_DTYPES, preprocess_unit_economics_chunk, fill_missing_means)
+
+
+# --- Cache bookkeeping ---
+def _file_hash(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 20), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_paths(csv_path):
+    name = os.path.splitext(os.path.basename(csv_path))[0]
+    return (os.path.join(CACHE_DIR, name + '.parquet'),
+            os.path.join(CACHE_DIR, name + '.json'))
+
+
+def _read_manifest(manifest_path):
+    try:
+        with open(manifest_path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def cache_is_fresh(csv_path, manifest):
+    if manifest is None or manifest.get('format') != CACHE_FORMAT:
+        return False
+    stat = os.stat(csv_path)
+    if manifest.get('size') != stat.st_size:
+        return False
+    if manifest.get('mtime_ns') == stat.st_mtime_ns:
+        return True
+    # The file was touched but may not have changed; only the content hash decides.
+    return manifest.get('sha256') == _file_hash(csv_path)
+
+
+def source_manifest(csv_path):
+    # What a cache built from `csv_path` records about it, for cache_is_fresh.
+    stat = os.stat(csv_path)
+    return {'format': CACHE_FORMAT,
+            'source': os.path.abspath(csv_path),
+            'size': stat.st_size,
+            'mtime_ns': stat.st_mtime_ns,
+            'sha256': _file_hash(csv_path)}
+
+
+def _write_cache(df, csv_path, parquet_path, manifest_path):
+    os.makedirs(CACHE_DIR, exist_ok=True)
+    manifest = source_manifest(csv_path)
+
+    # Write to temporary names and rename so a concurrent reader never sees a half-written file.
+    tmp_parquet = parquet_path + '.tmp-%d' % os.getpid()
+    tmp_manifest = manifest_path + '.tmp-%d' % os.getpid()
+    df.to_parquet(tmp_parquet, index=False)
+    with open(tmp_manifest, 'w') as f:
+        json.dump(manifest, f)
+    os.replace(tmp_parquet, parquet_path)
+    os.replace(tmp_manifest, manifest_path)
+
+
+def load_csv_cached(csv_path, parse):
+    # Raises FileNotFoundError if the source CSV is missing, even when a stale cache exists.
+    parquet_path, manifest_path = _cache_paths(csv_path)
+    manifest = _read_manifest(manifest_path)
+
+    if cache_is_fresh(csv_path, manifest) and os.path.exists(parquet_path):
+        try:
+            return pd.read_parquet(parquet_path)
+        except ImportError:
+            # No Parquet engine installed; fall through to parsing the CSV.
+            pass
+        except (OSError, ValueError):
+            # Corrupt or unreadable cache entry; rebuild it below.
+            pass
+
+    df = parse(csv_path)
+    try:
+        _write_cache(df, csv_path, parquet_path, manifest_path)
+    except ImportError:
+        pass
+    except OSError as e:
+        print(f"Warning: could not write data cache for '{csv_path}': {e}")
+    return df
+
+
+# --- Public loaders ---
+def load_unit_economics(path=UNIT_ECONOMICS_CSV):
+    # Customer IDs are packed into 16 bytes after loading; the cache keeps the
+    # text form, which every Parquet reader understands.
+    return pack_customer_ids(load_csv_cached(path, ingest_unit_economics))
+
@@ -0,0 +1,210 @@
+import argparse
+import csv
+import html
+import io
+import itertools
+import multiprocessing
+import os
+import re
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import plotly.io as pio
+from plotly.offline import get_plotlyjs
+
+from figures import (DISTRIBUTION_CHARTS, SEGMENT_CHARTS, TREND_CHARTS, distribution_figures, segment_figures,
+                     trend_figures)
+from filter_index import DIMENSIONS, normalize_filter_key
+from kpi_engine import KPI_MEASURES
+from quantile_sketch import PERCENTILES, SKETCH_COLUMNS
+from snapshot import build_snapshot
+
+# Usage, from the directory holding unit_economics.csv:
+#
+#   python export.py --by industry plan_name
+#   python export.py --by industry --where billing_frequency=annual --start 2025-01-01 --format json
+#
+# Every combination of the --by dimensions' values (other dimensions fully
+# selected unless narrowed with --where) is rendered in one process pool: KPIs
+# and percentiles into kpis.csv, figures as Plotly JSON and/or one HTML page
+# per combination. All combinations are answered from one snapshot's per-cell
+# partials, so each costs O(cells), not a pass over the customers.
+DEFAULT_OUTPUT_DIR = 'exports'
+EXPORT_WORKERS = int(os.environ.get('DASHBOARD_EXPORT_WORKERS', str(os.cpu_count() or 1)))
+
+CHART_IDS = list(DISTRIBUTION_CHARTS) + list(SEGMENT_CHARTS) + list(TREND_CHARTS)
+PERCENTILE_COLUMNS = [f'{column}_p{round(q * 100)}' for column in SKETCH_COLUMNS for q in PERCENTILES]
+KPI_CSV_COLUMNS = DIMENSIONS + ['customers'] + list(KPI_MEASURES) + PERCENTILE_COLUMNS
+
+
+# --- Combinations ---
+def combinations(snapshot, by, where=None):
+    # [(label, {dimension: selected values})] for every value combination of
+    # the `by` dimensions; `where` narrows the remaining ones.
+    where = where or {}
+    fixed = {dim: where.get(dim, snapshot.filter_options(dim)) for dim in DIMENSIONS}
+    result = []
+    for values in itertools.product(*[fixed[dim] for dim in by]):
+        selections = dict(fixed, **{dim: [value] for dim, value in zip(by, values)})
+        label = '__'.join(f'{dim}={value}' for dim, value in zip(by, values)) or 'all'
+        result.append((label, selections))
+    return result
+
+
+def _slug(label):
+    return re.sub(r'[^A-Za-z0-9._=-]+', '-', label).strip('-')
+
+
+# --- Rendering one combination ---
+# Worker processes inherit the parent's snapshot when they are forked; under
+# the spawn start method each one builds its own from the Parquet cache.
+_snapshot = None
+
+
+def _init_worker():
+    global _snapshot
+    if _snapshot is None:
+        _snapshot = build_snapshot()
+
+
+def _kpi_row(snapshot, filter_key, selections):
+    kpis = snapshot.kpis(filter_key)
+    percentiles = snapshot.percentiles(filter_key)
+    row = {dim: ' | '.join(selections[dim]) if len(selections[dim]) != len(snapshot.filter_options(dim)) else 'All'
+           for dim in DIMENSIONS}
+    row['customers'] = snapshot.customer_count(filter_key)
+    row.update(kpis)
+    for column in SKETCH_COLUMNS:
+        for q, value in zip(PERCENTILES, percentiles[column] or [None] * len(PERCENTILES)):
+            row[f'{column}_p{round(q * 100)}'] = value
+    return row
+
+
+def _write_csv(path, rows):
+    with open(path, 'w', newline='') as f:
+        writer = csv.DictWriter(f, fieldnames=KPI_CSV_COLUMNS)
+        writer.writeheader()
+        writer.writerows(rows)
+
+
+def _html_page(label, row, figures, plotlyjs):
+    parts = [f'<html><head><meta charset="utf-8"><title>{html.escape(label)}</title></head>',
+             '<body style="font-family: Arial, sans-serif">',
+             f'<h1>SaaS Unit Economics: {html.escape(label)}</h1>', '<table border="1" cellpadding="6">']
+    for name in ['customers'] + list(KPI_MEASURES) + PERCENTILE_COLUMNS:
+        value = row[name]
+        text = 'N/A' if value is None else (f'{value:.2f}' if isinstance(value, float) else str(value))
+        parts.append(f'<tr><th align="left">{html.escape(name)}</th><td>{text}</td></tr>')
+    parts.append('</table>')
+    for i, (chart_id, fig) in enumerate(zip(CHART_IDS, figures)):
+        parts.append(pio.to_html(fig, full_html=False, include_plotlyjs=plotlyjs if i == 0 else False,
+                                 validate=False, div_id=chart_id))
+    parts.append('</body></html>')
+    return '\n'.join(parts)
+
+
+def render(task):
+    # Writes one combination's kpis.csv, figure JSON and HTML page; returns its KPI row.
+    label, selections, date_range, output_dir, formats, plotlyjs = task
+    snapshot = _snapshot
+    filter_key = normalize_filter_key(*[selections[dim] for dim in DIMENSIONS], date_range=date_range)
+    row = _kpi_row(snapshot, filter_key, selections)
+    directory = os.path.join(output_dir, _slug(label))
+    os.makedirs(directory, exist_ok=True)
+    _write_csv(os.path.join(directory, 'kpis.csv'), [row])
+    if not formats:
+        return label, row
+
+    figures = (*distribution_figures(snapshot, filter_key), *segment_figures(snapshot, filter_key),
+               *trend_figures(snapshot, filter_key))
+    if 'json' in formats:
+        for chart_id, fig in zip(CHART_IDS, figures):
+            with open(os.path.join(directory, chart_id + '.json'), 'w') as f:
+                f.write(pio.to_json(fig, validate=False))
+    if 'html' in formats:
+        with io.open(os.path.join(directory, 'dashboard.html'), 'w', encoding='utf-8') as f:
+            f.write(_html_page(label, row, figures, plotlyjs))
+    return label, row
+
+
+# --- Batch ---
+def export(by, where=None, date_range=None, output_dir=DEFAULT_OUTPUT_DIR, formats=('json', 'html'),
+           plotlyjs='directory', workers=EXPORT_WORKERS, skip_empty=True, snapshot=None):
+    # Renders every combination and writes kpis.csv (one row per combination)
+    # to `output_dir`. Returns the number of combinations written.
+    global _snapshot
+    _snapshot = snapshot or _snapshot or build_snapshot()
+    os.makedirs(output_dir, exist_ok=True)
+    if 'html' in formats and plotlyjs == 'directory':
+        # One copy of plotly.js next to the per-combination directories
+        with open(os.path.join(output_dir, 'plotly.min.js'), 'w', encoding='utf-8') as f:
+            f.write(get_plotlyjs())
+        plotlyjs = '../plotly.min.js'
+
+    tasks = []
+    for label, selections in combinations(_snapshot, by, where):
+        filter_key = normalize_filter_key(*[selections[dim] for dim in DIMENSIONS], date_range=date_range)
+        if skip_empty and not _snapshot.has_data(filter_key):
+            continue
+        tasks.append((label, selections, date_range, output_dir, tuple(formats), plotlyjs))
+
+    if workers <= 1 or len(tasks) <= 1:
+        results = [render(task) for task in tasks]
+    else:
+        context = multiprocessing.get_context('fork' if 'fork' in multiprocessing.get_all_start_methods() else None)
+        with ProcessPoolExecutor(max_workers=min(workers, len(tasks)), mp_context=context,
+                                 initializer=_init_worker) as pool:
+            results = list(pool.map(render, tasks, chunksize=max(1, len(tasks) // (4 * workers))))
+
+    _write_csv(os.path.join(output_dir, 'kpis.csv'), [row for _, row in results])
+    return len(results)
+
+
+def _parse_where(items):
+    where = {}
+    for item in items or []:
+        dim, _, values = item.partition('=')
+        if dim not in DIMENSIONS or not values:
+            raise argparse.ArgumentTypeError(f"--where expects DIMENSION=VALUE[,VALUE...], got {item!r}")
+        where[dim] = values.split(',')
+    return where
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Render dashboard KPIs and figures for many filter combinations.')
+    parser.add_argument('--by', nargs='*', default=['industry', 'plan_name'], choices=DIMENSIONS,
+                        help='dimensions to split on; one output per value combination')
+    parser.add_argument('--where', action='append', metavar='DIMENSION=VALUE[,VALUE...]',
+                        help='restrict a dimension (repeatable)')
+    parser.add_argument('--start', help='first contract end date (YYYY-MM-DD)')
+    parser.add_argument('--end', help='last contract end date (YYYY-MM-DD)')
+    parser.add_argument('--output-dir', default=DEFAULT_OUTPUT_DIR)
+    parser.add_argument('--format', nargs='*', default=['json', 'html'], choices=['json', 'html'],
+                        help='figure formats; none writes only the KPI CSVs')
+    parser.add_argument('--plotlyjs', default='directory',
+                        help="'directory' (one local plotly.min.js), 'cdn', or a script URL")
+    parser.add_argument('--workers', type=int, default=EXPORT_WORKERS)
+    parser.add_argument('--keep-empty', action='store_true', help='also write combinations without customers')
+    args = parser.parse_args(argv)
+
+    try:
+        where = _parse_where(args.where)
+    except argparse.ArgumentTypeError as e:
+        parser.error(str(e))
+    started = time.perf_counter()
+    try:
+        snapshot = build_snapshot()
+    except FileNotFoundError:
+        print("Error: Make sure 'unit_economics.csv' is in the current directory.")
+        return 1
+    loaded = time.perf_counter()
+    count = export(args.by, where, (args.start, args.end), args.output_dir, args.format, args.plotlyjs,
+                   args.workers, not args.keep_empty, snapshot)
+    print(f"Exported {count} combination(s) to '{args.output_dir}' in {time.perf_counter() - loaded:.2f}s "
+          f"(data loaded in {loaded - started:.2f}s, {args.workers} worker(s)).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
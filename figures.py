@@ -0,0 +1,150 @@
+import functools
+
+import numpy as np
+import pandas as pd
+import plotly.express as px
+import plotly.graph_objects as go
+
+from histograms import LOG_SCALE_COLUMNS, histogram_skeleton, histogram_trace
+from instrumentation import stage
+
+# Every chart is a fixed skeleton (layout, template, trace styling) built once
+# per process, plus trace arrays and a title that change with the filters.
+# Figures are plain dicts holding contiguous NumPy arrays, which the orjson
+# engine of plotly.io.json encodes natively, without a per-element pass.
+
+# Chart id -> (column, x-axis title, title, title when the selection is empty)
+DISTRIBUTION_CHARTS = {
+    'ltv-cac-ratio-dist': ('LTV_CAC_Ratio', 'LTV_CAC_Ratio', 'Distribution of LTV to CAC Ratio',
+                           'No data for LTV/CAC Ratio Distribution'),
+    'cac-payback-dist': ('CAC_Payback_Months', 'CAC_Payback_Months', 'Distribution of CAC Payback Months',
+                         'No data for CAC Payback Months Distribution'),
+    'customer-health-dist': ('Customer_Health_Score', 'Customer_Health_Score', 'Distribution of Customer Health Score',
+                             'No data for Customer Health Score Distribution'),
+}
+
+# Chart id -> (dimension, measure, ascending, horizontal, colors, title, title when the selection is empty)
+SEGMENT_CHARTS = {
+    'avg-ltv-cac-industry': ('industry', 'Avg_LTV_CAC', False, True, px.colors.qualitative.Set2,
+                             'Average LTV/CAC Ratio by Industry', 'No data for Avg LTV/CAC by Industry'),
+    'avg-payback-industry': ('industry', 'Avg_Payback_Months', True, True, px.colors.qualitative.Set2,
+                             'Average Payback Months by Industry', 'No data for Avg Payback by Industry'),
+    'cust-count-company-size': ('company_size', 'Customer_Count', False, False, px.colors.qualitative.Set3,
+                                'Total Customer Count by Company Size', 'No data for Customer Count by Company Size'),
+    'avg-ltv-cac-plan': ('plan_name', 'Avg_LTV_CAC', False, True, px.colors.qualitative.Set1,
+                         'Average LTV/CAC Ratio by Plan Name', 'No data for Avg LTV/CAC by Plan Name'),
+}
+
+# Chart id -> (trend column, y-axis title, y-axis tick format, title, title when the selection is empty)
+TREND_CHARTS = {
+    'monthly-churn-trend': ('churn_rate', 'Churn Rate', '.0%', 'Churn Rate by Contract End Month',
+                            'No data for Churn Rate by Contract End Month'),
+    'cohort-ltv-cac-trend': ('avg_ltv_cac', 'Avg LTV/CAC', '', 'Average LTV/CAC Ratio by Contract End Month Cohort',
+                             'No data for Avg LTV/CAC by Contract End Month'),
+}
+
+
+# --- Skeletons ---
+@functools.lru_cache(maxsize=None)
+def figure_skeleton(chart_id):
+    # Treat the returned dict as read-only; build_figure copies what it changes.
+    if chart_id in DISTRIBUTION_CHARTS:
+        _, x_title, title, _ = DISTRIBUTION_CHARTS[chart_id]
+        return histogram_skeleton(x_title, title)
+    if chart_id in TREND_CHARTS:
+        _, y_title, tick_format, title, _ = TREND_CHARTS[chart_id]
+        fig = go.Figure(go.Scatter(x=[], y=[], mode='lines+markers', connectgaps=False,
+                                   line_color=px.colors.qualitative.Plotly[0]))
+        fig.update_layout(title=title, xaxis_title='Contract end month', yaxis_title=y_title,
+                          yaxis_tickformat=tick_format)
+        return fig.to_dict()
+    dimension, measure, _, horizontal, colors, title, _ = SEGMENT_CHARTS[chart_id]
+    empty = pd.DataFrame({dimension: pd.Series([], dtype=object), measure: pd.Series([], dtype=float)})
+    x, y = (measure, dimension) if horizontal else (dimension, measure)
+    return px.bar(empty, x=x, y=y, orientation='h' if horizontal else 'v', title=title,
+                  color_discrete_sequence=colors).to_dict()
+
+
+def build_figure(chart_id, update):
+    # Skeleton with the trace arrays and title of `update` filled in.
+    skeleton = figure_skeleton(chart_id)
+    trace, title = update
+    layout = dict(skeleton['layout'], title=dict(skeleton['layout']['title'], text=title))
+    return {'data': [dict(skeleton['data'][0], **trace)], 'layout': layout}
+
+
+# --- Customer-Level Distributions ---
+def distribution_updates(snapshot, filter_key):
+    # {chart id: (trace arrays, title)} for the LTV/CAC, CAC payback and health
+    # score histograms, summed from the snapshot's per-cell partial histograms.
+    has_data = snapshot.has_data(filter_key)
+
+    updates = {}
+    with stage('histogram'):
+        for chart_id, (column, _, title, empty_title) in DISTRIBUTION_CHARTS.items():
+            if has_data:
+                trace = histogram_trace(snapshot.histogram_counts(filter_key, column),
+                                        snapshot.histogram_edges(column), column in LOG_SCALE_COLUMNS)
+                updates[chart_id] = (trace, title)
+            else:
+                updates[chart_id] = ({'x': [], 'y': [], 'width': [], 'hovertext': []}, empty_title)
+    return updates
+
+
+def distribution_figures(snapshot, filter_key):
+    updates = distribution_updates(snapshot, filter_key)
+    with stage('figure_build'):
+        return tuple(build_figure(chart_id, updates[chart_id]) for chart_id in DISTRIBUTION_CHARTS)
+
+
+# --- Segment-Level Analysis ---
+def segment_updates(snapshot, filter_key):
+    # {chart id: (trace arrays, title)}. Roll-ups sum the cube's per-cell
+    # partials, giving customer-weighted averages.
+    has_data = snapshot.has_data(filter_key)
+
+    updates = {}
+    rollups = {}
+    with stage('groupby'):
+        for chart_id, (dimension, measure, ascending, horizontal, _, title, empty_title) in SEGMENT_CHARTS.items():
+            if not has_data:
+                updates[chart_id] = ({'x': [], 'y': []}, empty_title)
+                continue
+            if dimension not in rollups:
+                rollups[dimension] = snapshot.segment_rollup(filter_key, dimension)
+            ordered = rollups[dimension][[dimension, measure]].sort_values(by=measure, ascending=ascending)
+            labels = ordered[dimension].astype(str).tolist()
+            values = np.ascontiguousarray(ordered[measure].to_numpy())
+            trace = {'x': values, 'y': labels} if horizontal else {'x': labels, 'y': values}
+            updates[chart_id] = (trace, title)
+    return updates
+
+
+def segment_figures(snapshot, filter_key):
+    updates = segment_updates(snapshot, filter_key)
+    with stage('figure_build'):
+        return tuple(build_figure(chart_id, updates[chart_id]) for chart_id in SEGMENT_CHARTS)
+
+
+# --- Time-Series Trends ---
+def trend_updates(snapshot, filter_key):
+    # {chart id: (trace arrays, title)}, one point per contract end month from
+    # the snapshot's monthly per-cell partials. Empty months leave a gap.
+    with stage('trend'):
+        trend = snapshot.trend(filter_key)
+    months = np.datetime_as_string(trend['month'].to_numpy().astype('datetime64[D]')).tolist()
+
+    updates = {}
+    for chart_id, (column, _, _, title, empty_title) in TREND_CHARTS.items():
+        if trend.empty:
+            updates[chart_id] = ({'x': [], 'y': []}, empty_title)
+            continue
+        values = trend[column].to_numpy()
+        updates[chart_id] = ({'x': months, 'y': np.where(np.isfinite(values), values, None).tolist()}, title)
+    return updates
+
+
+def trend_figures(snapshot, filter_key):
+    updates = trend_updates(snapshot, filter_key)
+    with stage('figure_build'):
+        return tuple(build_figure(chart_id, updates[chart_id]) for chart_id in TREND_CHARTS)
@@ -0,0 +1,89 @@
+import numpy as np
+import pandas as pd
+
+from time_index import normalize_date_range, parse_date_range
+
+# The four dimension filters shared by both dashboards.
+DIMENSIONS = ['industry', 'company_size', 'plan_name', 'billing_frequency']
+
+
+class FilterIndex:
+    # Bitmap index over the categorical dimension columns of a frame.
+    #
+    # Each dimension is stored as integer category codes plus one packed bitmap
+    # (1 bit per row) per distinct value. A filter selection is resolved by OR-ing
+    # the bitmaps of the selected values within a dimension and AND-ing the
+    # results across dimensions, so no string comparisons happen per interaction.
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.n_rows = len(df)
+        self.dimensions = list(dimensions)
+        self.codes = {}
+        self.categories = {}
+        self.bitmaps = {}
+        for dim in self.dimensions:
+            codes, uniques = pd.factorize(df[dim], sort=True)
+            self.codes[dim] = codes.astype(np.min_scalar_type(-max(len(uniques), 1)))
+            self.categories[dim] = {value: code for code, value in enumerate(uniques)}
+            self.bitmaps[dim] = [np.packbits(codes == code) for code in range(len(uniques))]
+
+    def _all_rows(self):
+        return np.packbits(np.ones(self.n_rows, dtype=bool))
+
+    def _dimension_bitmap(self, dim, selected_values):
+        lookup = self.categories[dim]
+        bitmaps = self.bitmaps[dim]
+        selected = {lookup[v] for v in (selected_values or []) if v in lookup}
+
+        if len(selected) == len(bitmaps):
+            return None  # Every value selected: this dimension does not restrict rows.
+        if not selected:
+            return np.zeros_like(self._all_rows())
+
+        # Work from whichever side is smaller, so selecting most values of a
+        # dimension costs as little as selecting a few.
+        if len(selected) <= len(bitmaps) // 2:
+            return np.bitwise_or.reduce([bitmaps[c] for c in selected])
+        excluded = [bitmaps[c] for c in range(len(bitmaps)) if c not in selected]
+        return np.invert(np.bitwise_or.reduce(excluded)) & self._all_rows()
+
+    def packed_mask(self, selections):
+        result = None
+        for dim in self.dimensions:
+            if dim not in selections:
+                continue
+            bitmap = self._dimension_bitmap(dim, selections[dim])
+            if bitmap is None:
+                continue
+            result = bitmap if result is None else result & bitmap
+        return self._all_rows() if result is None else result
+
+    def mask(self, selections):
+        # `selections` maps a dimension name to the list of selected values; a
+        # dimension that is missing from the mapping is left unfiltered.
+        return np.unpackbits(self.packed_mask(selections), count=self.n_rows).astype(bool)
+
+
+def filter_selections(industries, company_sizes, plan_names, billing_frequencies):
+    return {'industry': industries,
+            'company_size': company_sizes,
+            'plan_name': plan_names,
+            'billing_frequency': billing_frequencies}
+
+
+def normalize_filter_key(industries, company_sizes, plan_names, billing_frequencies, date_range=None):
+    # Order of the selected values does not change the result, so sort them to
+    # make equivalent selections share one cache entry. A contract end date
+    # window, when set, is appended as a fifth ['YYYY-MM-DD', 'YYYY-MM-DD'] entry
+    # ('' for an open bound).
+    key = [sorted(values or []) for values in (industries, company_sizes, plan_names, billing_frequencies)]
+    window = normalize_date_range(date_range)
+    if window is not None:
+        key.append(window)
+    return key
+
+
+def split_filter_key(filter_key):
+    # (the four dimension selections, (start date, end date) or None)
+    window = parse_date_range(filter_key[len(DIMENSIONS)]) if len(filter_key) > len(DIMENSIONS) else None
+    return list(filter_key[:len(DIMENSIONS)]), window
@@ -0,0 +1,133 @@
+import numpy as np
+import plotly.express as px
+import plotly.graph_objects as go
+
+# Number of bins per distribution chart, matching the previous px.histogram nbins.
+HISTOGRAM_BINS = {
+    'LTV_CAC_Ratio': 50,
+    'CAC_Payback_Months': 50,
+    'Customer_Health_Score': 20,
+}
+
+# Columns spanning several orders of magnitude (LTV_CAC_Ratio runs from about
+# -40 into the millions) are binned evenly on a signed log scale,
+# sign(x) * log(1 + |x|), and drawn as labelled bars of equal width.
+LOG_SCALE_COLUMNS = ['LTV_CAC_Ratio', 'CAC_Payback_Months']
+
+# Bins are spread between these quantiles; a tail reaching further out than
+# that range is wide is gathered into an open-ended first or last bin, so a
+# few outliers cannot squeeze everyone else into one bar.
+TAIL_QUANTILES = (0.01, 0.99)
+
+
+def tail_ranks(n_values):
+    # Positions in the sorted values of the TAIL_QUANTILES (as ranked by both backends).
+    return [int(q * (n_values - 1)) for q in TAIL_QUANTILES]
+
+
+def robust_edges(minimum, maximum, low, high, n_bins, log_scale=False):
+    # Edges from the value range and its tail quantiles; an open-ended bin has
+    # an infinite outer edge.
+    bounds = minimum, maximum
+    if log_scale:
+        minimum, maximum, low, high = np.sign([minimum, maximum, low, high]) * np.log1p(
+            np.abs([minimum, maximum, low, high]))
+    span = high - low
+    lower_tail = bool(span > 0 and low - minimum > span)
+    upper_tail = bool(span > 0 and maximum - high > span)
+    inner_low = low if lower_tail else minimum
+    inner_high = high if upper_tail else maximum
+    if inner_low == inner_high:
+        inner_low, inner_high = inner_low - 0.5, inner_high + 0.5
+    edges = np.linspace(inner_low, inner_high, n_bins + 1 - lower_tail - upper_tail)
+    if log_scale:
+        edges = np.sign(edges) * np.expm1(np.abs(edges))
+        # The round trip through the log may move the range ends past the data.
+        if not lower_tail:
+            edges[0] = min(edges[0], bounds[0])
+        if not upper_tail:
+            edges[-1] = max(edges[-1], bounds[1])
+    return np.concatenate([[-np.inf]] * lower_tail + [edges] + [[np.inf]] * upper_tail)
+
+
+def fixed_edges(values, n_bins, log_scale=False):
+    finite = values[np.isfinite(values)]
+    if finite.size == 0:
+        return np.linspace(0.0, 1.0, n_bins + 1)
+    ranks = tail_ranks(finite.size)
+    low, high = np.partition(finite, ranks)[ranks]
+    return robust_edges(float(finite.min()), float(finite.max()), float(low), float(high), n_bins, log_scale)
+
+
+def bin_indices(values, edges):
+    # Index of the bin each value falls into, with the last bin closed on the
+    # right like np.histogram; -1 marks missing or out-of-range values.
+    n_bins = len(edges) - 1
+    idx = np.searchsorted(edges, values, side='right') - 1
+    idx[values == edges[-1]] = n_bins - 1
+    idx[(idx < 0) | (idx >= n_bins) | ~np.isfinite(values)] = -1
+    return idx.astype(np.int16 if n_bins < np.iinfo(np.int16).max else np.int32)
+
+
+class HistogramEngine:
+    # Server-side histograms over fixed bin edges.
+    #
+    # Bin indices are computed once per column, and per-cell partial histograms
+    # (a cells x bins count matrix) are summed to answer any dimension filter
+    # without rescanning rows. Arbitrary row masks are served with a bincount
+    # over the precomputed indices.
+
+    def __init__(self, df, cells, bins=HISTOGRAM_BINS):
+        self.cells = cells
+        self.edges = {}
+        self.indices = {}
+        self.partials = {}
+        for column, n_bins in bins.items():
+            values = df[column].to_numpy(dtype=float)
+            edges = fixed_edges(values, n_bins, column in LOG_SCALE_COLUMNS)
+            idx = bin_indices(values, edges)
+            valid = idx >= 0
+            flat = cells.cell_ids[valid].astype(np.int64) * n_bins + idx[valid]
+            self.edges[column] = edges
+            self.indices[column] = idx
+            self.partials[column] = np.bincount(flat, minlength=cells.n_cells * n_bins).reshape(cells.n_cells, n_bins)
+
+    def counts_for_cells(self, column, cell_mask):
+        return self.partials[column][cell_mask].sum(axis=0)
+
+    def counts_for_rows(self, column, row_mask):
+        idx = self.indices[column][row_mask]
+        return np.bincount(idx[idx >= 0], minlength=len(self.edges[column]) - 1)
+
+
+def histogram_skeleton(x_title, title):
+    # Bar chart layout for one distribution, with empty trace arrays to be
+    # filled by histogram_trace.
+    fig = go.Figure(go.Bar(x=[], y=[], width=[], hovertext=[], marker_color=px.colors.qualitative.Plotly[0]))
+    fig.update_layout(title=title, xaxis_title=x_title, yaxis_title='count', bargap=0)
+    return fig.to_dict()
+
+
+def bin_labels(edges):
+    labels = [f'{low:.3g} to {high:.3g}' for low, high in zip(edges[:-1], edges[1:])]
+    if np.isinf(edges[0]):
+        labels[0] = f'below {edges[1]:.3g}'
+    if np.isinf(edges[-1]):
+        labels[-1] = f'{edges[-2]:.3g} and above'
+    return labels
+
+
+def histogram_trace(counts, edges, log_scale=False):
+    # Compact bar data of at most 50 counts, independent of the number of rows.
+    # Log-scale bins are drawn as one labelled bar each; on a linear axis,
+    # open-ended tail bins are drawn as wide as their neighbour.
+    labels = bin_labels(edges)
+    counts = np.asarray(counts, dtype=np.int64)
+    if log_scale:
+        return {'x': labels, 'y': counts, 'width': np.ones(len(counts)), 'hovertext': labels}
+    shown = np.array(edges, dtype=float)
+    if np.isinf(shown[0]):
+        shown[0] = 2 * shown[1] - shown[2]
+    if np.isinf(shown[-1]):
+        shown[-1] = 2 * shown[-2] - shown[-3]
+    return {'x': (shown[:-1] + shown[1:]) / 2, 'y': counts, 'width': np.diff(shown), 'hovertext': labels}
@@ -0,0 +1,169 @@
+import io
+import multiprocessing
+import os
+import sys
+import threading
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+
+from schema import SchemaError, validate_frame
+
+# Worker processes used to parse large extracts, and the target size of the
+# byte range each one parses. Extracts smaller than one chunk are parsed in-process.
+INGEST_WORKERS = int(os.environ.get('DASHBOARD_INGEST_WORKERS', str(os.cpu_count() or 1)))
+INGEST_CHUNK_BYTES = int(os.environ.get('DASHBOARD_INGEST_CHUNK_BYTES', str(64 << 20)))
+
+
+# --- Planning ---
+def _header(path):
+    with open(path, 'rb') as f:
+        line = f.readline()
+    return line, pd.read_csv(io.BytesIO(line)).columns.tolist()
+
+
+def plan_chunks(paths, chunk_bytes=INGEST_CHUNK_BYTES):
+    # Splits each file after its header into byte ranges that end on a line
+    # break. Assumes no quoted field contains a newline, which holds for the
+    # flat extracts this dashboard reads.
+    chunks = []
+    columns = None
+    for path in paths:
+        header, file_columns = _header(path)
+        if columns is None:
+            columns = file_columns
+        elif file_columns != columns:
+            raise SchemaError(f"Columns of '{path}' differ from '{paths[0]}'")
+        size = os.path.getsize(path)
+        with open(path, 'rb') as f:
+            start = len(header)
+            while start < size:
+                f.seek(min(start + chunk_bytes, size))
+                f.readline()
+                end = min(f.tell(), size)
+                chunks.append((path, start, end))
+                start = end
+    return columns, chunks
+
+
+# --- Per-chunk work ---
+def _parse_chunk(path, start, end, columns, dtypes, preprocess):
+    # Runs in a worker: parses, validates and preprocesses one byte range.
+    source = f'{path} (bytes {start}-{end})'
+    dtypes = {col: dtype for col, dtype in dtypes.items() if col in columns}
+    with open(path, 'rb') as f:
+        f.seek(start)
+        data = f.read(end - start)
+    try:
+        if data:
+            df = pd.read_csv(io.BytesIO(data), header=None, names=columns, dtype=dtypes)
+        else:
+            df = pd.DataFrame({col: pd.Series(dtype=dtypes.get(col, object)) for col in columns})
+    except (ValueError, pd.errors.ParserError) as e:
+        raise SchemaError(f'Could not parse {source}: {e}') from e
+    validate_frame(df, source)
+    try:
+        return preprocess(df)
+    except (ValueError, TypeError) as e:
+        raise SchemaError(f'Could not preprocess {source}: {e}') from e
+
+
+# --- Combining ---
+def _unify_categories(frames):
+    # Chunks see different subsets of each categorical's values; recode them to
+    # one shared, sorted category list so concatenation keeps the dtype.
+    for col in frames[0].columns:
+        if not isinstance(frames[0][col].dtype, pd.CategoricalDtype):
+            continue
+        categories = pd.Index(sorted(set().union(*(frame[col].cat.categories for frame in frames))))
+        for frame in frames:
+            frame[col] = frame[col].cat.set_categories(categories)
+    return frames
+
+
+# Worker processes forked by start_worker_pool() and kept for every later ingest.
+_worker_pool = None
+
+
+def _noop():
+    return None
+
+
+def start_worker_pool(workers=INGEST_WORKERS):
+    # Forks the ingest workers now, while the caller is the only thread, and
+    # keeps them for later calls: reloads run on a background thread of a
+    # multithreaded server, where forking could copy locks held by other
+    # threads into the children (and forkserver/spawn workers would re-run an
+    # entry script that loads data at import time). Call it before starting
+    # any thread; it does nothing otherwise.
+    global _worker_pool
+    if _worker_pool is not None or workers <= 1 or threading.active_count() > 1:
+        return _worker_pool
+    _worker_pool = ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context('fork'))
+    # A fork-context pool starts all of its processes on the first submit.
+    _worker_pool.submit(_noop).result()
+    return _worker_pool
+
+
+def _parse_in_workers(chunks, columns, dtypes, preprocess, workers):
+    if _worker_pool is not None:
+        futures = [_worker_pool.submit(_parse_chunk, path, start, end, columns, dtypes, preprocess)
+                   for path, start, end in chunks]
+        return [future.result() for future in futures]
+    if threading.active_count() > 1:
+        # Forking here is unsafe and no pool was started up front; parse in-process.
+        return [_parse_chunk(path, start, end, columns, dtypes, preprocess) for path, start, end in chunks]
+    with ProcessPoolExecutor(max_workers=min(workers, len(chunks)),
+                             mp_context=multiprocessing.get_context('fork')) as pool:
+        futures = [pool.submit(_parse_chunk, path, start, end, columns, dtypes, preprocess)
+                   for path, start, end in chunks]
+        return [future.result() for future in futures]
+
+
+def ingest_csv(paths, dtypes, preprocess, finalize=None, workers=INGEST_WORKERS, chunk_bytes=INGEST_CHUNK_BYTES):
+    # Reads one or more CSV files with the same header into a single frame.
+    #
+    # `preprocess(chunk)` returns (frame, partials) and runs in worker
+    # processes; `finalize(frame, list_of_partials)` then runs once on the
+    # concatenated frame for steps that need every row (e.g. filling with a
+    # global mean). Raises SchemaError on the first chunk that fails validation.
+    if isinstance(paths, str):
+        paths = [paths]
+    columns, chunks = plan_chunks(paths, chunk_bytes)
+    if not chunks:
+        # Header-only extract: one empty chunk still yields correctly typed columns.
+        chunks = [(paths[0], 0, 0)]
+    if len(chunks) <= 1 or workers <= 1:
+        results = [_parse_chunk(path, start, end, columns, dtypes, preprocess) for path, start, end in chunks]
+    else:
+        results = _parse_in_workers(chunks, columns, dtypes, preprocess, workers)
+
+    frames = _unify_categories([frame for frame, _ in results])
+    df = pd.concat(frames, ignore_index=True)
+    if finalize is not None:
+        df = finalize(df, [partials for _, partials in results])
+    return df
+
+
+def _main(argv):
+    # `python ingest.py part-1.csv [part-2.csv ...]` validates an extract and
+    # reports how long ingestion takes, without touching the dashboard cache.
+    from data_loader import ingest_unit_economics
+
+    if len(argv) < 2:
+        print("Usage: python ingest.py <unit_economics.csv> [more part files ...]")
+        return 2
+    started = time.perf_counter()
+    try:
+        df = ingest_unit_economics(argv[1:])
+    except SchemaError as e:
+        print(f"Schema error: {e}")
+        return 1
+    print(f"Ingested {len(df)} rows from {len(argv) - 1} file(s) in {time.perf_counter() - started:.2f}s "
+          f"({df.memory_usage(deep=True).sum() / 2**20:.1f} MiB in memory).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,246 @@
+import contextlib
+import functools
+import os
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Opt-in timing instrumentation. With DASHBOARD_METRICS unset every helper
+# below is a no-op (callbacks are not even wrapped).
+METRICS_ENABLED = os.environ.get('DASHBOARD_METRICS', '') not in ('', '0')
+
+# Port for a standalone /metrics server, for apps without their own web server (Streamlit).
+METRICS_PORT = int(os.environ.get('DASHBOARD_METRICS_PORT', '0'))
+
+# A sampled fraction of callback runs is profiled; profiles of runs slower than
+# DASHBOARD_PROFILE_SLOW_MS are written to DASHBOARD_PROFILE_DIR. 0 disables profiling.
+PROFILE_SLOW_MS = float(os.environ.get('DASHBOARD_PROFILE_SLOW_MS', '0'))
+PROFILE_SAMPLE_RATE = float(os.environ.get('DASHBOARD_PROFILE_SAMPLE_RATE', '0.1'))
+PROFILE_DIR = os.environ.get('DASHBOARD_PROFILE_DIR', 'profiles')
+# 'cprofile' (standard library, .prof files) or 'pyinstrument' (.html, if installed)
+PROFILER = os.environ.get('DASHBOARD_PROFILER', 'cprofile')
+
+DURATION_BUCKETS = (0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+ROW_BUCKETS = (0, 10, 100, 1000, 10000, 100000, 1000000, 10000000)
+BYTE_BUCKETS = (1000, 10000, 100000, 1000000, 10000000, 100000000)
+
+
+class Histogram:
+    # Cumulative-bucket histogram with one label, rendered in the Prometheus
+    # text exposition format.
+
+    def __init__(self, name, description, label, buckets):
+        self.name = name
+        self.description = description
+        self.label = label
+        self.buckets = tuple(buckets)
+        self._series = {}
+        self._lock = threading.Lock()
+
+    def observe(self, label_value, value):
+        with self._lock:
+            series = self._series.get(label_value)
+            if series is None:
+                series = self._series[label_value] = [[0] * len(self.buckets), 0.0, 0]
+            counts = series[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+            series[1] += value
+            series[2] += 1
+
+    def render(self):
+        lines = [f'# HELP {self.name} {self.description}', f'# TYPE {self.name} histogram']
+        with self._lock:
+            series = {key: (list(counts), total, count) for key, (counts, total, count) in self._series.items()}
+        for label_value in sorted(series):
+            counts, total, count = series[label_value]
+            label = f'{self.label}="{_escape(label_value)}"'
+            for bound, bucket_count in zip(self.buckets, counts):
+                lines.append(f'{self.name}_bucket{{{label},le="{bound:g}"}} {bucket_count}')
+            lines.append(f'{self.name}_bucket{{{label},le="+Inf"}} {count}')
+            lines.append(f'{self.name}_sum{{{label}}} {total:.6g}')
+            lines.append(f'{self.name}_count{{{label}}} {count}')
+        return lines
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+STAGE_SECONDS = Histogram('dashboard_stage_duration_seconds',
+                          'Time spent in one stage of a callback or script section.', 'stage', DURATION_BUCKETS)
+STAGE_ROWS = Histogram('dashboard_stage_rows', 'Rows produced by a stage.', 'stage', ROW_BUCKETS)
+CALLBACK_SECONDS = Histogram('dashboard_callback_duration_seconds',
+                             'Time spent in a callback function.', 'callback', DURATION_BUCKETS)
+REQUEST_SECONDS = Histogram('dashboard_request_duration_seconds',
+                            'Time to answer a Dash callback request, including JSON serialization.',
+                            'callback', DURATION_BUCKETS)
+RESPONSE_BYTES = Histogram('dashboard_response_bytes',
+                           'Size of the serialized outputs of a Dash callback request.', 'callback', BYTE_BUCKETS)
+HISTOGRAMS = [STAGE_SECONDS, STAGE_ROWS, CALLBACK_SECONDS, REQUEST_SECONDS, RESPONSE_BYTES]
+
+
+def render_metrics():
+    return '\n'.join(line for histogram in HISTOGRAMS for line in histogram.render()) + '\n'
+
+
+# --- Stage timing ---
+@contextlib.contextmanager
+def stage(name):
+    if not METRICS_ENABLED:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.observe(name, time.perf_counter() - started)
+
+
+def record_rows(name, rows):
+    if METRICS_ENABLED:
+        STAGE_ROWS.observe(name, rows)
+
+
+# --- Sampled profiling ---
+# Only one run is profiled at a time; the profilers hook the interpreter globally.
+_profile_lock = threading.Lock()
+
+
+def _start_profiler():
+    if not PROFILE_SLOW_MS or random.random() >= PROFILE_SAMPLE_RATE:
+        return None
+    if not _profile_lock.acquire(blocking=False):
+        return None
+    try:
+        if PROFILER == 'pyinstrument':
+            from pyinstrument import Profiler
+            profiler = Profiler()
+            profiler.start()
+        else:
+            import cProfile
+            profiler = cProfile.Profile()
+            profiler.enable()
+        return profiler
+    except Exception:
+        # Profiler missing or another one already active; skip this sample.
+        _profile_lock.release()
+        return None
+
+
+def _finish_profile(profiler, name, elapsed):
+    try:
+        if PROFILER == 'pyinstrument':
+            profiler.stop()
+        else:
+            profiler.disable()
+        if elapsed * 1000 < PROFILE_SLOW_MS:
+            return
+        os.makedirs(PROFILE_DIR, exist_ok=True)
+        base = os.path.join(PROFILE_DIR, f"{time.strftime('%Y%m%d-%H%M%S')}-{name}-{elapsed * 1000:.0f}ms")
+        if PROFILER == 'pyinstrument':
+            with open(base + '.html', 'w') as f:
+                f.write(profiler.output_html())
+        else:
+            profiler.dump_stats(base + '.prof')
+    except OSError as e:
+        print(f"Warning: could not write profile for '{name}': {e}")
+    finally:
+        _profile_lock.release()
+
+
+@contextlib.contextmanager
+def profiled(name):
+    # Profiles a sampled run of the enclosed block. The profilers only see the
+    # thread that starts them, so this has to wrap the code doing the work, not
+    # a request thread waiting for another thread to finish it.
+    profiler = _start_profiler()
+    if profiler is None:
+        yield
+        return
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        _finish_profile(profiler, name, time.perf_counter() - started)
+
+
+def instrumented(name, profile=True):
+    # Decorator timing a whole callback (and profiling sampled slow runs).
+    # Callbacks that hand their computation to another thread pass
+    # profile=False and wrap that computation in profiled() instead.
+    def decorate(fn):
+        if not METRICS_ENABLED and not PROFILE_SLOW_MS:
+            return fn
+
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            started = time.perf_counter()
+            try:
+                with profiled(name) if profile else contextlib.nullcontext():
+                    return fn(*args, **kwargs)
+            finally:
+                if METRICS_ENABLED:
+                    CALLBACK_SECONDS.observe(name, time.perf_counter() - started)
+        return wrapper
+    return decorate
+
+
+# --- Exposition ---
+def instrument_dash(app):
+    # Adds /metrics to the Dash server and measures every callback request
+    # end to end, including the JSON encoding of its outputs.
+    if not METRICS_ENABLED:
+        return app
+    import flask
+
+    server = app.server
+
+    @server.route('/metrics')
+    def metrics():
+        return flask.Response(render_metrics(), mimetype='text/plain; version=0.0.4')
+
+    @server.before_request
+    def start_timer():
+        flask.g.dashboard_request_started = time.perf_counter()
+
+    @server.after_request
+    def record_request(response):
+        if flask.request.path.endswith('/_dash-update-component'):
+            payload = flask.request.get_json(silent=True) or {}
+            # '..a.figure...b.figure..' -> 'a': the first output names the callback
+            callback = payload.get('output', 'unknown').strip('.').split('.')[0]
+            REQUEST_SECONDS.observe(callback, time.perf_counter() - flask.g.dashboard_request_started)
+            if response.content_length is not None:
+                RESPONSE_BYTES.observe(callback, response.content_length)
+        return response
+
+    return app
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split('?')[0] != '/metrics':
+            self.send_error(404)
+            return
+        body = render_metrics().encode()
+        self.send_response(200)
+        self.send_header('Content-Type', 'text/plain; version=0.0.4')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_metrics_server(port=METRICS_PORT):
+    # Serves /metrics on its own port from a daemon thread; returns None when
+    # metrics or the port are not configured.
+    if not METRICS_ENABLED or not port:
+        return None
+    server = ThreadingHTTPServer(('0.0.0.0', port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    return server
@@ -0,0 +1,81 @@
+import numpy as np
+import pandas as pd
+
+from filter_index import DIMENSIONS, FilterIndex
+
+# KPI card name and the customer-level column it averages.
+KPI_MEASURES = {
+    'avg_ltv_cac': 'LTV_CAC_Ratio',
+    'avg_cac_payback': 'CAC_Payback_Months',
+    'churn_rate': 'Churned',
+    'avg_health_score': 'Customer_Health_Score',
+}
+
+
+class KPIEngine:
+    # KPI averages kept as mergeable (sum, count) partials per dimension cell;
+    # a filter's KPIs merge the partials of the cells it selects.
+
+    def __init__(self, df, dimensions=DIMENSIONS, measures=KPI_MEASURES):
+        self.dimensions = list(dimensions)
+        self.measures = dict(measures)
+        self.columns = list(dict.fromkeys(self.measures.values()))
+
+        self.cells = []
+        self._cell_index = None
+        cell_ids = self._cell_ids_for(df)
+        n_cells = len(self.cells)
+        self.sums = np.zeros((n_cells, len(self.columns)))
+        self.counts = np.zeros((n_cells, len(self.columns)))
+        values = df[self.columns].to_numpy(dtype=float)
+        valid = np.isfinite(values)
+        for j in range(len(self.columns)):
+            self.sums[:, j] = np.bincount(cell_ids, weights=np.where(valid[:, j], values[:, j], 0.0),
+                                          minlength=n_cells)
+            self.counts[:, j] = np.bincount(cell_ids, weights=valid[:, j], minlength=n_cells)
+        self.rows = np.bincount(cell_ids, minlength=n_cells).astype(float)
+
+    # --- Cells ---
+    def _cell_ids_for(self, frame):
+        # Only the distinct dimension combinations are looked up in Python;
+        # rows are grouped by combining the per-dimension factorized codes.
+        combined = np.zeros(len(frame), dtype=np.int64)
+        for dim in self.dimensions:
+            dim_codes, uniques = pd.factorize(frame[dim])
+            combined = combined * (len(uniques) + 1) + (dim_codes + 1)
+        _, first, codes = np.unique(combined, return_index=True, return_inverse=True)
+        self.cells = list(frame[self.dimensions].iloc[first].itertuples(index=False, name=None))
+        return codes.reshape(-1)
+
+    def cell_index(self):
+        if self._cell_index is None:
+            self._cell_index = FilterIndex(pd.DataFrame(self.cells, columns=self.dimensions), self.dimensions)
+        return self._cell_index
+
+    # --- Queries ---
+    def totals(self, cell_mask=None):
+        # Merged (sums, counts) over the selected cells, one entry per measure column.
+        if cell_mask is None:
+            return self.sums.sum(axis=0), self.counts.sum(axis=0)
+        return self.sums[cell_mask].sum(axis=0), self.counts[cell_mask].sum(axis=0)
+
+    def kpis(self, selections=None):
+        # Mapping of KPI name to its value, or None when no customers match.
+        cell_mask = None if selections is None else self.cell_index().mask(selections)
+        sums, counts = self.totals(cell_mask)
+        result = {}
+        for name, column in self.measures.items():
+            j = self.columns.index(column)
+            result[name] = sums[j] / counts[j] if counts[j] > 0 else None
+        return result
+
+
+def kpis_for_rows(df, row_mask, measures=KPI_MEASURES):
+    # The same mapping as KPIEngine.kpis, averaged directly over the selected
+    # rows; for selections that do not line up with dimension cells.
+    result = {}
+    for name, column in measures.items():
+        values = df[column].to_numpy(dtype=float)[row_mask]
+        values = values[np.isfinite(values)]
+        result[name] = values.mean() if values.size else None
+    return result
@@ -0,0 +1,91 @@
+import numpy as np
+
+# Columns with percentile sketches, and the percentiles shown next to the KPI cards.
+SKETCH_COLUMNS = ['LTV_CAC_Ratio', 'CAC_Payback_Months', 'Customer_Health_Score']
+PERCENTILES = (0.1, 0.5, 0.9)
+
+# Every estimate is within this fraction of a true value of the requested
+# rank. Magnitudes below MIN_MAGNITUDE share one bucket with zero.
+RELATIVE_ACCURACY = 0.01
+MIN_MAGNITUDE = 1e-3
+
+
+class _Buckets:
+    # Logarithmic buckets over one column's value range (as in DDSketch):
+    # bucket k holds magnitudes in (gamma^(k-1), gamma^k]. Codes are ordered
+    # like the values: negative buckets, then zero, then positive buckets.
+
+    def __init__(self, values, relative_accuracy=RELATIVE_ACCURACY):
+        self.gamma = (1 + relative_accuracy) / (1 - relative_accuracy)
+        finite = values[np.isfinite(values)]
+        negative = self._exponents(-finite[finite <= -MIN_MAGNITUDE])
+        positive = self._exponents(finite[finite >= MIN_MAGNITUDE])
+        self.neg_max = int(negative.max()) if negative.size else 0
+        self.n_neg = int(negative.max() - negative.min() + 1) if negative.size else 0
+        self.pos_min = int(positive.min()) if positive.size else 0
+        n_pos = int(positive.max() - positive.min() + 1) if positive.size else 0
+        self.n_codes = self.n_neg + 1 + n_pos
+
+        # Bucket midpoints in the relative sense, the estimate reported for a rank in the bucket
+        midpoint = 2.0 / (self.gamma + 1)
+        self.values = np.zeros(self.n_codes)
+        self.values[:self.n_neg] = -midpoint * self.gamma ** (self.neg_max - np.arange(self.n_neg))
+        self.values[self.n_neg + 1:] = midpoint * self.gamma ** (self.pos_min + np.arange(n_pos))
+
+    def _exponents(self, magnitudes):
+        return np.ceil(np.log(magnitudes) / np.log(self.gamma)).astype(np.int64)
+
+    def codes(self, values):
+        # Bucket code per value; -1 marks missing values.
+        codes = np.full(len(values), -1, dtype=np.int32)
+        finite = np.isfinite(values)
+        codes[finite] = self.n_neg
+        negative = finite & (values <= -MIN_MAGNITUDE)
+        positive = finite & (values >= MIN_MAGNITUDE)
+        codes[negative] = self.neg_max - self._exponents(-values[negative])
+        codes[positive] = self.n_neg + 1 + self._exponents(values[positive]) - self.pos_min
+        return codes
+
+
+def _quantiles(counts, values, quantiles):
+    total = counts.sum()
+    if total == 0:
+        return None
+    cumulative = np.cumsum(counts)
+    ranks = np.asarray(quantiles) * (total - 1)
+    return values[np.searchsorted(cumulative, ranks, side='right')].tolist()
+
+
+class QuantileSketchEngine:
+    # Mergeable percentile sketches per dimension cell.
+    #
+    # Each row's bucket code is computed once; per-cell bucket counts (a cells
+    # x buckets matrix per column) are summed to answer a dimension filter,
+    # and arbitrary row masks are served with a bincount over the codes, like
+    # HistogramEngine. Any percentile then costs O(buckets), not a sort.
+
+    def __init__(self, df, cells, columns=SKETCH_COLUMNS, relative_accuracy=RELATIVE_ACCURACY):
+        self.cells = cells
+        self.buckets = {}
+        self.codes = {}
+        self.partials = {}
+        for column in columns:
+            values = df[column].to_numpy(dtype=float)
+            buckets = _Buckets(values, relative_accuracy)
+            codes = buckets.codes(values)
+            valid = codes >= 0
+            flat = cells.cell_ids[valid].astype(np.int64) * buckets.n_codes + codes[valid]
+            self.buckets[column] = buckets
+            self.codes[column] = codes
+            self.partials[column] = np.bincount(
+                flat, minlength=cells.n_cells * buckets.n_codes).reshape(cells.n_cells, buckets.n_codes)
+
+    def quantiles_for_cells(self, column, cell_mask, quantiles=PERCENTILES):
+        # List of estimates, one per quantile, or None when no values are selected.
+        counts = self.partials[column][cell_mask].sum(axis=0)
+        return _quantiles(counts, self.buckets[column].values, quantiles)
+
+    def quantiles_for_rows(self, column, row_mask, quantiles=PERCENTILES):
+        codes = self.codes[column][row_mask]
+        counts = np.bincount(codes[codes >= 0], minlength=self.buckets[column].n_codes)
+        return _quantiles(counts, self.buckets[column].values, quantiles)
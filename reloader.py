@@ -0,0 +1,93 @@
+import os
+import threading
+import time
+import traceback
+
+from data_loader import UNIT_ECONOMICS_CSV
+from snapshot import build_snapshot
+
+# Seconds between checks of the source files; 0 disables background reloading.
+RELOAD_INTERVAL = float(os.environ.get('DASHBOARD_RELOAD_INTERVAL', '5'))
+
+
+class DataReloader:
+    # Watches the source CSV and swaps in a freshly built snapshot when they change.
+    #
+    # The new version is parsed and indexed on a background thread, off the
+    # request path. Callers take `current()` once per request and keep using
+    # that object, so they always see one consistent version; publishing the
+    # new snapshot is a single reference assignment.
+
+    def __init__(self, paths=(UNIT_ECONOMICS_CSV,),
+                 interval=RELOAD_INTERVAL, build=build_snapshot):
+        self.paths = list(paths)
+        self.interval = interval
+        self.build = build
+        self._stamps = self._stat()
+        self._pending = None
+        self._snapshot = build(version=1)
+        self._reload_lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def current(self):
+        return self._snapshot
+
+    def _stat(self):
+        stamps = []
+        for path in self.paths:
+            try:
+                stat = os.stat(path)
+                stamps.append((stat.st_mtime_ns, stat.st_size))
+            except FileNotFoundError:
+                stamps.append(None)
+        return stamps
+
+    def check(self):
+        # Returns True when a new snapshot was published.
+        stamps = self._stat()
+        if stamps == self._stamps or None in stamps:
+            # Unchanged, or a file is missing mid-replace; look again next time.
+            self._pending = None
+            return False
+        if stamps != self._pending:
+            # Wait until the files have stopped changing for one interval, so a
+            # copy that is still being written is not picked up half-way.
+            self._pending = stamps
+            return False
+        return self.reload(stamps)
+
+    def reload(self, stamps=None):
+        with self._reload_lock:
+            stamps = stamps or self._stat()
+            started = time.perf_counter()
+            try:
+                snapshot = self.build(version=self._snapshot.version + 1)
+            except Exception:
+                # Keep serving the previous version; a later change will retry.
+                print("Warning: data reload failed, keeping the current snapshot.")
+                traceback.print_exc()
+                self._stamps = stamps
+                return False
+            self._snapshot = snapshot
+            self._stamps = stamps
+            self._pending = None
+            print(f"Reloaded data as version {snapshot.version} in {time.perf_counter() - started:.2f}s.")
+            return True
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            self.check()
+
+    def start(self):
+        if self.interval > 0 and self._thread is None:
+            self._thread = threading.Thread(target=self._run, name='data-reloader', daemon=True)
+            self._thread.start()
+        return self
+
+    def stop(self):
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
@@ -0,0 +1,182 @@
+import numpy as np
+import pandas as pd
+
+try:
+    import pyarrow as pa
+except ImportError:  # pragma: no cover - pyarrow is listed in requirements.txt
+    pa = None
+
+from filter_index import DIMENSIONS
+
+# Typed in-memory schema for the customer frame. Dimensions become categoricals,
+# the churn flag a single byte, scores bounded on both sides (see VALUE_RANGES)
+# float32 and day/event counts int32. Monetary columns and open-ended ratios
+# stay float64: LTV/CAC reaches millions with two decimals, beyond float32's
+# roughly 7 significant digits.
+CATEGORY_COLUMNS = DIMENSIONS
+FLAG_COLUMNS = ['Churned']
+FLOAT32_COLUMNS = ['Customer_Health_Score', 'Avg_Sentiment_Score']
+INT32_COLUMNS = ['Active_Days', 'Usage_Events']
+
+# Types the customer CSV is parsed with. Dimensions are read straight into
+# categoricals; counts with gaps stay float until the gaps are filled.
+UNIT_ECONOMICS_DTYPES = {
+    'customer_id': 'str',
+    'CAC': 'float64',
+    'industry': 'category',
+    'company_size': 'category',
+    'LTV': 'float64',
+    'Monthly_Revenue': 'float64',
+    'plan_name': 'category',
+    'billing_frequency': 'category',
+    'Total_Revenue': 'float64',
+    'Avg_Sentiment_Score': 'float64',
+    'Active_Days': 'float64',
+    'Usage_Events': 'float64',
+    'Usage_Score': 'float64',
+    'latest_end': 'str',
+    'Churned': 'int64',
+    'LTV_CAC_Ratio': 'float64',
+    'CAC_Payback_Months': 'float64',
+    'Customer_Health_Score': 'float64',
+}
+
+# Columns that may never be empty, and inclusive (low, high) bounds per column
+# (None leaves a side open). Values outside them point at a broken extract.
+NOT_NULL_COLUMNS = ['customer_id', 'industry', 'company_size', 'plan_name', 'billing_frequency',
+                    'CAC', 'LTV', 'Monthly_Revenue', 'latest_end', 'Churned']
+VALUE_RANGES = {
+    'CAC': (0, None),
+    'Monthly_Revenue': (0, None),
+    'Total_Revenue': (0, None),
+    'Avg_Sentiment_Score': (-1, 1),
+    'Active_Days': (0, None),
+    'Usage_Events': (0, None),
+    'Churned': (0, 1),
+    'CAC_Payback_Months': (0, None),
+    'Customer_Health_Score': (-1, 2),
+}
+
+
+class SchemaError(ValueError):
+    # The source data does not match the expected columns, types or value ranges.
+    pass
+
+
+def validate_frame(df, source=''):
+    # Raises SchemaError naming the first column that breaks the schema.
+    where = f' in {source}' if source else ''
+    missing = [col for col in UNIT_ECONOMICS_DTYPES if col not in df.columns]
+    if missing:
+        raise SchemaError(f"Missing columns{where}: {', '.join(missing)}")
+    for col in NOT_NULL_COLUMNS:
+        empty = int(df[col].isna().sum())
+        if empty:
+            raise SchemaError(f"{empty} empty values in '{col}'{where}")
+    for col, (low, high) in VALUE_RANGES.items():
+        values = df[col]
+        bad = values.notna() & (((values < low) if low is not None else False) |
+                                ((values > high) if high is not None else False))
+        if bad.any():
+            raise SchemaError(f"{int(bad.sum())} values of '{col}' outside [{low}, {high}]{where}, "
+                              f"e.g. {values[bad].iloc[0]}")
+
+
+# Positions of the 32 hex digits inside a canonical 36-character UUID string.
+_UUID_HEX_POSITIONS = np.r_[0:8, 9:13, 14:18, 19:23, 24:36]
+_UUID_DASH_POSITIONS = [8, 13, 18, 23]
+_HEX_DIGITS = np.frombuffer(b'0123456789abcdef', dtype=np.uint8)
+_HEX_VALUES = np.full(256, 255, dtype=np.uint8)
+_HEX_VALUES[np.frombuffer(b'0123456789', dtype=np.uint8)] = np.arange(10)
+_HEX_VALUES[np.frombuffer(b'abcdef', dtype=np.uint8)] = np.arange(10, 16)
+_HEX_VALUES[np.frombuffer(b'ABCDEF', dtype=np.uint8)] = np.arange(10, 16)
+
+
+def apply_schema(df):
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    for col in FLAG_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.uint8)
+    for col in FLOAT32_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.float32)
+    for col in INT32_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype(np.int32)
+    return df
+
+
+# --- Packed customer IDs ---
+def is_packed_uuid(series):
+    return pa is not None and isinstance(series.dtype, pd.ArrowDtype) and series.dtype.pyarrow_dtype == pa.binary(16)
+
+
+def pack_uuids(series):
+    # Canonical UUID strings -> 16-byte fixed-size binary column (vectorized).
+    # Anything that is not a complete set of canonical UUIDs is returned as-is.
+    if pa is None or is_packed_uuid(series) or series.isna().any():
+        return series
+    text = series.to_numpy(dtype=str)
+    if len(text) == 0 or text.dtype.itemsize != 36 * 4 or (np.char.str_len(text) != 36).any():
+        return series
+    raw = np.frombuffer(text.astype('S36').tobytes(), dtype=np.uint8).reshape(-1, 36)
+    if (raw[:, _UUID_DASH_POSITIONS] != ord('-')).any():
+        return series
+    nibbles = _HEX_VALUES[raw[:, _UUID_HEX_POSITIONS]]
+    if (nibbles == 255).any():
+        return series
+    packed = (nibbles[:, 0::2] << 4) | nibbles[:, 1::2]
+    return uuids_from_bytes(np.ascontiguousarray(packed), index=series.index, name=series.name)
+
+
+def uuid_bytes(series):
+    # (n, 16) uint8 view of a packed UUID column's data buffer.
+    array = pa.chunked_array(series.array._pa_array).combine_chunks()
+    packed = np.frombuffer(array.buffers()[1], dtype=np.uint8, count=16 * (array.offset + len(array)))
+    return packed.reshape(-1, 16)[array.offset:]
+
+
+def uuids_from_bytes(packed, index=None, name=None):
+    # Wraps an (n, 16) uint8 array as a packed UUID column without copying it.
+    array = pa.FixedSizeBinaryArray.from_buffers(pa.binary(16), len(packed), [None, pa.py_buffer(packed)])
+    return pd.Series(pd.arrays.ArrowExtensionArray(array), index=index, name=name)
+
+
+def unpack_uuids(series):
+    # 16-byte binary column -> lowercase canonical UUID strings (vectorized).
+    packed = uuid_bytes(series)
+    text = np.empty((len(packed), 36), dtype=np.uint8)
+    text[:, _UUID_DASH_POSITIONS] = ord('-')
+    text[:, _UUID_HEX_POSITIONS[0::2]] = _HEX_DIGITS[packed >> 4]
+    text[:, _UUID_HEX_POSITIONS[1::2]] = _HEX_DIGITS[packed & 0x0F]
+    return pd.Series(text.view('S36').ravel().astype(str), index=series.index, name=series.name)
+
+
+def pack_customer_ids(df, column='customer_id'):
+    if column in df.columns:
+        df[column] = pack_uuids(df[column])
+    return df
+
+
+def float32_decimals(values):
+    # float64 copies of float32 values as written in the file (26.06 rather than
+    # 26.059999465942383): rounded to float32's 7 significant digits, vectorized.
+    values = np.asarray(values, dtype=np.float64)
+    with np.errstate(divide='ignore', invalid='ignore'):
+        exponent = np.floor(np.log10(np.abs(values)))
+    scale = 10.0 ** (6 - np.where(np.isfinite(exponent), exponent, 0))
+    return np.rint(values * scale) / scale
+
+
+def display_series(series):
+    # Values as users see them: UUID strings, plain category labels and floats
+    # without float32 noise (26.06 rather than 26.059999465942383).
+    if is_packed_uuid(series):
+        return unpack_uuids(series)
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.astype(str)
+    if series.dtype == np.float32:
+        return pd.Series(float32_decimals(series.to_numpy()), index=series.index, name=series.name)
+    return series
@@ -0,0 +1,24 @@
+import numpy as np
+
+from filter_index import DIMENSIONS, FilterIndex
+
+
+class SegmentCells:
+    # Assigns every customer row to its (industry, company_size, plan_name,
+    # billing_frequency) cell. Aggregates kept per cell can then answer any
+    # combination of the four dimension filters by summing the selected cells.
+
+    def __init__(self, df, dimensions=DIMENSIONS):
+        self.dimensions = list(dimensions)
+        grouped = df.groupby(self.dimensions, sort=True, observed=True, dropna=False)
+        self.cell_ids = grouped.ngroup().to_numpy()
+        self.cells = grouped.size().reset_index(name='rows')
+        self.n_cells = len(self.cells)
+        self.index = FilterIndex(self.cells, self.dimensions)
+
+    def cell_mask(self, selections):
+        return self.index.mask(selections)
+
+    def sum_by_cell(self, values=None):
+        # Per-cell sum of `values` (row counts when omitted).
+        return np.bincount(self.cell_ids, weights=values, minlength=self.n_cells)
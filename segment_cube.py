@@ -0,0 +1,170 @@
+import os
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from filter_index import DIMENSIONS
+from schema import float32_decimals
+from segment_cells import SegmentCells
+
+# Aggregated columns, named as in unit_economics_by_segment.csv, and the
+# customer-level column each one averages.
+SEGMENT_MEASURES = {
+    'Avg_CAC': 'CAC',
+    'Avg_LTV': 'LTV',
+    'Avg_LTV_CAC': 'LTV_CAC_Ratio',
+    'Avg_Payback_Months': 'CAC_Payback_Months',
+    'Avg_Health_Score': 'Customer_Health_Score',
+}
+
+# Layout and rounding of the unit_economics_by_segment table (payback months
+# keep one decimal, as in the file the external job used to produce).
+SEGMENT_COLUMNS = DIMENSIONS + list(SEGMENT_MEASURES) + ['Customer_Count']
+SEGMENT_DECIMALS = {'Avg_Payback_Months': 1}
+
+
+class SegmentCube:
+    # Materialized sum / count / sum-of-squares partials per dimension cell.
+    #
+    # Built once from the customer rows; any roll-up over a subset of cells is
+    # answered by summing partials, which is O(cells) and yields properly
+    # count-weighted averages (a plain mean of per-segment averages is not).
+
+    def __init__(self, df, cells=None, measures=SEGMENT_MEASURES):
+        self.cells = cells if cells is not None else SegmentCells(df)
+        self.measures = dict(measures)
+        self.dimensions = self.cells.dimensions
+
+        # One row per cell: the dimension values followed by the partials.
+        partials = self.cells.cells[self.dimensions].copy()
+        partials['rows'] = self.cells.sum_by_cell()
+        for column in dict.fromkeys(self.measures.values()):
+            values = df[column].to_numpy(dtype=float)
+            if df[column].dtype == np.float32:
+                # Back to the decimals in the file (0.7, not 0.699999988).
+                values = float32_decimals(values)
+            valid = np.isfinite(values)
+            values = np.where(valid, values, 0.0)
+            partials['sum_' + column] = self.cells.sum_by_cell(values)
+            partials['count_' + column] = self.cells.sum_by_cell(valid.astype(float))
+            partials['sumsq_' + column] = self.cells.sum_by_cell(values * values)
+        self.partials = partials
+        self._columns = {name: partials[name].to_numpy(dtype=float) for name in partials.columns
+                         if name not in self.dimensions}
+        self._group_cache = {}
+
+    def _groups(self, dimensions):
+        # Per-cell group ids for a roll-up by `dimensions`, with one row of
+        # dimension values per group (in groupby's sorted order) and whether
+        # the group has no missing value. Cached, as every filter reuses them.
+        key = tuple(dimensions)
+        groups = self._group_cache.get(key)
+        if groups is None:
+            combined = np.zeros(len(self.partials), dtype=np.int64)
+            for dimension in dimensions:
+                codes, uniques = pd.factorize(self.partials[dimension], sort=True)
+                combined = combined * (len(uniques) + 1) + (codes + 1)
+            _, first, inverse = np.unique(combined, return_index=True, return_inverse=True)
+            labels = self.partials[list(dimensions)].iloc[first].reset_index(drop=True)
+            groups = self._group_cache[key] = (inverse, labels, labels.notna().all(axis=1).to_numpy())
+        return groups
+
+    def rollup(self, dimensions, cell_mask=None):
+        # Aggregates the selected cells by one or more dimensions. Returns one
+        # row per non-empty group with Customer_Count, the Avg_* measures and
+        # matching Std_* (population) columns.
+        if isinstance(dimensions, str):
+            dimensions = [dimensions]
+        group_ids, labels, complete = self._groups(dimensions)
+        if cell_mask is not None:
+            group_ids = group_ids[cell_mask]
+
+        def total(name):
+            values = self._columns[name] if cell_mask is None else self._columns[name][cell_mask]
+            return np.bincount(group_ids, weights=values, minlength=len(labels))
+
+        rows = total('rows')
+        keep = (rows > 0) & complete
+        result = {dimension: labels[dimension][keep].reset_index(drop=True) for dimension in dimensions}
+        result['Customer_Count'] = rows[keep].astype(np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, column in self.measures.items():
+                count = total('count_' + column)[keep]
+                mean = total('sum_' + column)[keep] / count
+                variance = np.clip(total('sumsq_' + column)[keep] / count - mean * mean, 0.0, None)
+                result[name] = mean
+                result['Std' + name[len('Avg'):]] = np.sqrt(variance)
+        return pd.DataFrame(result)
+
+    def segments(self):
+        # The unit_economics_by_segment table: one row per non-empty cell,
+        # straight from the partials without another pass over the customers.
+        partials = self.partials
+        table = partials[self.dimensions].copy()
+        for name, column in self.measures.items():
+            count = partials['count_' + column].to_numpy()
+            table[name] = np.divide(partials['sum_' + column].to_numpy(), count,
+                                    out=np.full(len(count), np.nan), where=count > 0)
+        table['Customer_Count'] = partials['rows'].to_numpy().astype(np.int64)
+        return _finish_segments(table[table['Customer_Count'] > 0])
+
+
+def _round_half_up(values, decimals):
+    # Halves round up as in the former segment job, not to even like np.round.
+    scale = 10.0 ** decimals
+    return np.floor(values * scale + 0.5) / scale
+
+
+def _finish_segments(table):
+    # Plain string dimension columns, whichever path built the table, as read back from the CSV.
+    for dimension in DIMENSIONS:
+        if dimension in table:
+            table[dimension] = table[dimension].astype('str')
+    for name in SEGMENT_MEASURES:
+        if name in table:
+            table[name] = _round_half_up(table[name].to_numpy(dtype=float), SEGMENT_DECIMALS.get(name, 2))
+    columns = [column for column in SEGMENT_COLUMNS if column in table]
+    return table[columns].sort_values(columns[:len(DIMENSIONS)]).reset_index(drop=True)
+
+
+def build_segments(df, dimensions=DIMENSIONS):
+    # unit_economics_by_segment derived from the customer rows in one grouped pass.
+    return SegmentCube(df, SegmentCells(df, dimensions)).segments()
+
+
+# --- Pipeline stage ---
+def write_segments(segments, path):
+    # Written next to the target and renamed into place, so readers never see a partial file.
+    os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+    partial = f'{path}.{os.getpid()}.tmp'
+    if path.endswith('.parquet'):
+        segments.to_parquet(partial, index=False)
+    else:
+        segments.to_csv(partial, index=False)
+    os.replace(partial, path)
+
+
+def _main(argv):
+    # `python segment_cube.py [unit_economics.csv] [output.csv|output.parquet]`
+    # rebuilds the segment table from the customer extract (through the
+    # dashboard's Parquet cache) as a step of the data refresh. The apps derive
+    # the segment table from the customer rows themselves, so by default it is
+    # written as an artifact under the cache directory.
+    from data_loader import CACHE_DIR, UNIT_ECONOMICS_CSV, load_unit_economics
+
+    if len(argv) > 3:
+        print("Usage: python segment_cube.py [unit_economics.csv] [unit_economics_by_segment.csv|.parquet]")
+        return 2
+    source = argv[1] if len(argv) > 1 else UNIT_ECONOMICS_CSV
+    target = argv[2] if len(argv) > 2 else os.path.join(CACHE_DIR, 'unit_economics_by_segment.csv')
+    started = time.perf_counter()
+    segments = build_segments(load_unit_economics(source))
+    write_segments(segments, target)
+    print(f"Wrote {len(segments)} segments to '{target}' in {time.perf_counter() - started:.2f}s.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv))
@@ -0,0 +1,317 @@
+import fcntl
+import functools
+import json
+import os
+import pickle
+import shutil
+import sys
+import time
+
+import numpy as np
+import pandas as pd
+
+from data_loader import UNIT_ECONOMICS_CSV, ingest_unit_economics, load_unit_economics
+from reloader import RELOAD_INTERVAL, DataReloader
+from schema import is_packed_uuid, pack_customer_ids, uuid_bytes, uuids_from_bytes
+from snapshot import DATA_BACKEND, DataSnapshot
+
+# When set, worker processes share one memory-mapped copy of the dataset under
+# this directory instead of each parsing and holding their own.
+SHARED_DATA_DIR = os.environ.get('DASHBOARD_SHARED_DIR', '')
+
+# Layout of SHARED_DATA_DIR:
+#   gen-<n>/           one published generation: a .npy file per column + meta.json,
+#                      and the snapshot built over it (snapshot.pkl + state-<i>.npy)
+#   CURRENT            name of the generation workers should attach to
+#   publisher.lock     flock held by the single process that publishes generations
+CURRENT_FILE = 'CURRENT'
+LOCK_FILE = 'publisher.lock'
+META_FILE = 'meta.json'
+STATE_FILE = 'snapshot.pkl'
+KEEP_GENERATIONS = 2
+
+# The publisher builds the DataSnapshot once and stores it with the columns:
+# every array of at least STATE_ARRAY_BYTES (bitmaps, cell ids, sorted rows,
+# partials) goes to its own .npy file and the rest is pickled. Workers load it
+# with those arrays memory-mapped, so the indexes are neither rebuilt nor held
+# privately per process. Bump STATE_FORMAT when the snapshot classes change
+# shape; workers rebuild privately from an older format until it is republished.
+STATE_ARRAY_BYTES = 64 << 10
+STATE_FORMAT = 2
+
+
+class Generation:
+    # Result of a publish: the generation number doubles as the snapshot version.
+    def __init__(self, version):
+        self.version = version
+
+
+# --- Writing a generation ---
+def _source_stamps(paths):
+    stamps = []
+    for path in paths:
+        stat = os.stat(path)
+        stamps.append([stat.st_mtime_ns, stat.st_size])
+    return stamps
+
+
+def _write_frame(df, directory, prefix):
+    columns = []
+    for position, col in enumerate(df.columns):
+        series = df[col]
+        base = f'{prefix}-{position}'
+        if is_packed_uuid(series):
+            np.save(os.path.join(directory, base + '.npy'), uuid_bytes(series))
+            columns.append({'name': col, 'kind': 'uuid', 'file': base + '.npy'})
+        elif isinstance(series.dtype, pd.CategoricalDtype):
+            np.save(os.path.join(directory, base + '.npy'), series.cat.codes.to_numpy())
+            columns.append({'name': col, 'kind': 'category', 'file': base + '.npy',
+                            'categories': series.cat.categories.tolist()})
+        elif pd.api.types.is_datetime64_any_dtype(series):
+            values = series.to_numpy()
+            np.save(os.path.join(directory, base + '.npy'), values.view(np.int64))
+            columns.append({'name': col, 'kind': 'datetime', 'file': base + '.npy', 'dtype': str(values.dtype)})
+        elif isinstance(series.dtype, np.dtype) and series.dtype.kind in 'biuf':
+            np.save(os.path.join(directory, base + '.npy'), series.to_numpy())
+            columns.append({'name': col, 'kind': 'numpy', 'file': base + '.npy'})
+        else:
+            # Free-form text has no fixed-width layout; it is stored as Parquet and
+            # loaded privately by each worker.
+            series.to_frame().to_parquet(os.path.join(directory, base + '.parquet'), index=False)
+            columns.append({'name': col, 'kind': 'parquet', 'file': base + '.parquet'})
+    return {'rows': len(df), 'columns': columns}
+
+
+class _StatePickler(pickle.Pickler):
+    def __init__(self, file, directory, frame):
+        super().__init__(file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.directory = directory
+        self.frame = frame
+        # id -> file name; the arrays are kept so their ids stay unique while pickling
+        self.arrays = {}
+        self._keep = []
+
+    def persistent_id(self, obj):
+        if obj is self.frame:
+            return ('frame',)
+        if isinstance(obj, np.ndarray) and obj.dtype.kind != 'O' and obj.nbytes >= STATE_ARRAY_BYTES:
+            name = self.arrays.get(id(obj))
+            if name is None:
+                name = self.arrays[id(obj)] = f'state-{len(self.arrays)}.npy'
+                self._keep.append(obj)
+                np.save(os.path.join(self.directory, name), obj)
+            return ('array', name)
+        return None
+
+
+class _StateUnpickler(pickle.Unpickler):
+    def __init__(self, file, directory, frame):
+        super().__init__(file)
+        self.directory = directory
+        self.frame = frame
+
+    def persistent_load(self, pid):
+        if pid[0] == 'frame':
+            return self.frame
+        return np.load(os.path.join(self.directory, pid[1]), mmap_mode='r')
+
+
+def _write_state(snapshot, directory):
+    # The frame itself is not pickled; loading reattaches the memory-mapped one.
+    path = os.path.join(directory, STATE_FILE)
+    with open(os.open(path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600), 'wb') as f:
+        _StatePickler(f, directory, snapshot.df_unit_economics).dump(snapshot)
+    return {'format': STATE_FORMAT, 'file': STATE_FILE}
+
+
+def _check_private(path):
+    # Unpickling runs whatever the file says, so the state is only trusted when
+    # nobody but this user could have written it.
+    stat = os.stat(path)
+    if stat.st_uid != os.getuid():
+        raise PermissionError(f"'{path}' is owned by uid {stat.st_uid}, not by this user")
+    if stat.st_mode & 0o022:
+        raise PermissionError(f"'{path}' is writable by other users")
+
+
+def _load_state(directory, spec, frame):
+    path = os.path.join(directory, spec['file'])
+    _check_private(directory)
+    _check_private(path)
+    with open(path, 'rb') as f:
+        return _StateUnpickler(f, directory, frame).load()
+
+
+def _read_meta(root, name):
+    with open(os.path.join(root, name, META_FILE)) as f:
+        return json.load(f)
+
+
+def current_generation(root):
+    try:
+        with open(os.path.join(root, CURRENT_FILE)) as f:
+            return f.read().strip() or None
+    except FileNotFoundError:
+        return None
+
+
+def _prune(root, keep):
+    # Attached workers keep their mappings valid even after the files are
+    # unlinked, so older generations can be removed while still in use.
+    generations = sorted((name for name in os.listdir(root) if name.startswith('gen-')),
+                         key=lambda name: int(name.split('-')[1]))
+    for name in generations[:-keep]:
+        shutil.rmtree(os.path.join(root, name), ignore_errors=True)
+
+
+def publish_generation(root, version=None, paths=(UNIT_ECONOMICS_CSV,), force=False):
+    # Materializes the datasets as a new generation and points CURRENT at it.
+    # Returns the existing generation when it was built from the same files.
+    os.makedirs(root, mode=0o700, exist_ok=True)
+    stamps = _source_stamps(paths)
+    current = current_generation(root)
+    if current and not force:
+        try:
+            meta = _read_meta(root, current)
+            if meta['sources'] == stamps and meta.get('state', {}).get('format') == STATE_FORMAT:
+                return Generation(int(current.split('-')[1]))
+        except (OSError, ValueError, KeyError):
+            pass
+
+    if len(paths) == 1:
+        df_unit_economics = load_unit_economics(paths[0])
+    else:
+        df_unit_economics = pack_customer_ids(ingest_unit_economics(list(paths)))
+    number = int(current.split('-')[1]) + 1 if current else 1
+    name = f'gen-{number}'
+    staging = os.path.join(root, f'.{name}.tmp-{os.getpid()}')
+    shutil.rmtree(staging, ignore_errors=True)
+    os.makedirs(staging, mode=0o700)
+
+    meta = {'sources': stamps,
+            'published_at': time.time(),
+            'unit_economics': _write_frame(df_unit_economics, staging, 'unit_economics')}
+    meta['state'] = _write_state(DataSnapshot(df_unit_economics, version=number), staging)
+    with open(os.path.join(staging, META_FILE), 'w') as f:
+        json.dump(meta, f)
+
+    os.replace(staging, os.path.join(root, name))
+    pointer = os.path.join(root, f'.{CURRENT_FILE}.tmp-{os.getpid()}')
+    with open(pointer, 'w') as f:
+        f.write(name)
+    os.replace(pointer, os.path.join(root, CURRENT_FILE))
+    _prune(root, KEEP_GENERATIONS)
+    return Generation(number)
+
+
+# --- Attaching to a generation ---
+def _attach_frame(directory, spec):
+    data = {}
+    for column in spec['columns']:
+        path = os.path.join(directory, column['file'])
+        if column['kind'] == 'parquet':
+            data[column['name']] = pd.read_parquet(path).iloc[:, 0]
+            continue
+        values = np.load(path, mmap_mode='r')
+        if column['kind'] == 'uuid':
+            data[column['name']] = uuids_from_bytes(values)
+        elif column['kind'] == 'category':
+            data[column['name']] = pd.Categorical.from_codes(values, categories=column['categories'])
+        elif column['kind'] == 'datetime':
+            data[column['name']] = values.view(column['dtype'])
+        else:
+            data[column['name']] = values
+    # copy=False keeps each column backed by its read-only mapping
+    return pd.DataFrame(data, copy=False)
+
+
+def attach_generation(root, name=None, timeout=120.0):
+    # Returns (generation number, df_unit_economics, snapshot), waiting for the
+    # first generation to be published if necessary. The snapshot is None when
+    # the generation carries no snapshot of the current STATE_FORMAT.
+    deadline = time.monotonic() + timeout
+    while True:
+        name = name or current_generation(root)
+        if name:
+            break
+        if time.monotonic() > deadline:
+            raise FileNotFoundError(f"No dataset generation has been published in '{root}'.")
+        time.sleep(0.5)
+    directory = os.path.join(root, name)
+    meta = _read_meta(root, name)
+    df_unit_economics = _attach_frame(directory, meta['unit_economics'])
+    snapshot = None
+    state = meta.get('state')
+    if state and state.get('format') == STATE_FORMAT:
+        try:
+            snapshot = _load_state(directory, state, df_unit_economics)
+        except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError) as e:
+            print(f"Warning: could not load the published snapshot of {name} ({e}); rebuilding it.")
+    return int(name.split('-')[1]), df_unit_economics, snapshot
+
+
+def build_shared_snapshot(root, version=None):
+    generation, df_unit_economics, snapshot = attach_generation(root)
+    if snapshot is None:
+        snapshot = DataSnapshot(df_unit_economics, version=generation)
+    return snapshot
+
+
+# --- Reloading ---
+class SharedDataReloader(DataReloader):
+    # Snapshot reloader for multi-process deployments.
+    #
+    # Exactly one process (whichever holds publisher.lock) watches the CSVs and
+    # publishes generations; every process, the publisher included, watches the
+    # CURRENT pointer and attaches to the new generation zero-copy. If the
+    # publisher exits, another worker takes the lock on its next check.
+
+    def __init__(self, root=SHARED_DATA_DIR, interval=RELOAD_INTERVAL):
+        # The SQLite backend already shares one file between processes; the
+        # generations here only hold in-memory snapshots.
+        if DATA_BACKEND != 'memory':
+            raise ValueError(f"DASHBOARD_SHARED_DIR requires the in-memory backend, but DASHBOARD_BACKEND is "
+                             f"'{DATA_BACKEND}'; unset one of the two.")
+        self.root = root
+        self.interval = interval
+        self.publisher = None
+        self._lock_file = None
+        os.makedirs(root, mode=0o700, exist_ok=True)
+        self._try_become_publisher()
+        super().__init__(paths=[os.path.join(root, CURRENT_FILE)], interval=interval,
+                         build=functools.partial(build_shared_snapshot, root))
+
+    def _try_become_publisher(self):
+        if self.publisher is not None:
+            return
+        lock_file = open(os.path.join(self.root, LOCK_FILE), 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except BlockingIOError:
+            lock_file.close()
+            return
+        self._lock_file = lock_file
+        # Publishing happens on this reloader's thread, never on the request path.
+        self.publisher = DataReloader(interval=self.interval, build=functools.partial(publish_generation, self.root))
+
+    def check(self):
+        self._try_become_publisher()
+        if self.publisher is not None:
+            self.publisher.check()
+        return super().check()
+
+
+def _main(argv):
+    # `python shared_dataset.py <dir>` publishes a generation from a separate
+    # process (e.g. a deploy hook) so workers never parse the CSVs themselves.
+    root = argv[1] if len(argv) > 1 else SHARED_DATA_DIR
+    if not root:
+        print("Usage: python shared_dataset.py <shared-dir>  (or set DASHBOARD_SHARED_DIR)")
+        return 2
+    generation = publish_generation(root, force='--force' in argv)
+    print(f"Published generation {generation.version} in '{root}'.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv))
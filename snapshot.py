@@ -0,0 +1,229 @@
+import functools
+import os
+
+import numpy as np
+
+from customer_table import SortIndex, filter_query_mask, format_rows, iter_csv, table_columns
+from data_loader import load_unit_economics
+from filter_index import FilterIndex, filter_selections, split_filter_key
+from histograms import HistogramEngine
+from kpi_engine import KPIEngine, kpis_for_rows
+from quantile_sketch import PERCENTILES, SKETCH_COLUMNS, QuantileSketchEngine
+from segment_cells import SegmentCells
+from segment_cube import SegmentCube
+from sql_backend import build_sql_snapshot
+from time_index import DateIndex, MonthlyRollup
+
+# Where the dashboards read customers from: 'memory' keeps the whole frame and
+# its indexes in every process (DataSnapshot); 'sqlite' answers each request
+# with SQL over a local database file built from the CSV (sql_backend), for
+# extracts that do not fit in memory. Both expose the same query methods.
+DATA_BACKEND = os.environ.get('DASHBOARD_BACKEND', 'memory')
+
+
+def _cache_key(filter_key):
+    return tuple(tuple(values) for values in filter_key)
+
+
+class DataSnapshot:
+    # One consistent version of the datasets together with every index and
+    # aggregate derived from them. A request reads a single snapshot from start
+    # to finish; reloads build a new snapshot and swap it in whole, so the
+    # frames, indexes and per-filter caches can never come from different versions.
+
+    def __init__(self, df_unit_economics, version=1):
+        self.version = version
+        self.df_unit_economics = df_unit_economics
+
+        # Bitmap index over the four dimension filters
+        self.unit_economics_index = FilterIndex(df_unit_economics)
+
+        # Customer rows grouped into dimension cells, with per-cell partial histograms
+        self.segment_cells = SegmentCells(df_unit_economics)
+        self.histogram_engine = HistogramEngine(df_unit_economics, self.segment_cells)
+
+        # Sum/count/sum-of-squares partials per cell backing the segment charts
+        self.segment_cube = SegmentCube(df_unit_economics, self.segment_cells)
+
+        # unit_economics_by_segment, derived from the same rows so the two can never drift
+        self.df_unit_economics_by_segment = self.segment_cube.segments()
+
+        # Mergeable per-cell sums and counts behind the KPI cards
+        self.kpi_engine = KPIEngine(df_unit_economics)
+
+        # Per-cell percentile sketches for the p10/p50/p90 shown with the KPIs
+        self.quantile_engine = QuantileSketchEngine(df_unit_economics, self.segment_cells)
+
+        # Pre-sorted row permutations for every customer table column
+        self.customer_sort_index = SortIndex(df_unit_economics)
+
+        # Rows by contract end date for the date-range filter, and monthly
+        # per-cell partials behind the trend charts
+        self.date_index = DateIndex(df_unit_economics)
+        self.monthly_rollup = MonthlyRollup(df_unit_economics, self.segment_cells, self.date_index)
+
+        self._init_caches()
+
+    def _init_caches(self):
+        # Per-filter results are cached on the snapshot so they are dropped with it
+        self._filter_mask = functools.lru_cache(maxsize=64)(self._compute_filter_mask)
+        self._filtered_frame = functools.lru_cache(maxsize=64)(self._compute_filtered_frame)
+        self._segment_cell_mask = functools.lru_cache(maxsize=64)(self._compute_segment_cell_mask)
+        self._window_cube = functools.lru_cache(maxsize=16)(self._compute_window_cube)
+        self._customer_mask = functools.lru_cache(maxsize=16)(self._compute_customer_mask)
+
+    # A snapshot pickles without its caches (shared_dataset publishes the
+    # derived indexes this way); they start empty again when loaded.
+    _CACHES = ('_filter_mask', '_filtered_frame', '_segment_cell_mask', '_window_cube', '_customer_mask')
+
+    def __getstate__(self):
+        return {key: value for key, value in self.__dict__.items() if key not in self._CACHES}
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._init_caches()
+
+    def filter_options(self, dimension):
+        return self.df_unit_economics_by_segment[dimension].drop_duplicates().sort_values().tolist()
+
+    def date_bounds(self):
+        # (first, last) contract end date, or (None, None) without dated rows.
+        return self.date_index.first_date, self.date_index.last_date
+
+    def histogram_edges(self, column):
+        return self.histogram_engine.edges[column]
+
+    def table_columns(self):
+        return table_columns(self.df_unit_economics)
+
+    # --- Filtered data ---
+    def _window(self, key):
+        # The key's date window, or None when it selects every row anyway (so
+        # the per-cell partials can still answer the request).
+        dimension_key, window = split_filter_key(key)
+        if window is not None and self.date_index.covers_all(*window):
+            window = None
+        return dimension_key, window
+
+    def _compute_filter_mask(self, key):
+        dimension_key, window = self._window(key)
+        mask = self.unit_economics_index.mask(filter_selections(*[list(values) for values in dimension_key]))
+        if window is not None:
+            mask &= self.date_index.mask(*window)
+        return mask
+
+    def _compute_filtered_frame(self, key):
+        return self.df_unit_economics[self._filter_mask(key)]
+
+    def _compute_segment_cell_mask(self, key):
+        # Cells matching the dimension filters; a date window does not narrow cells.
+        dimension_key, _ = split_filter_key(key)
+        return self.segment_cells.cell_mask(filter_selections(*[list(values) for values in dimension_key]))
+
+    def _compute_window_cube(self, key):
+        rows = self.df_unit_economics[self._filter_mask(key)]
+        return SegmentCube(rows, SegmentCells(rows))
+
+    def filter_mask(self, filter_key):
+        return self._filter_mask(_cache_key(filter_key))
+
+    def filtered_frame(self, filter_key):
+        # The returned frame is shared between callbacks; treat it as read-only.
+        return self._filtered_frame(_cache_key(filter_key))
+
+    def segment_cell_mask(self, filter_key):
+        return self._segment_cell_mask(_cache_key(filter_key))
+
+    def date_window(self, filter_key):
+        return self._window(_cache_key(filter_key))[1]
+
+    # --- Aggregates ---
+    # Without a date window these sum per-cell partials; with one, only the
+    # rows the date index selects are aggregated.
+    def has_data(self, filter_key):
+        if self.date_window(filter_key) is None:
+            return bool(self.segment_cell_mask(filter_key).any())
+        return bool(self.filter_mask(filter_key).any())
+
+    def customer_count(self, filter_key, churned_only=False, filter_query=''):
+        if churned_only or filter_query:
+            return int(np.count_nonzero(self.customer_mask(filter_key, churned_only, filter_query)))
+        if self.date_window(filter_key) is None:
+            return int(self.segment_cells.cells['rows'].to_numpy()[self.segment_cell_mask(filter_key)].sum())
+        return int(np.count_nonzero(self.filter_mask(filter_key)))
+
+    def kpis(self, filter_key):
+        dimension_key, _ = split_filter_key(filter_key)
+        if self.date_window(filter_key) is None:
+            return self.kpi_engine.kpis(filter_selections(*dimension_key))
+        return kpis_for_rows(self.df_unit_economics, self.filter_mask(filter_key))
+
+    def percentiles(self, filter_key, quantiles=PERCENTILES):
+        # {column: [estimate per quantile] or None} for the sketched columns.
+        if self.date_window(filter_key) is None:
+            cell_mask = self.segment_cell_mask(filter_key)
+            return {column: self.quantile_engine.quantiles_for_cells(column, cell_mask, quantiles)
+                    for column in SKETCH_COLUMNS}
+        row_mask = self.filter_mask(filter_key)
+        return {column: self.quantile_engine.quantiles_for_rows(column, row_mask, quantiles)
+                for column in SKETCH_COLUMNS}
+
+    def histogram_counts(self, filter_key, column):
+        if self.date_window(filter_key) is None:
+            return self.histogram_engine.counts_for_cells(column, self.segment_cell_mask(filter_key))
+        return self.histogram_engine.counts_for_rows(column, self.filter_mask(filter_key))
+
+    def segment_rollup(self, filter_key, dimensions):
+        if self.date_window(filter_key) is None:
+            return self.segment_cube.rollup(dimensions, self.segment_cell_mask(filter_key))
+        return self._window_cube(_cache_key(filter_key)).rollup(dimensions)
+
+    def trend(self, filter_key):
+        # Monthly customers, churn rate and average LTV/CAC by contract end month.
+        dimension_key, _ = split_filter_key(filter_key)
+        window = self.date_window(filter_key)
+        row_mask = self.filter_mask(dimension_key) if window is not None else None
+        return self.monthly_rollup.series(self.segment_cell_mask(filter_key), window, row_mask)
+
+    # --- Customer table ---
+    def _compute_customer_mask(self, key, churned_only, filter_query):
+        df = self.df_unit_economics
+        mask = self._filter_mask(key).copy()
+        if churned_only:
+            mask &= df['Churned'].to_numpy() == 1
+        try:
+            mask &= filter_query_mask(df, filter_query)
+        except ValueError:
+            # An expression we cannot translate matches nothing rather than everything.
+            mask[:] = False
+        return mask
+
+    def customer_mask(self, filter_key, churned_only=False, filter_query=''):
+        # Cached like the filter masks; treat the returned array as read-only.
+        return self._customer_mask(_cache_key(filter_key), bool(churned_only), filter_query or '')
+
+    def customer_positions(self, filter_key, churned_only=False, sort_column=None, ascending=True, filter_query='',
+                           offset=0, limit=None, mask=None):
+        # Row positions in df_unit_economics for the customer table, filtered
+        # and in display order; with `limit`, only that many from `offset` on,
+        # found without ordering the rest. `mask` reuses a customer_mask result.
+        if mask is None:
+            mask = self.customer_mask(filter_key, churned_only, filter_query)
+        return self.customer_sort_index.order(mask, sort_column, ascending, offset, limit)
+
+    def customer_rows(self, filter_key, churned_only=False, sort_column=None, ascending=True, filter_query='',
+                      offset=0, limit=None):
+        # Display rows (UUID strings, labels, plain dates) of the customer table.
+        positions = self.customer_positions(filter_key, churned_only, sort_column, ascending, filter_query,
+                                            offset, limit)
+        return format_rows(self.df_unit_economics.iloc[positions])
+
+    def iter_customer_csv(self, filter_key, churned_only=False, sort_column=None, ascending=True, filter_query=''):
+        positions = self.customer_positions(filter_key, churned_only, sort_column, ascending, filter_query)
+        return iter_csv(self.df_unit_economics, positions)
+
+
+def build_snapshot(version=1):
+    if DATA_BACKEND == 'sqlite':
+        return build_sql_snapshot(version)
+    return DataSnapshot(load_unit_economics(), version)
@@ -0,0 +1,538 @@
+import contextlib
+import csv
+import io
+import json
+import os
+import pathlib
+import queue
+import sqlite3
+import sys
+import threading
+import time
+
+import numpy as np
+import pandas as pd
+
+from customer_table import DATE_FORMAT, display_columns, parse_filter_term, table_columns
+from data_loader import (CACHE_DIR, MEAN_FILLED_COLUMNS, UNIT_ECONOMICS_CSV, cache_is_fresh,
+                         preprocess_unit_economics_chunk, source_manifest)
+from filter_index import DIMENSIONS, split_filter_key
+from histograms import HISTOGRAM_BINS, LOG_SCALE_COLUMNS, robust_edges, tail_ranks
+from kpi_engine import KPI_MEASURES
+from quantile_sketch import PERCENTILES, SKETCH_COLUMNS
+from schema import SchemaError, UNIT_ECONOMICS_DTYPES, display_series, validate_frame
+from segment_cube import SEGMENT_MEASURES
+from time_index import DATE_COLUMN
+
+# Usage, from the directory holding unit_economics.csv:
+#
+#   python sql_backend.py [unit_economics.csv] [database.sqlite]
+#   DASHBOARD_BACKEND=sqlite python dash_dashboard.py
+#
+# The customer rows live in an embedded SQLite file next to the Parquet cache.
+# Filters, KPI means, segment roll-ups, histogram bins, percentiles, trends and
+# table pages are pushed down as SQL, so a process holds one page or one
+# aggregate at a time instead of the whole extract and its indexes.
+SQLITE_PATH = os.environ.get('DASHBOARD_SQLITE_PATH', os.path.join(CACHE_DIR, 'unit_economics.sqlite'))
+
+# Read connections per process (each request borrows one), and prepared
+# statements each connection keeps compiled.
+SQL_POOL_SIZE = int(os.environ.get('DASHBOARD_SQL_POOL_SIZE', str(min(8, os.cpu_count() or 1) + 2)))
+SQL_STATEMENT_CACHE = 256
+
+# Rows parsed, validated and inserted at a time while the database is built.
+SQL_CHUNK_ROWS = int(os.environ.get('DASHBOARD_SQL_CHUNK_ROWS', '200000'))
+
+# Bytes of the file each connection maps into memory; mapped pages come from
+# the OS page cache, so every connection and process shares them.
+SQL_MMAP_BYTES = 1 << 30
+
+TABLE = 'customers'
+
+# Extra indexes: the contract end date for date windows, and one per sketched
+# column for percentile ranks. The latter also carry the dimension filters and
+# the date, so a filtered rank is found by walking the index alone.
+INDEXED_COLUMNS = [DATE_COLUMN] + SKETCH_COLUMNS
+COVERED_COLUMNS = DIMENSIONS + [DATE_COLUMN]
+
+# Layout of the database beyond the CSV's columns; bump it when the tables or
+# indexes change so existing files are rebuilt.
+DATABASE_FORMAT = 2
+
+_COMPARISONS = {'eq': '=', 'ne': '!=', 'lt': '<', 'le': '<=', 'gt': '>', 'ge': '>='}
+
+
+def _quote(column):
+    return '"' + column.replace('"', '""') + '"'
+
+
+# --- Building the database ---
+def _read_chunks(path, chunk_rows):
+    # Validated chunks of the CSV, read with the explicit schema.
+    start = 0
+    try:
+        for chunk in pd.read_csv(path, dtype=UNIT_ECONOMICS_DTYPES, chunksize=chunk_rows):
+            validate_frame(chunk, f'{path} (rows {start + 1}-{start + len(chunk)})')
+            start += len(chunk)
+            yield chunk
+    except (ValueError, pd.errors.ParserError) as e:
+        if isinstance(e, SchemaError):
+            raise
+        raise SchemaError(f"Could not parse '{path}' after row {start}: {e}") from e
+
+
+def _sql_type(series):
+    if pd.api.types.is_integer_dtype(series) or pd.api.types.is_bool_dtype(series):
+        return 'INTEGER'
+    if pd.api.types.is_float_dtype(series):
+        return 'REAL'
+    return 'TEXT'
+
+
+def _sql_rows(frame):
+    # Preprocessed chunk -> plain Python rows: labels, floats without float32
+    # noise, ISO dates (which compare in date order as text) and None for gaps.
+    rows = pd.DataFrame({col: display_series(frame[col]) for col in frame.columns})
+    rows[DATE_COLUMN] = frame[DATE_COLUMN].dt.strftime(DATE_FORMAT)
+    rows = rows.astype(object).where(rows.notna(), None)
+    return rows.itertuples(index=False, name=None)
+
+
+def build_database(csv_path=UNIT_ECONOMICS_CSV, db_path=SQLITE_PATH, chunk_rows=SQL_CHUNK_ROWS):
+    # Streams the CSV into a fresh database chunk by chunk, preprocessed like
+    # the in-memory load, so memory use is bounded by one chunk rather than the
+    # extract. Written under a temporary name and renamed into place, so a
+    # reader never opens a half-built file.
+    manifest = dict(source_manifest(csv_path), database_format=DATABASE_FORMAT)
+    directory = os.path.dirname(db_path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    tmp_path = db_path + '.tmp-%d' % os.getpid()
+    if os.path.exists(tmp_path):
+        os.remove(tmp_path)
+
+    con = sqlite3.connect(tmp_path)
+    try:
+        con.execute('PRAGMA journal_mode = OFF')
+        con.execute('PRAGMA synchronous = OFF')
+        insert = None
+        chunk_partials = []
+        for chunk in _read_chunks(csv_path, chunk_rows):
+            try:
+                frame, partials = preprocess_unit_economics_chunk(chunk)
+            except (ValueError, TypeError) as e:
+                raise SchemaError(f"Could not preprocess '{csv_path}': {e}") from e
+            if insert is None:
+                dtypes = frame.dtypes
+                columns = ', '.join(f'{_quote(col)} {_sql_type(frame[col]) if col != DATE_COLUMN else "TEXT"}'
+                                    for col in frame.columns)
+                con.execute(f'CREATE TABLE {TABLE} ({columns})')
+                insert = (f'INSERT INTO {TABLE} ({", ".join(_quote(col) for col in frame.columns)}) '
+                          f'VALUES ({", ".join("?" * len(frame.columns))})')
+            con.executemany(insert, _sql_rows(frame))
+            chunk_partials.append(partials)
+
+        # Mean fills need every row, as in data_loader.fill_missing_means; the
+        # mean is stored as the column's compact dtype displays it.
+        for col in MEAN_FILLED_COLUMNS:
+            total = sum(partials[col][0] for partials in chunk_partials)
+            count = sum(partials[col][1] for partials in chunk_partials)
+            if count:
+                mean = float(display_series(pd.Series([total / count]).astype(dtypes[col])).iloc[0])
+                con.execute(f'UPDATE {TABLE} SET {_quote(col)} = ? WHERE {_quote(col)} IS NULL', (mean,))
+
+        con.execute(f'CREATE INDEX {TABLE}_dimensions ON {TABLE} ({", ".join(_quote(dim) for dim in DIMENSIONS)})')
+        for col in INDEXED_COLUMNS:
+            covered = [] if col == DATE_COLUMN else COVERED_COLUMNS
+            con.execute(f'CREATE INDEX {TABLE}_{col} ON {TABLE} ({", ".join(_quote(c) for c in [col] + covered)})')
+        con.execute('CREATE TABLE manifest (json TEXT)')
+        con.execute('INSERT INTO manifest VALUES (?)', (json.dumps(manifest),))
+        con.commit()
+        # Table statistics let the planner choose between the indexes per filter
+        con.execute('ANALYZE')
+        con.commit()
+    except BaseException:
+        con.close()
+        os.remove(tmp_path)
+        raise
+    con.close()
+    os.replace(tmp_path, db_path)
+    return db_path
+
+
+def _read_manifest(db_path):
+    try:
+        con = sqlite3.connect(pathlib.Path(db_path).absolute().as_uri() + '?mode=ro', uri=True)
+        try:
+            return json.loads(con.execute('SELECT json FROM manifest').fetchone()[0])
+        finally:
+            con.close()
+    except (sqlite3.Error, TypeError, ValueError):
+        return None
+
+
+def ensure_database(csv_path=UNIT_ECONOMICS_CSV, db_path=SQLITE_PATH):
+    # Rebuilds the database only when the CSV changed since it was built.
+    # Raises FileNotFoundError if the CSV is missing, even when a database exists.
+    manifest = _read_manifest(db_path) if os.path.exists(db_path) else None
+    if not (manifest and manifest.get('database_format') == DATABASE_FORMAT and cache_is_fresh(csv_path, manifest)):
+        build_database(csv_path, db_path)
+    return db_path
+
+
+# --- Connections ---
+class ConnectionPool:
+    # Read-only connections to one database file, at most `size` of them.
+    #
+    # A query borrows an idle connection (opening one if none is idle) and
+    # hands it back afterwards. Connections keep their compiled statements, and
+    # every query text the backend issues depends only on the shape of the
+    # filter, so repeated interactions re-bind parameters instead of
+    # re-parsing SQL.
+
+    def __init__(self, path, size=SQL_POOL_SIZE):
+        self.path = path
+        self.size = size
+        self._reset()
+
+    def _reset(self):
+        self._pid = os.getpid()
+        self._idle = queue.LifoQueue()
+        self._slots = threading.BoundedSemaphore(self.size)
+
+    def _open(self):
+        con = sqlite3.connect(pathlib.Path(self.path).absolute().as_uri() + '?mode=ro', uri=True,
+                              check_same_thread=False, cached_statements=SQL_STATEMENT_CACHE)
+        con.execute('PRAGMA query_only = ON')
+        con.execute(f'PRAGMA mmap_size = {SQL_MMAP_BYTES}')
+        return con
+
+    @contextlib.contextmanager
+    def connection(self):
+        if os.getpid() != self._pid:
+            # SQLite connections must not cross a fork; a forked worker opens its own.
+            self._reset()
+        with self._slots:
+            try:
+                con = self._idle.get_nowait()
+            except queue.Empty:
+                con = self._open()
+            try:
+                yield con
+            finally:
+                self._idle.put(con)
+
+
+def _bin_search(edges, first, last):
+    # (SQL expression, parameters) giving the bin of `x` among bins first..last.
+    if first == last:
+        return str(first), []
+    middle = (first + last + 1) // 2
+    below, below_params = _bin_search(edges, first, middle - 1)
+    above, above_params = _bin_search(edges, middle, last)
+    return (f'CASE WHEN x < ? THEN {below} ELSE {above} END',
+            [float(edges[middle])] + below_params + above_params)
+
+
+# --- Queries ---
+class SQLiteSnapshot:
+    # The query methods of snapshot.DataSnapshot, answered by SQL over one
+    # database file.
+    #
+    # Dimension selections are bound as one JSON array parameter per dimension
+    # (`IN (SELECT value FROM json_each(?))`), so the statement text does not
+    # change with the number of selected values; a dimension with every value
+    # selected is left out of the WHERE clause. The composite dimension index
+    # and the date index narrow the rows each aggregate reads. A reload builds
+    # a new file and a new snapshot; the old one keeps reading the old file.
+
+    def __init__(self, path, version=1, pool_size=SQL_POOL_SIZE):
+        self.version = version
+        self.path = path
+        self.pool = ConnectionPool(path, pool_size)
+
+        # Small facts read once: column types, dimension values, value ranges
+        self.types = {row[1]: row[2] for row in self._rows(f'PRAGMA table_info({TABLE})')}
+        self._options = {dim: [row[0] for row in self._rows(
+            f'SELECT DISTINCT {_quote(dim)} FROM {TABLE} WHERE {_quote(dim)} IS NOT NULL ORDER BY 1')]
+            for dim in DIMENSIONS}
+        self._edges = {}
+        for column, n_bins in HISTOGRAM_BINS.items():
+            count, minimum, maximum = self._rows(
+                f'SELECT COUNT({_quote(column)}), MIN({_quote(column)}), MAX({_quote(column)}) FROM {TABLE}')[0]
+            if not count:
+                self._edges[column] = np.linspace(0.0, 1.0, n_bins + 1)
+                continue
+            low, high = (self._value_at_rank(column, rank, count, '1', []) for rank in tail_ranks(count))
+            self._edges[column] = robust_edges(float(minimum), float(maximum), float(low), float(high), n_bins,
+                                               column in LOG_SCALE_COLUMNS)
+        first, last = self._rows(f'SELECT MIN({_quote(DATE_COLUMN)}), MAX({_quote(DATE_COLUMN)}) FROM {TABLE}')[0]
+        self._date_bounds = tuple(None if value is None else pd.Timestamp(value).date() for value in (first, last))
+
+    def _rows(self, sql, params=()):
+        with self.pool.connection() as con:
+            return con.execute(sql, params).fetchall()
+
+    def filter_options(self, dimension):
+        return list(self._options[dimension])
+
+    def date_bounds(self):
+        return self._date_bounds
+
+    def histogram_edges(self, column):
+        return self._edges[column]
+
+    def _empty_frame(self):
+        # Zero-row frame with the table's column types, for the column helpers of customer_table.
+        dtypes = {'INTEGER': 'int64', 'REAL': 'float64'}
+        return pd.DataFrame({col: pd.Series(dtype='datetime64[ns]' if col == DATE_COLUMN else dtypes.get(kind, object))
+                             for col, kind in self.types.items()})
+
+    def table_columns(self):
+        return table_columns(self._empty_frame())
+
+    # --- Filters ---
+    def _filter_term(self, term):
+        # One DataTable filter term as (SQL condition, parameters), matching
+        # customer_table.filter_query_mask. Raises ValueError when unsupported.
+        column, operator, value, case_insensitive = parse_filter_term(term)
+        if column not in self.types:
+            raise ValueError(f"Unsupported filter expression: {term!r}")
+        name = _quote(column)
+        if operator == 'blank':
+            return f'{name} IS NULL', []
+        if operator == 'notblank':
+            return f'{name} IS NOT NULL', []
+        if operator == 'contains':
+            if case_insensitive:
+                return f'instr(lower(CAST({name} AS TEXT)), lower(?)) > 0', [value]
+            return f'instr(CAST({name} AS TEXT), ?) > 0', [value]
+        if operator == 'datestartswith':
+            return f'substr({name}, 1, length(?)) = ?', [value, value]
+
+        numeric = self.types[column] in ('INTEGER', 'REAL')
+        try:
+            if numeric:
+                value = float(value)
+            elif column == DATE_COLUMN:
+                value = pd.Timestamp(value).strftime(DATE_FORMAT)
+        except (TypeError, ValueError):
+            # A number typed into a text column or vice versa matches nothing.
+            return '0', []
+        if case_insensitive and not numeric:
+            name, value = f'lower({name})', value.lower()
+        condition = f'{name} {_COMPARISONS[operator]} ?'
+        if operator == 'ne':
+            # Missing values differ from any value, as in the pandas filter
+            condition = f'({name} IS NULL OR {condition})'
+        return condition, [value]
+
+    def _where(self, filter_key, churned_only=False, filter_query=''):
+        # (WHERE clause, parameters) for a filter key plus the customer-table filters.
+        dimension_key, window = split_filter_key(filter_key)
+        conditions, params = [], []
+        for dim, values in zip(DIMENSIONS, dimension_key):
+            selected = sorted(set(values or []))
+            if selected == self._options[dim]:
+                continue
+            conditions.append(f'{_quote(dim)} IN (SELECT value FROM json_each(?))')
+            params.append(json.dumps(selected))
+        if window is not None:
+            start, end = window
+            if start is not None:
+                conditions.append(f'{_quote(DATE_COLUMN)} >= ?')
+                params.append(start.isoformat())
+            if end is not None:
+                conditions.append(f'{_quote(DATE_COLUMN)} <= ?')
+                params.append(end.isoformat())
+        if churned_only:
+            conditions.append('"Churned" = 1')
+        if filter_query:
+            try:
+                for term in filter_query.split(' && '):
+                    condition, term_params = self._filter_term(term)
+                    conditions.append(condition)
+                    params.extend(term_params)
+            except ValueError:
+                # An expression we cannot translate matches nothing rather than everything.
+                return '0', []
+        return ' AND '.join(conditions) or '1', params
+
+    # --- Aggregates ---
+    def has_data(self, filter_key):
+        where, params = self._where(filter_key)
+        return bool(self._rows(f'SELECT EXISTS (SELECT 1 FROM {TABLE} WHERE {where})', params)[0][0])
+
+    def customer_count(self, filter_key, churned_only=False, filter_query=''):
+        where, params = self._where(filter_key, churned_only, filter_query)
+        return self._rows(f'SELECT COUNT(*) FROM {TABLE} WHERE {where}', params)[0][0]
+
+    def kpis(self, filter_key):
+        # AVG skips missing values, like the per-cell sums and counts of KPIEngine.
+        where, params = self._where(filter_key)
+        averages = ', '.join(f'AVG({_quote(column)})' for column in KPI_MEASURES.values())
+        values = self._rows(f'SELECT {averages} FROM {TABLE} WHERE {where}', params)[0]
+        return dict(zip(KPI_MEASURES, values))
+
+    def _value_at_rank(self, column, rank, count, where, params):
+        # The rank-th smallest non-missing value of `column` among the `count`
+        # matching rows, read by walking the column's (covering) index with
+        # ORDER BY ... LIMIT 1 OFFSET from whichever end is nearer.
+        name = _quote(column)
+        from_top = count - 1 - rank
+        direction, offset = (' DESC', from_top) if from_top < rank else ('', rank)
+        return self._rows(f'SELECT {name} FROM {TABLE} WHERE {where} AND {name} IS NOT NULL '
+                          f'ORDER BY {name}{direction} LIMIT 1 OFFSET ?', params + [offset])[0][0]
+
+    def percentiles(self, filter_key, quantiles=PERCENTILES):
+        # Exact values at the ranks QuantileSketchEngine estimates; no request sorts rows.
+        where, params = self._where(filter_key)
+        counts = self._rows(f'SELECT {", ".join(f"COUNT({_quote(column)})" for column in SKETCH_COLUMNS)} '
+                            f'FROM {TABLE} WHERE {where}', params)[0]
+        result = {}
+        for column, count in zip(SKETCH_COLUMNS, counts):
+            if not count:
+                result[column] = None
+                continue
+            ranks = [int(q * (count - 1)) for q in quantiles]
+            values = {rank: self._value_at_rank(column, rank, count, where, params) for rank in set(ranks)}
+            result[column] = [values[rank] for rank in ranks]
+        return result
+
+    def histogram_counts(self, filter_key, column):
+        # Bins over the same fixed edges as HistogramEngine, found by a binary
+        # search over the edges written out as nested CASE expressions. Values
+        # on an edge go to the bin above it and the last bin is closed, as with
+        # bin_indices.
+        edges = self._edges[column]
+        n_bins = len(edges) - 1
+        where, params = self._where(filter_key)
+        name = _quote(column)
+        search, search_params = _bin_search(edges, 0, n_bins - 1)
+        rows = self._rows(
+            f'SELECT {search} AS bin, COUNT(*) FROM (SELECT {name} AS x FROM {TABLE} '
+            f'WHERE {where} AND {name} BETWEEN ? AND ?) GROUP BY bin',
+            search_params + params + [float(edges[0]), float(edges[-1])])
+        counts = np.zeros(n_bins, dtype=np.int64)
+        for bin_id, count in rows:
+            counts[bin_id] += count
+        return counts
+
+    def segment_rollup(self, filter_key, dimensions):
+        # Same layout as SegmentCube.rollup: dimensions, Customer_Count, Avg_* and Std_*.
+        if isinstance(dimensions, str):
+            dimensions = [dimensions]
+        where, params = self._where(filter_key)
+        group = ', '.join(_quote(dim) for dim in dimensions)
+        columns = list(dict.fromkeys(SEGMENT_MEASURES.values()))
+        partials = ', '.join(f'SUM({_quote(col)}), COUNT({_quote(col)}), SUM({_quote(col)} * {_quote(col)})'
+                             for col in columns)
+        complete = ' AND '.join(f'{_quote(dim)} IS NOT NULL' for dim in dimensions)
+        rows = self._rows(f'SELECT {group}, COUNT(*), {partials} FROM {TABLE} WHERE {where} AND {complete} '
+                          f'GROUP BY {group} ORDER BY {group}', params)
+        table = pd.DataFrame(rows, columns=list(dimensions) + ['rows'] + [
+            f'{kind}_{col}' for col in columns for kind in ('sum', 'count', 'sumsq')])
+
+        result = {dim: table[dim].astype(str) for dim in dimensions}
+        result['Customer_Count'] = table['rows'].to_numpy(dtype=np.int64)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            for name, column in SEGMENT_MEASURES.items():
+                count = table['count_' + column].to_numpy(dtype=float)
+                mean = table['sum_' + column].to_numpy(dtype=float) / count
+                variance = np.clip(table['sumsq_' + column].to_numpy(dtype=float) / count - mean * mean, 0.0, None)
+                result[name] = mean
+                result['Std' + name[len('Avg'):]] = np.sqrt(variance)
+        return pd.DataFrame(result)
+
+    def trend(self, filter_key):
+        # Same layout as MonthlyRollup.series: one row per month between the
+        # first and last month with customers, empty months included.
+        where, params = self._where(filter_key)
+        date = _quote(DATE_COLUMN)
+        rows = self._rows(
+            f'SELECT substr({date}, 1, 7) AS month, COUNT(*), SUM("Churned"), SUM("LTV_CAC_Ratio"), '
+            f'COUNT("LTV_CAC_Ratio") FROM {TABLE} WHERE {where} AND {date} IS NOT NULL GROUP BY month ORDER BY month',
+            params)
+        if not rows:
+            months = np.array([], dtype='datetime64[M]')
+        else:
+            months = np.arange(np.datetime64(rows[0][0], 'M'), np.datetime64(rows[-1][0], 'M') + 1)
+        totals = np.zeros((len(months), 4))
+        for month, *values in rows:
+            totals[int(np.datetime64(month, 'M') - months[0])] = [0.0 if value is None else value for value in values]
+        with np.errstate(invalid='ignore', divide='ignore'):
+            churn_rate = totals[:, 1] / totals[:, 0]
+            avg_ltv_cac = totals[:, 2] / totals[:, 3]
+        return pd.DataFrame({'month': months,
+                             'customers': totals[:, 0].astype(np.int64),
+                             'churned': totals[:, 1].astype(np.int64),
+                             'churn_rate': churn_rate,
+                             'avg_ltv_cac': avg_ltv_cac})
+
+    # --- Customer table ---
+    def _table_query(self, filter_key, churned_only, sort_column, ascending, filter_query):
+        # Missing values sort last in both directions (in file order), and a
+        # descending order is the ascending one reversed, ties included, as with SortIndex.
+        where, params = self._where(filter_key, churned_only, filter_query)
+        columns = display_columns(self._empty_frame())
+        order = 'rowid'
+        if sort_column in self.types:
+            name = _quote(sort_column)
+            order = (f'{name} IS NULL, {name}, rowid' if ascending else
+                     f'{name} IS NULL, {name} DESC, CASE WHEN {name} IS NULL THEN rowid ELSE -rowid END')
+        sql = f'SELECT {", ".join(_quote(col) for col in columns)} FROM {TABLE} WHERE {where} ORDER BY {order}'
+        return columns, sql, params
+
+    def customer_rows(self, filter_key, churned_only=False, sort_column=None, ascending=True, filter_query='',
+                      offset=0, limit=None):
+        # The page is cut by LIMIT/OFFSET inside the query, so only its rows
+        # leave SQLite.
+        columns, sql, params = self._table_query(filter_key, churned_only, sort_column, ascending, filter_query)
+        rows = self._rows(sql + ' LIMIT ? OFFSET ?', params + [-1 if limit is None else limit, offset])
+        return pd.DataFrame(rows, columns=columns)
+
+    def iter_customer_csv(self, filter_key, churned_only=False, sort_column=None, ascending=True, filter_query='',
+                          chunk_size=10000):
+        # Streams the rows from one cursor; the connection is held until the download ends.
+        columns, sql, params = self._table_query(filter_key, churned_only, sort_column, ascending, filter_query)
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator='\n')
+        writer.writerow(columns)
+        yield buffer.getvalue()
+        with self.pool.connection() as con:
+            cursor = con.execute(sql, params)
+            while True:
+                rows = cursor.fetchmany(chunk_size)
+                if not rows:
+                    break
+                buffer.seek(0)
+                buffer.truncate()
+                writer.writerows(rows)
+                yield buffer.getvalue()
+
+
+def build_sql_snapshot(version=1, csv_path=UNIT_ECONOMICS_CSV, db_path=SQLITE_PATH):
+    return SQLiteSnapshot(ensure_database(csv_path, db_path), version)
+
+
+def _main(argv):
+    # `python sql_backend.py [src.csv] [out.sqlite]` (re)builds the database
+    # the apps read with DASHBOARD_BACKEND=sqlite.
+    csv_path = argv[1] if len(argv) > 1 else UNIT_ECONOMICS_CSV
+    db_path = argv[2] if len(argv) > 2 else SQLITE_PATH
+    started = time.perf_counter()
+    try:
+        build_database(csv_path, db_path)
+    except FileNotFoundError:
+        print(f"Error: '{csv_path}' not found.")
+        return 1
+    except SchemaError as e:
+        print(f"Schema error: {e}")
+        return 1
+    print(f"Built '{db_path}' from '{csv_path}' in {time.perf_counter() - started:.2f}s "
+          f"({os.path.getsize(db_path) / 2**20:.1f} MiB on disk).")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(_main(sys.argv))
@@ -1,25 +1,91 @@
 import streamlit as st
-import pandas as pd
-import plotly.express as px
 
-# Load the datasets
+from figures import distribution_figures, segment_figures, trend_figures
+from filter_index import normalize_filter_key
+from instrumentation import record_rows, stage, start_metrics_server
+from reloader import DataReloader
+from shared_dataset import SHARED_DATA_DIR, SharedDataReloader
+
+# Bounds for every cached step: entries expire after CACHE_TTL seconds and each
+# function keeps at most CACHE_MAX_ENTRIES distinct argument combinations.
+CACHE_TTL = 600
+CACHE_MAX_ENTRIES = 64
+
+# Rows of the customer list shown by default; only these are put in order.
+CUSTOMER_LIST_ROWS = 1000
+
+
+# --- Cached Steps ---
+# Each step is keyed on the snapshot version plus only the inputs it uses, so a
+# widget change re-runs just the steps that depend on it. The snapshot itself
+# is passed unhashed (leading underscore); its version stands in for it.
+@st.cache_resource
+def get_data_reloader():
+    # Parses the datasets once per server process; the reloader keeps watching
+    # the files and swaps in a rebuilt snapshot when they change.
+    return (SharedDataReloader() if SHARED_DATA_DIR else DataReloader()).start()
+
+
+@st.cache_resource
+def get_metrics_server():
+    # With DASHBOARD_METRICS=1 and DASHBOARD_METRICS_PORT set, section timings
+    # are served on http://<host>:<port>/metrics (Streamlit has no route of its own).
+    return start_metrics_server()
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_filter_options(_snapshot, version):
+    return {dim: _snapshot.filter_options(dim)
+            for dim in ('industry', 'company_size', 'plan_name', 'billing_frequency')}
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_kpis(_snapshot, version, filter_key):
+    return _snapshot.kpis(filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_percentiles(_snapshot, version, filter_key):
+    return _snapshot.percentiles(filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_has_data(_snapshot, version, filter_key):
+    return _snapshot.has_data(filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_distribution_figures(_snapshot, version, filter_key):
+    return distribution_figures(_snapshot, filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_segment_figures(_snapshot, version, filter_key):
+    return segment_figures(_snapshot, filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_trend_figures(_snapshot, version, filter_key):
+    return trend_figures(_snapshot, filter_key)
+
+
+@st.cache_data(ttl=CACHE_TTL, max_entries=CACHE_MAX_ENTRIES)
+def cached_customer_list(_snapshot, version, filter_key, churned_only, sort_column, ascending, n_rows):
+    # The first `n_rows` matching customers and the number matching in total.
+    # Only those rows are put in order (pre-sorted permutations in memory, LIMIT in SQL).
+    return (_snapshot.customer_rows(filter_key, churned_only, sort_column, ascending, limit=n_rows),
+            _snapshot.customer_count(filter_key, churned_only))
+
+
+# Load the datasets (parsed once and served from the columnar cache afterwards)
 try:
-    df_unit_economics = pd.read_csv('unit_economics.csv')
-    df_unit_economics_by_segment = pd.read_csv('unit_economics_by_segment.csv')
+    snapshot = get_data_reloader().current()
+    get_metrics_server()
 except FileNotFoundError:
-    st.error("Make sure 'unit_economics.csv' and 'unit_economics_by_segment.csv' are in the same directory.")
+    st.error("Make sure 'unit_economics.csv' is in the same directory.")
     st.stop()
 
-# Data Preprocessing (if needed)
-# Convert 'latest_end' to datetime if time-series analysis is required
-df_unit_economics['latest_end'] = pd.to_datetime(df_unit_economics['latest_end'])
-
-# Fill missing values for health and sentiment scores for visualization purposes
-df_unit_economics['Avg_Sentiment_Score'] = df_unit_economics['Avg_Sentiment_Score'].fillna(df_unit_economics['Avg_Sentiment_Score'].mean())
-df_unit_economics['Customer_Health_Score'] = df_unit_economics['Customer_Health_Score'].fillna(df_unit_economics['Customer_Health_Score'].mean())
-df_unit_economics['Active_Days'] = df_unit_economics['Active_Days'].fillna(0) # or median/mean
-df_unit_economics['Usage_Events'] = df_unit_economics['Usage_Events'].fillna(0) # or median/mean
-df_unit_economics['Usage_Score'] = df_unit_economics['Usage_Score'].fillna(0) # or median/mean
+filter_options = cached_filter_options(snapshot, snapshot.version)
 
 
 # --- Streamlit Dashboard Layout ---
@@ -38,143 +104,136 @@ st.sidebar.header("Filter Options")
 # Global filters for the aggregated data (and potentially individual data)
 selected_industries = st.sidebar.multiselect(
     "Select Industry:",
-    options=df_unit_economics_by_segment['industry'].unique(),
-    default=df_unit_economics_by_segment['industry'].unique()
+    options=filter_options['industry'],
+    default=filter_options['industry']
 )
 
 selected_company_sizes = st.sidebar.multiselect(
     "Select Company Size:",
-    options=df_unit_economics_by_segment['company_size'].unique(),
-    default=df_unit_economics_by_segment['company_size'].unique()
+    options=filter_options['company_size'],
+    default=filter_options['company_size']
 )
 
 selected_plan_names = st.sidebar.multiselect(
     "Select Plan Name:",
-    options=df_unit_economics_by_segment['plan_name'].unique(),
-    default=df_unit_economics_by_segment['plan_name'].unique()
+    options=filter_options['plan_name'],
+    default=filter_options['plan_name']
 )
 
 selected_billing_frequencies = st.sidebar.multiselect(
     "Select Billing Frequency:",
-    options=df_unit_economics_by_segment['billing_frequency'].unique(),
-    default=df_unit_economics_by_segment['billing_frequency'].unique()
+    options=filter_options['billing_frequency'],
+    default=filter_options['billing_frequency']
 )
 
-# Apply filters to both dataframes
-filtered_df_unit_economics = df_unit_economics[
-    (df_unit_economics['industry'].isin(selected_industries)) &
-    (df_unit_economics['company_size'].isin(selected_company_sizes)) &
-    (df_unit_economics['plan_name'].isin(selected_plan_names)) &
-    (df_unit_economics['billing_frequency'].isin(selected_billing_frequencies))
-]
-
-filtered_df_unit_economics_by_segment = df_unit_economics_by_segment[
-    (df_unit_economics_by_segment['industry'].isin(selected_industries)) &
-    (df_unit_economics_by_segment['company_size'].isin(selected_company_sizes)) &
-    (df_unit_economics_by_segment['plan_name'].isin(selected_plan_names)) &
-    (df_unit_economics_by_segment['billing_frequency'].isin(selected_billing_frequencies))
-]
+# Contract end date window; the full range (the default) does not filter
+first_date, last_date = snapshot.date_bounds()
+selected_dates = st.sidebar.date_input(
+    "Contract End Date Range:",
+    value=(first_date, last_date),
+    min_value=first_date,
+    max_value=last_date
+) if first_date is not None else ()
+# While a range is being picked only its start is set
+date_range = tuple(selected_dates) if isinstance(selected_dates, (tuple, list)) else (selected_dates,)
+
+# Normalized filter selection; together with the snapshot version it keys every cached step
+filter_key = normalize_filter_key(selected_industries, selected_company_sizes,
+                                  selected_plan_names, selected_billing_frequencies, date_range)
+has_data = cached_has_data(snapshot, snapshot.version, filter_key)
 
 # --- Main Dashboard Content ---
 
 st.header("Key Performance Indicators (KPIs)")
-if not filtered_df_unit_economics.empty:
+with stage('streamlit.kpis'):
+    kpis = cached_kpis(snapshot, snapshot.version, filter_key)
+    percentiles = cached_percentiles(snapshot, snapshot.version, filter_key)
+
+
+def spread(column):
+    # Approximate p10 / p50 / p90 (within 1%) under an average
+    values = percentiles[column]
+    return "p10 / p50 / p90: " + (" / ".join(f"{value:.2f}" for value in values) if values else "N/A")
+
+
+if kpis['churn_rate'] is not None:
     col1, col2, col3, col4 = st.columns(4)
     with col1:
-        st.metric(label="Average LTV/CAC Ratio", value=f"{filtered_df_unit_economics['LTV_CAC_Ratio'].mean():.2f}")
+        st.metric(label="Average LTV/CAC Ratio", value=f"{kpis['avg_ltv_cac']:.2f}")
+        st.caption(spread('LTV_CAC_Ratio'))
     with col2:
-        st.metric(label="Average CAC Payback Months", value=f"{filtered_df_unit_economics['CAC_Payback_Months'].mean():.2f}")
+        st.metric(label="Average CAC Payback Months", value=f"{kpis['avg_cac_payback']:.2f}")
+        st.caption(spread('CAC_Payback_Months'))
     with col3:
-        churn_rate = filtered_df_unit_economics['Churned'].mean() * 100
+        churn_rate = kpis['churn_rate'] * 100
         st.metric(label="Churn Rate", value=f"{churn_rate:.2f}%")
     with col4:
-        st.metric(label="Average Customer Health Score", value=f"{filtered_df_unit_economics['Customer_Health_Score'].mean():.2f}")
+        st.metric(label="Average Customer Health Score", value=f"{kpis['avg_health_score']:.2f}")
+        st.caption(spread('Customer_Health_Score'))
 else:
     st.warning("No data available for the selected filters in customer-level data.")
 
 
 st.header("Customer-Level Unit Economics Distributions")
 
-if not filtered_df_unit_economics.empty:
+if has_data:
+    with stage('streamlit.distributions'):
+        fig_ltv_cac, fig_payback, fig_health = cached_distribution_figures(snapshot, snapshot.version, filter_key)
+
     col1, col2, col3 = st.columns(3)
     with col1:
-        fig_ltv_cac = px.histogram(filtered_df_unit_economics, x='LTV_CAC_Ratio',
-                                   title='Distribution of LTV to CAC Ratio',
-                                   nbins=50, color_discrete_sequence=px.colors.qualitative.Plotly)
         st.plotly_chart(fig_ltv_cac, use_container_width=True)
 
     with col2:
-        fig_payback = px.histogram(filtered_df_unit_economics, x='CAC_Payback_Months',
-                                    title='Distribution of CAC Payback Months',
-                                    nbins=50, color_discrete_sequence=px.colors.qualitative.Plotly)
         st.plotly_chart(fig_payback, use_container_width=True)
 
     with col3:
-        fig_health = px.histogram(filtered_df_unit_economics, x='Customer_Health_Score',
-                                   title='Distribution of Customer Health Score',
-                                   nbins=20, color_discrete_sequence=px.colors.qualitative.Plotly)
         st.plotly_chart(fig_health, use_container_width=True)
 else:
     st.warning("No data available for the selected filters to display customer-level distributions.")
 
 st.header("Segment-Level Unit Economics Analysis")
 
-if not filtered_df_unit_economics_by_segment.empty:
+if has_data:
+    with stage('streamlit.segments'):
+        (fig_avg_ltv_cac_industry, fig_avg_payback_industry,
+         fig_cust_count_company_size, fig_avg_ltv_cac_plan) = cached_segment_figures(snapshot, snapshot.version, filter_key)
+
     col1, col2 = st.columns(2)
     with col1:
-        fig_avg_ltv_cac_industry = px.bar(
-            filtered_df_unit_economics_by_segment.groupby('industry')['Avg_LTV_CAC'].mean().reset_index().sort_values(by='Avg_LTV_CAC', ascending=False),
-            x='Avg_LTV_CAC',
-            y='industry',
-            orientation='h',
-            title='Average LTV/CAC Ratio by Industry',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
         st.plotly_chart(fig_avg_ltv_cac_industry, use_container_width=True)
 
     with col2:
-        fig_avg_payback_industry = px.bar(
-            filtered_df_unit_economics_by_segment.groupby('industry')['Avg_Payback_Months'].mean().reset_index().sort_values(by='Avg_Payback_Months', ascending=True),
-            x='Avg_Payback_Months',
-            y='industry',
-            orientation='h',
-            title='Average Payback Months by Industry',
-            color_discrete_sequence=px.colors.qualitative.Set2
-        )
         st.plotly_chart(fig_avg_payback_industry, use_container_width=True)
 
     col3, col4 = st.columns(2)
     with col3:
-        fig_cust_count_company_size = px.bar(
-            filtered_df_unit_economics_by_segment.groupby('company_size')['Customer_Count'].sum().reset_index().sort_values(by='Customer_Count', ascending=False),
-            x='company_size',
-            y='Customer_Count',
-            title='Total Customer Count by Company Size',
-            color_discrete_sequence=px.colors.qualitative.Set3
-        )
         st.plotly_chart(fig_cust_count_company_size, use_container_width=True)
 
     with col4:
-        fig_avg_ltv_cac_plan = px.bar(
-            filtered_df_unit_economics_by_segment.groupby('plan_name')['Avg_LTV_CAC'].mean().reset_index().sort_values(by='Avg_LTV_CAC', ascending=False),
-            x='Avg_LTV_CAC',
-            y='plan_name',
-            orientation='h',
-            title='Average LTV/CAC Ratio by Plan Name',
-            color_discrete_sequence=px.colors.qualitative.Set1
-        )
         st.plotly_chart(fig_avg_ltv_cac_plan, use_container_width=True)
 else:
     st.warning("No data available for the selected filters to display segment-level analysis.")
 
+st.header("Time-Series Trends")
+
+if has_data:
+    with stage('streamlit.trends'):
+        fig_churn_trend, fig_ltv_cac_trend = cached_trend_figures(snapshot, snapshot.version, filter_key)
+
+    col1, col2 = st.columns(2)
+    with col1:
+        st.plotly_chart(fig_churn_trend, use_container_width=True)
+
+    with col2:
+        st.plotly_chart(fig_ltv_cac_trend, use_container_width=True)
+else:
+    st.warning("No data available for the selected filters to display time-series trends.")
+
 st.header("Customer Stream List (Filtered Data)")
 
 # Option to filter for 'Churned' customers
 show_churned = st.checkbox("Show only Churned Customers", value=False)
-if show_churned:
-    filtered_df_unit_economics_display = filtered_df_unit_economics[filtered_df_unit_economics['Churned'] == 1]
-else:
-    filtered_df_unit_economics_display = filtered_df_unit_economics
 
 # Allow sorting
 sort_column = st.selectbox(
@@ -188,15 +247,20 @@ sort_order = st.radio(
     horizontal=True
 )
 
+n_rows_shown = st.number_input("Rows to show:", min_value=10, value=CUSTOMER_LIST_ROWS, step=500)
+
 ascending = True if sort_order == 'Ascending' else False
-filtered_df_unit_economics_display = filtered_df_unit_economics_display.sort_values(by=sort_column, ascending=ascending)
+with stage('streamlit.customer_list'):
+    filtered_df_unit_economics_display, n_matching = cached_customer_list(snapshot, snapshot.version, filter_key,
+                                                                          show_churned, sort_column, ascending,
+                                                                          int(n_rows_shown))
+record_rows('streamlit.customer_list', len(filtered_df_unit_economics_display))
 
 # Display the filtered customer data
 if not filtered_df_unit_economics_display.empty:
-    st.dataframe(filtered_df_unit_economics_display[['customer_id', 'industry', 'company_size', 'plan_name',
-                                                      'LTV', 'CAC', 'LTV_CAC_Ratio', 'CAC_Payback_Months',
-                                                      'Monthly_Revenue', 'Customer_Health_Score', 'Churned', 'latest_end',
-                                                      'Avg_Sentiment_Score', 'Active_Days', 'Usage_Events', 'Usage_Score']])
+    st.caption(f"Showing the first {len(filtered_df_unit_economics_display):,} of {n_matching:,} matching customers.")
+    with stage('streamlit.customer_table'):
+        st.dataframe(filtered_df_unit_economics_display)
 else:
     st.info("No customers match the current filter and churn selection.")
 
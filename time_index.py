@@ -0,0 +1,160 @@
+import datetime
+
+import numpy as np
+import pandas as pd
+
+# Date column behind the date-range filter and the monthly trend charts.
+DATE_COLUMN = 'latest_end'
+
+
+def _day(value):
+    # 'YYYY-MM-DD' (or a date / datetime) -> numpy day.
+    return np.datetime64(pd.Timestamp(value).date(), 'D')
+
+
+class DateIndex:
+    # Row positions ordered by contract end date.
+    #
+    # A date range is answered by two binary searches into the sorted dates,
+    # which yield a contiguous slice of the permutation: the matching rows are
+    # found in O(log n) plus the size of the answer, without scanning the column.
+    # Rows without a date sort last and never match a range.
+
+    def __init__(self, df, column=DATE_COLUMN):
+        values = df[column].to_numpy()
+        self.n_rows = len(values)
+        self.order = np.argsort(values, kind='stable')
+        self.dates = values[self.order]
+        self.n_dated = int((~np.isnat(self.dates)).sum())
+
+    @property
+    def first_date(self):
+        return pd.Timestamp(self.dates[0]).date() if self.n_dated else None
+
+    @property
+    def last_date(self):
+        return pd.Timestamp(self.dates[self.n_dated - 1]).date() if self.n_dated else None
+
+    def bounds(self, start=None, end=None):
+        # Slice of `order` holding the rows dated within [start, end], both days inclusive.
+        dated = self.dates[:self.n_dated]
+        lo = 0 if start is None else int(np.searchsorted(dated, _day(start).astype(dated.dtype), side='left'))
+        hi = self.n_dated if end is None else int(
+            np.searchsorted(dated, (_day(end) + 1).astype(dated.dtype), side='left'))
+        return lo, max(lo, hi)
+
+    def covers_all(self, start=None, end=None):
+        return self.bounds(start, end) == (0, self.n_rows)
+
+    def positions(self, start=None, end=None):
+        lo, hi = self.bounds(start, end)
+        return self.order[lo:hi]
+
+    def mask(self, start=None, end=None):
+        mask = np.zeros(self.n_rows, dtype=bool)
+        mask[self.positions(start, end)] = True
+        return mask
+
+
+class MonthlyRollup:
+    # Customers, churned customers and LTV/CAC sums per dimension cell and
+    # contract-end month, as dense (cells x months) count matrices.
+    #
+    # A trend for any dimension filter sums the selected cells' rows, so each
+    # month bucket costs the same however many customers it holds. Buckets cut
+    # by a date window are the exception: at most two, and they are recounted
+    # from the rows the date index finds for them.
+
+    def __init__(self, df, cells, date_index, column=DATE_COLUMN):
+        self.cells = cells
+        self.date_index = date_index
+        values = df[column].to_numpy()
+        dated = ~np.isnat(values)
+        months = values.astype('datetime64[M]').astype(np.int64)
+        self.first_month = int(months[dated].min()) if dated.any() else 0
+        self.n_months = int(months[dated].max()) - self.first_month + 1 if dated.any() else 0
+        self.months = np.arange(self.first_month, self.first_month + self.n_months).astype('datetime64[M]')
+
+        # Per-row values, kept to recount the buckets a date window cuts through
+        self._churned = df['Churned'].to_numpy(dtype=float)
+        self._ratio = df['LTV_CAC_Ratio'].to_numpy(dtype=float)
+
+        flat = cells.cell_ids[dated].astype(np.int64) * self.n_months + (months[dated] - self.first_month)
+        self.partials = {}
+        for name, weights in self._row_measures(dated).items():
+            counts = np.bincount(flat, weights=weights, minlength=cells.n_cells * self.n_months)
+            self.partials[name] = counts.reshape(cells.n_cells, self.n_months)
+
+    def _row_measures(self, rows):
+        ratio = self._ratio[rows]
+        valid = np.isfinite(ratio)
+        return {'customers': None,
+                'churned': self._churned[rows],
+                'ltv_cac_sum': np.where(valid, ratio, 0.0),
+                'ltv_cac_count': valid.astype(float)}
+
+    def _recount(self, totals, bucket, start, end, row_mask):
+        positions = self.date_index.positions(start, end)
+        if row_mask is not None:
+            positions = positions[row_mask[positions]]
+        for name, weights in self._row_measures(positions).items():
+            totals[name][bucket] = len(positions) if weights is None else weights.sum()
+
+    def series(self, cell_mask, window=None, row_mask=None):
+        # Monthly trend of the selected cells, optionally limited to the
+        # (start, end) date window; `row_mask` is the matching dimension filter
+        # over rows, used only for buckets the window cuts through. Returns one
+        # row per month between the first and last non-empty one.
+        lo, hi = 0, self.n_months
+        if window is not None:
+            start, end = window
+            if start is not None:
+                lo = max(lo, int(_day(start).astype('datetime64[M]').astype(np.int64)) - self.first_month)
+            if end is not None:
+                hi = min(hi, int(_day(end).astype('datetime64[M]').astype(np.int64)) - self.first_month + 1)
+        lo, hi = max(lo, 0), max(hi, lo)
+
+        totals = {name: partials[cell_mask, lo:hi].sum(axis=0).astype(float)
+                  for name, partials in self.partials.items()}
+        if window is not None and hi > lo:
+            start, end = window
+            for bucket in sorted({0, hi - lo - 1}):
+                month = self.months[lo + bucket]
+                month_start = month.astype('datetime64[D]')
+                month_end = (month + 1).astype('datetime64[D]') - 1
+                cut_start = start is not None and _day(start) > month_start
+                cut_end = end is not None and _day(end) < month_end
+                if cut_start or cut_end:
+                    self._recount(totals, bucket, max(_day(start), month_start) if start is not None else month_start,
+                                  min(_day(end), month_end) if end is not None else month_end, row_mask)
+
+        customers = totals['customers']
+        populated = np.flatnonzero(customers > 0)
+        keep = slice(populated[0], populated[-1] + 1) if populated.size else slice(0, 0)
+        with np.errstate(invalid='ignore', divide='ignore'):
+            churn_rate = totals['churned'] / customers
+            avg_ltv_cac = totals['ltv_cac_sum'] / totals['ltv_cac_count']
+        return pd.DataFrame({'month': self.months[lo:hi][keep],
+                             'customers': customers[keep].astype(np.int64),
+                             'churned': totals['churned'][keep].astype(np.int64),
+                             'churn_rate': churn_rate[keep],
+                             'avg_ltv_cac': avg_ltv_cac[keep]})
+
+
+def normalize_date_range(date_range):
+    # (start, end) from a date picker -> ['YYYY-MM-DD' or '', 'YYYY-MM-DD' or ''],
+    # or None when neither bound is set. Swapped bounds are put in order.
+    if not date_range:
+        return None
+    bounds = [None if value in (None, '') else pd.Timestamp(value).date().isoformat() for value in date_range]
+    bounds = (bounds + [None, None])[:2]
+    if bounds[0] is None and bounds[1] is None:
+        return None
+    if bounds[0] is not None and bounds[1] is not None and bounds[0] > bounds[1]:
+        bounds.reverse()
+    return [bound or '' for bound in bounds]
+
+
+def parse_date_range(normalized):
+    # Inverse of normalize_date_range: (start date or None, end date or None).
+    return tuple(datetime.date.fromisoformat(bound) if bound else None for bound in normalized)